@@ -0,0 +1,757 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import subprocess
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import utils
+import data_driven
+import command_program
+import command_registry
+import wait_engine
+import verify_batch
+from command_program import Instruction, Selector
+from parallel_runner import CaseResult, build_report, case_name, split_test_cases
+from run_control import RunCancelled, RunControl
+
+# W3C WebDriver 元素參照的鍵值
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+# 同時啟動中的 Chrome 數量上限，避免一次啟動數十個瀏覽器造成啟動逾時
+SESSION_START_CONCURRENCY = 4
+
+# 等待條件的輪詢間隔 (秒)
+POLL_INTERVAL = 0.1
+
+class WebDriverError(Exception):
+    """chromedriver 回傳的錯誤"""
+
+    def __init__(self, error: str, message: str) -> None:
+        super().__init__(f"{error}: {message}")
+        self.error = error
+
+class AsyncHTTPClient:
+    """以 asyncio 串流實作的最小 HTTP/1.1 用戶端，保持連線並在多個工作階段間共用"""
+
+    def __init__(self, host: str, port: int, max_connections: int) -> None:
+        self.host = host
+        self.port = port
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._limit = asyncio.Semaphore(max_connections)
+
+    async def request(self, method: str, path: str, payload: Any = None) -> Any:
+        """送出請求並返回回應 JSON 的 value，錯誤回應拋出 WebDriverError"""
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        async with self._limit:
+            for attempt in range(2):
+                reused = bool(self._idle)
+                reader, writer = self._idle.pop() if reused else await asyncio.open_connection(self.host, self.port)
+                try:
+                    status, keep_alive, data = await self._exchange(reader, writer, method, path, body)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    # 閒置連線可能已被伺服器關閉，改用新連線重試一次
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except BaseException:
+                    # 其他錯誤 (包含取消) 時回應可能只讀取一部分，連線不可再放回連線池
+                    writer.close()
+                    raise
+                if keep_alive:
+                    self._idle.append((reader, writer))
+                else:
+                    writer.close()
+                break
+
+        value = json.loads(data.decode("utf-8")).get("value") if data else None
+        if status >= 400:
+            value = value if isinstance(value, dict) else {}
+            raise WebDriverError(value.get("error", str(status)), value.get("message", ""))
+        return value
+
+    async def _exchange(self, reader, writer, method: str, path: str, body: bytes) -> Tuple[int, bool, bytes]:
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: keep-alive\r\n\r\n".encode("ascii") + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("連線已關閉")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            data = b"".join(chunks)
+        else:
+            data = await reader.readexactly(int(headers.get("content-length", 0)))
+
+        keep_alive = headers.get("connection", "").lower() != "close"
+        return status, keep_alive, data
+
+    async def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+class ChromedriverService:
+    """啟動一個 chromedriver 程序，所有非同步工作階段共用"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.port = 0
+        self.process = None
+
+    async def start(self, timeout: float = 20) -> None:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+
+        self.process = await asyncio.create_subprocess_exec(
+            self.path, f"--port={self.port}",
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        client = AsyncHTTPClient("127.0.0.1", self.port, 1)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                status = await client.request("GET", "/status")
+                if status and status.get("ready"):
+                    break
+            except (OSError, WebDriverError):
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError("chromedriver 啟動逾時")
+            await asyncio.sleep(POLL_INTERVAL)
+        await client.close()
+        logging.info(f"chromedriver 已啟動於連接埠 {self.port}")
+
+    async def stop(self) -> None:
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+            await self.process.wait()
+
+def _capabilities(profile: str) -> Dict[str, Any]:
+    """依瀏覽器執行設定檔建立新工作階段的 capabilities (與 SeleniumHandler.create_driver 相同的選項)"""
+    arguments, prefs = utils.get_browser_profile(profile)
+    chrome_options = {
+        "args": arguments + ["--disable-notifications"],
+        "excludeSwitches": ["enable-automation"],
+        "useAutomationExtension": False,
+    }
+    if prefs:
+        chrome_options["prefs"] = prefs
+    return {"capabilities": {"alwaysMatch": {"browserName": "chrome", "goog:chromeOptions": chrome_options}}}
+
+def _locator(selector) -> Tuple[str, str]:
+    """轉為 W3C 定位策略 (id 與 class name 改以 CSS 表示)"""
+    by, value = (selector.by, selector.value) if isinstance(selector, Selector) else command_program.parse_selector(selector)
+    if by == "id":
+        return "css selector", f"[id={json.dumps(value)}]"
+    if by == "class name":
+        return "css selector", f"[class~={json.dumps(value)}]"
+    return by, value
+
+def _parse_selector(selector) -> Tuple[str, str]:
+    """批次驗證腳本使用的 (by, value)，與 SeleniumHandler._parse_selector 相同"""
+    if isinstance(selector, Selector):
+        return selector.by, selector.value
+    return command_program.parse_selector(selector)
+
+# 非同步執行支援的內建指令 (SeleniumHandler 方法名稱)
+# 可合併的唯讀驗證另以 verify_batch 的批次腳本與共用判斷執行；其他指令 (含擴充模組的指令) 在編譯時即標記為錯誤
+ASYNC_METHODS = {
+    "open_html_page", "refresh_page", "go_back", "click_by_id", "click_by_text", "click_by_css", "type_text",
+    "wait_seconds", "wait_for_text", "wait_for_element", "wait_for_page_load", "wait_for_network_idle",
+    "scroll_to_bottom", "execute_nav_sequence", "run_data_driven", "log_test_case", "log_description", "log_severity",
+}
+
+def _is_supported(instruction: Instruction) -> bool:
+    spec = instruction.spec
+    if instruction.error or spec is None or verify_batch.is_batchable(instruction):
+        return True
+    return getattr(spec.handler, "__name__", None) in ASYNC_METHODS
+
+def restrict_to_async(instructions: Iterable[Instruction]) -> Iterator[Instruction]:
+    """編譯後的指令串流中，非同步執行不支援的指令 (含導航序列與資料驅動區塊內的步驟) 改為錯誤指令"""
+    for instruction in instructions:
+        unsupported = next((item for item in command_program.iter_nested(instruction) if not _is_supported(item)), None)
+        if unsupported is not None:
+            instruction = Instruction(instruction.cmd, instruction.params,
+                                      error=f"非同步執行不支援命令: {unsupported.cmd}", line=instruction.line)
+        yield instruction
+
+class AsyncSession:
+    """非同步版本的 SeleniumHandler: 方法名稱與參數和 SeleniumHandler 相同，每個 WebDriver 請求皆以 await 等待
+
+    只實作 ASYNC_METHODS 中的指令；驗證指令不另外實作，一律以批次腳本取得結果後交給共用的 verify_batch.judge。
+    """
+
+    def __init__(self, client: AsyncHTTPClient, session_id: str, control: Optional[RunControl] = None,
+                 wait_stats: Optional[wait_engine.WaitStats] = None) -> None:
+        self.client = client
+        self.session_id = session_id
+        self.default_wait_time = utils.DEFAULT_WAIT_TIME
+        self.run_control = control or RunControl()
+        self.wait_stats = wait_stats or wait_engine.WaitStats()
+
+    @classmethod
+    async def create(cls, client: AsyncHTTPClient, profile: str, control: Optional[RunControl] = None,
+                     wait_stats: Optional[wait_engine.WaitStats] = None) -> "AsyncSession":
+        value = await client.request("POST", "/session", _capabilities(profile))
+        session = cls(client, value["sessionId"], control, wait_stats)
+        await session._install_network_tracker()
+        return session
+
+    async def _install_network_tracker(self) -> None:
+        """在每個新文件載入前注入 fetch/XHR 追蹤 (chromedriver 的 CDP 端點)"""
+        try:
+            await self._command("POST", "/goog/cdp/execute", {"cmd": "Page.addScriptToEvaluateOnNewDocument",
+                                                             "params": {"source": wait_engine.NETWORK_TRACKER_SCRIPT}})
+        except WebDriverError as e:
+            logging.debug(f"無法預先注入網路請求追蹤: {str(e)}")
+
+    async def quit(self) -> None:
+        try:
+            await self.client.request("DELETE", f"/session/{self.session_id}")
+        except Exception as e:
+            logging.warning(f"關閉 WebDriver 工作階段時發生錯誤: {str(e)}")
+
+    # WebDriver 基本操作
+    async def _command(self, method: str, path: str, payload: Any = None) -> Any:
+        return await self.client.request(method, f"/session/{self.session_id}{path}", payload)
+
+    async def _find(self, locator: Tuple[str, str]) -> str:
+        value = await self._command("POST", "/element", {"using": locator[0], "value": locator[1]})
+        return value[ELEMENT_KEY]
+
+    async def _element(self, method: str, element: str, path: str, payload: Any = None) -> Any:
+        return await self._command(method, f"/element/{element}{path}", payload)
+
+    async def _script(self, script: str, *args) -> Any:
+        return await self._command("POST", "/execute/sync", {"script": script, "args": list(args)})
+
+    async def _async_script(self, script: str, *args) -> Any:
+        return await self._command("POST", "/execute/async", {"script": script, "args": list(args)})
+
+    async def _sleep(self, seconds: float) -> None:
+        """可中斷的等待: 分段休眠並檢查停止事件與截止時間"""
+        end = time.monotonic() + self.run_control.remaining(seconds)
+        while True:
+            self.run_control.check()
+            left = end - time.monotonic()
+            if left <= 0:
+                break
+            await asyncio.sleep(min(left, RunControl.POLL_INTERVAL))
+        self.run_control.check()
+
+    async def _wait_until(self, condition: Callable, timeout: float) -> Any:
+        """輪詢條件直到為真或逾時 (逾時返回 None)，找不到元素的錯誤視為條件未成立"""
+        deadline = time.monotonic() + self.run_control.remaining(timeout)
+        while True:
+            self.run_control.check()
+            try:
+                result = await condition()
+                if result:
+                    return result
+            except WebDriverError as e:
+                if e.error not in ("no such element", "stale element reference"):
+                    raise
+            if time.monotonic() >= deadline:
+                return None
+            await self._sleep(POLL_INTERVAL)
+
+    async def _settle(self, budget: float, condition: Callable) -> bool:
+        """取代固定秒數的等待: 條件成立即繼續，最多等待原本的 budget 秒 (與 SeleniumHandler._settle 相同)"""
+        start_time = time.perf_counter()
+        deadline = time.monotonic() + self.run_control.remaining(budget)
+        settled = False
+        while True:
+            self.run_control.check()
+            try:
+                if await condition():
+                    settled = True
+                    break
+            except WebDriverError:
+                pass
+            if time.monotonic() >= deadline:
+                break
+            await self._sleep(utils.SETTLE_POLL_INTERVAL)
+        self.wait_stats.record(budget, time.perf_counter() - start_time, settled)
+        return settled
+
+    async def _run_sliced(self, timeout: float, script: str, *args) -> Any:
+        """分段執行非同步等待腳本 (與 SeleniumHandler._run_sliced 相同)"""
+        deadline = time.monotonic() + self.run_control.remaining(timeout)
+        while True:
+            self.run_control.check()
+            slice_seconds = min(utils.WATCH_SLICE_SECONDS, deadline - time.monotonic())
+            if slice_seconds <= 0:
+                break
+            try:
+                result = await self._async_script(script, *args, int(slice_seconds * 1000))
+            except WebDriverError as e:
+                if e.error != "javascript error":
+                    raise
+                # 頁面在等待期間重新載入，下一段在新頁面上繼續
+                await self._sleep(utils.SETTLE_POLL_INTERVAL)
+                continue
+            if result:
+                return result
+        self.run_control.check()
+        return False
+
+    async def _watch(self, mode: str, target: Any, timeout: float) -> Any:
+        """以頁面內的 MutationObserver 等待條件成立 (與 SeleniumHandler._watch 相同)"""
+        token = wait_engine.new_watch_token()
+        try:
+            result = await self._run_sliced(timeout, wait_engine.WATCH_SCRIPT, mode, target, token)
+        except WebDriverError as e:
+            if e.error == "stale element reference":
+                return "detached"
+            raise
+
+        if not result and mode == "change":
+            try:
+                await self._script(wait_engine.WATCH_CLEAR_SCRIPT, token)
+            except WebDriverError:
+                pass
+        return result
+
+    async def _page_settled(self) -> bool:
+        return await self._script(wait_engine.PAGE_SETTLED_SCRIPT, utils.DOM_QUIET_MS)
+
+    def _scroll_settled(self) -> Callable:
+        last = []
+        async def condition() -> bool:
+            position = await self._script(wait_engine.SCROLL_POSITION_SCRIPT)
+            settled = last == [position]
+            last[:] = [position]
+            return settled
+        return condition
+
+    async def _wait_clickable(self, locator: Tuple[str, str], timeout: float = utils.DEFAULT_WAIT_TIME) -> Optional[str]:
+        async def clickable():
+            element = await self._find(locator)
+            if (await self._element("GET", element, "/displayed")
+                    and await self._element("GET", element, "/enabled")):
+                return element
+            return None
+        return await self._wait_until(clickable, timeout)
+
+    async def _wait_present(self, locator: Tuple[str, str], timeout: float = utils.DEFAULT_WAIT_TIME) -> Optional[str]:
+        return await self._wait_until(lambda: self._find(locator), timeout)
+
+    async def _wait_body(self) -> bool:
+        return await self._wait_present(("css selector", "body")) is not None
+
+    # 指令執行
+    async def execute_instruction(self, instruction: Instruction) -> bool:
+        """執行已編譯的指令 (與 SeleniumHandler.execute_instruction 相同的參數轉換)
+
+        可合併的唯讀驗證以 verify_batch 的批次腳本執行並由共用的 verify_batch.judge 判斷，其他指令呼叫同名的方法。
+        """
+        if instruction.error:
+            logging.error(f"命令 {instruction.cmd} 無法執行: {instruction.error}")
+            return False
+        if instruction.spec is None:
+            logging.warning(f"未知命令: {instruction.cmd}")
+            return False
+        if verify_batch.is_batchable(instruction):
+            return (await self.execute_verify_batch([instruction]))[0]
+        self.run_control.check()
+
+        method_name = getattr(instruction.spec.handler, "__name__", None)
+        if method_name not in ASYNC_METHODS:
+            # 經 restrict_to_async 編譯的指令不會執行到此
+            logging.error(f"非同步執行不支援命令: {instruction.cmd}")
+            return False
+        try:
+            return bool(await getattr(self, method_name)(*instruction.args))
+        except Exception as e:
+            logging.error(f"執行命令 {instruction.cmd} 時發生錯誤: {str(e)}")
+            return False
+
+    async def execute_group(self, group: List[Instruction]) -> List[bool]:
+        """執行 verify_batch.group_instructions 產生的一組指令，返回每個指令的結果"""
+        if len(group) == 1:
+            return [await self.execute_instruction(group[0])]
+        return await self.execute_verify_batch(group)
+
+    async def execute_verify_batch(self, instructions: List[Instruction]) -> List[bool]:
+        """以一次腳本呼叫執行連續的唯讀驗證 (與 SeleniumHandler.execute_verify_batch 相同的腳本與判斷)
+
+        元素尚未出現的元素驗證只重新檢查這些元素，直到出現或超過預設等待時間。
+        """
+        self.run_control.check()
+        checks = [verify_batch.build_check(instruction, _parse_selector) for instruction in instructions]
+        script_checks = [check for check in checks if check is not None]
+        need_text = verify_batch.needs_text(instructions)
+        try:
+            result = await self._run_sliced(utils.DEFAULT_WAIT_TIME, verify_batch.BATCH_WHEN_LOADED_SCRIPT,
+                                            script_checks, need_text)
+            if not result:
+                logging.warning("等待超時: 頁面未完全載入")
+                result = await self._script(verify_batch.BATCH_SCRIPT, script_checks, need_text)
+        except WebDriverError as e:
+            logging.error(f"批次驗證無法執行: {str(e)}")
+            return [False] * len(instructions)
+
+        returned = iter(result["results"])
+        outcomes = [next(returned) if check is not None else None for check in checks]
+        judged = [verify_batch.judge(instruction, outcome, result.get("text"))
+                  for instruction, outcome in zip(instructions, outcomes)]
+
+        waiting = [index for index, value in enumerate(judged)
+                   if value is None and verify_batch.awaits_element(instructions[index], outcomes[index])]
+        deadline = time.monotonic() + self.run_control.remaining(utils.DEFAULT_WAIT_TIME)
+        while waiting and time.monotonic() < deadline:
+            await self._sleep(POLL_INTERVAL)
+            try:
+                rechecked = await self._script(verify_batch.BATCH_SCRIPT, [checks[index] for index in waiting], False)
+            except WebDriverError:
+                # 頁面正在重新載入，下一次再檢查
+                continue
+            for index, outcome in zip(list(waiting), rechecked["results"]):
+                outcomes[index] = outcome
+                if not verify_batch.awaits_element(instructions[index], outcome):
+                    judged[index] = verify_batch.judge(instructions[index], outcome, None)
+                    waiting.remove(index)
+
+        return [verify_batch.report_unresolved(instruction, outcome) if value is None else value
+                for instruction, outcome, value in zip(instructions, outcomes, judged)]
+
+    # 基本操作指令
+    async def open_html_page(self, url_path: str) -> bool:
+        """打開本地 HTML 頁面"""
+        file_url = utils.resolve_html_url(url_path)
+        if not file_url:
+            return False
+
+        await self._command("POST", "/url", {"url": file_url})
+        if not await self._wait_body():
+            logging.error("頁面載入超時")
+            return False
+        await self._settle(2, self._page_settled)  # 等待載入完成、動畫結束且 DOM 穩定
+        logging.info("頁面已成功載入")
+        return True
+
+    async def refresh_page(self) -> bool:
+        """重新整理頁面"""
+        await self._command("POST", "/refresh", {})
+        logging.info("頁面已重新整理")
+        if not await self._wait_body():
+            return False
+        await self._settle(1, self._page_settled)
+        return True
+
+    async def go_back(self) -> bool:
+        """返回上一頁"""
+        await self._command("POST", "/back", {})
+        logging.info("已返回上一頁")
+        if not await self._wait_body():
+            return False
+        await self._settle(1, self._page_settled)
+        return True
+
+    async def _click(self, locator: Tuple[str, str], description: str) -> bool:
+        element = await self._wait_clickable(locator)
+        if element is None:
+            logging.error(f"找不到{description}的元素")
+            return False
+        await self._element("POST", element, "/click", {})
+        logging.info(f"已點擊{description}的元素")
+        return True
+
+    async def click_by_id(self, element_id: str) -> bool:
+        """點擊指定ID的元素"""
+        return await self._click(("css selector", f"[id={json.dumps(element_id)}]"), f"ID為 {element_id} ")
+
+    async def click_by_text(self, text: str) -> bool:
+        """點擊顯示指定文字的元素"""
+        xpath = f"//*[normalize-space(text())={utils.xpath_literal(text)}]"
+        return await self._click(("xpath", xpath), f"文字為 '{text}' ")
+
+    async def click_by_css(self, css_selector: str) -> bool:
+        """通過 CSS 選擇器點擊元素"""
+        return await self._click(("css selector", css_selector), f" CSS 選擇器 '{css_selector}' ")
+
+    async def type_text(self, text: str) -> bool:
+        """在當前焦點元素中輸入文字"""
+        active = await self._command("GET", "/element/active")
+        await self._element("POST", active[ELEMENT_KEY], "/value", {"text": text})
+        logging.info(f"已輸入文字: {text}")
+        return True
+
+    async def wait_seconds(self, seconds: int) -> bool:
+        """等待指定秒數 (不佔用執行緒)"""
+        await self._sleep(seconds)
+        logging.info(f"已等待 {seconds} 秒")
+        return True
+
+    # 等待指令
+    async def wait_for_text(self, text: str, max_wait_time: int = None) -> bool:
+        """等待文字出現 (由頁面內的 MutationObserver 判斷，不需反覆傳回整份 page_source)"""
+        if await self._watch("text", text, max_wait_time or utils.DEFAULT_WAIT_TIME):
+            logging.info(f"等待成功: 文字 '{text}' 已出現")
+            return True
+        logging.warning(f"等待超時: 文字 '{text}' 未出現")
+        return False
+
+    async def wait_for_element(self, selector, max_wait_time: int = None) -> bool:
+        """等待元素出現"""
+        if await self._wait_present(_locator(selector), max_wait_time or utils.DEFAULT_WAIT_TIME) is not None:
+            logging.info(f"等待成功: 元素 '{selector}' 已出現")
+            return True
+        logging.warning(f"等待超時: 元素 '{selector}' 未出現")
+        return False
+
+    async def wait_for_page_load(self, max_wait_time: int = None) -> bool:
+        """等待頁面完全載入"""
+        async def complete():
+            return await self._script("return document.readyState") == "complete"
+        if await self._wait_until(complete, max_wait_time or utils.DEFAULT_WAIT_TIME):
+            logging.info("等待成功: 頁面已完全載入")
+            return True
+        logging.warning("等待超時: 頁面未完全載入")
+        return False
+
+    async def wait_for_network_idle(self, max_wait_time: float = None, quiet_ms: int = None) -> bool:
+        """等待網路閒置: 沒有進行中的 fetch/XHR 請求且持續 quiet_ms 毫秒"""
+        if await self._run_sliced(max_wait_time or utils.DEFAULT_WAIT_TIME, wait_engine.NETWORK_IDLE_SCRIPT,
+                                  quiet_ms or utils.NETWORK_QUIET_MS):
+            logging.info("等待成功: 網路請求已全部完成")
+            return True
+        logging.warning(f"等待超時: {max_wait_time or utils.DEFAULT_WAIT_TIME} 秒內網路請求未停止")
+        return False
+
+    # 頁面導航與互動
+    async def scroll_to_bottom(self) -> bool:
+        """滾動到頁面底部"""
+        await self._script("window.scrollTo(0, document.body.scrollHeight);")
+        await self._settle(1, self._scroll_settled())  # 等待滾動完成
+        logging.info("已滾動到頁面底部")
+        return True
+
+
+    async def execute_nav_sequence(self, instructions: List[Instruction]) -> bool:
+        """執行導航序列 (已編譯的子指令區塊，可巢狀；連續的驗證合併執行)"""
+        success = True
+        for group in verify_batch.group_instructions(instructions):
+            for instruction, result in zip(group, await self.execute_group(group)):
+                if not result:
+                    logging.warning(f"導航序列命令 '{instruction.cmd}' 執行失敗")
+                    success = False
+        return success
+
+    async def run_data_driven(self, block: command_program.DataDrivenBlock) -> bool:
+        """對資料檔每一列依序執行資料驅動區塊 (非同步模式下由本工作階段逐列執行)"""
+        if not os.path.exists(block.source):
+            logging.error(f"找不到資料檔: {block.source}")
+            return False
+
+        passed = failed = 0
+        for row_no, row in enumerate(data_driven.iter_rows(block.source), 1):
+            row_passed = True
+            for group in verify_batch.group_instructions(block.bind(row)):
+                if not all(await self.execute_group(group)):
+                    row_passed = False
+            if row_passed:
+                passed += 1
+            else:
+                failed += 1
+            logging.info(f"資料列 {row_no}: {'通過' if row_passed else '失敗'}")
+
+        if passed + failed == 0:
+            logging.warning(f"資料檔 {block.source} 沒有可執行的資料列")
+            return False
+        logging.info(f"資料驅動執行完成: {passed} 列通過, {failed} 列失敗")
+        return failed == 0
+
+    # 測試案例相關 (與 SeleniumHandler 相同的日誌)
+    async def log_test_case(self, name: str = "未指定") -> bool:
+        logging.info(f"執行測試案例: {name}")
+        return True
+
+    async def log_description(self, description: str = "未指定") -> bool:
+        logging.info(f"測試描述: {description}")
+        return True
+
+    async def log_severity(self, severity: str = "未指定") -> bool:
+        logging.info(f"嚴重程度: {severity}")
+        return True
+
+async def run_async(instructions, sessions: int, chromedriver_path: str,
+                    on_result: Callable[[CaseResult], None],
+                    should_continue: Callable[[], bool] = lambda: True,
+                    profile: str = utils.DEFAULT_BROWSER_PROFILE,
+                    control: Optional[RunControl] = None,
+                    wait_stats: Optional[wait_engine.WaitStats] = None) -> List[CaseResult]:
+    """在單一事件迴圈中以多個瀏覽器工作階段同時執行測試案例，結果依腳本順序交給 on_result
+
+    所有工作階段共用一個 chromedriver 程序與保持連線的 HTTP 連線池。
+    非同步執行不支援的指令在編譯時 (restrict_to_async) 改為錯誤指令，該步驟記錄為失敗。
+    第一個 TEST_CASE 之前的前置步驟在每個工作階段各執行一次，第一次的結果列為案例 0。
+    control 停止或超過截止時間時，所有工作階段中正在等待的指令會立即中斷。
+    """
+    control = control or RunControl()
+    wait_stats = wait_stats or wait_engine.WaitStats()
+    groups = split_test_cases(restrict_to_async(instructions))
+    first_group = next(groups, None)
+    if first_group is None:
+        return []
+
+    setup: List[Instruction] = []
+    if first_group[0].cmd != "TEST_CASE":
+        setup = first_group
+        cases = enumerate(groups, 1)
+    else:
+        cases = enumerate(chain([first_group], groups))
+
+    service = ChromedriverService(chromedriver_path)
+    await service.start()
+    client = AsyncHTTPClient("127.0.0.1", service.port, max(1, sessions))
+    start_limit = asyncio.Semaphore(SESSION_START_CONCURRENCY)
+
+    results: Dict[int, CaseResult] = {}
+    emitted: List[CaseResult] = []
+    next_index = 0
+    setup_reported = False
+
+    def emit_ready() -> None:
+        nonlocal next_index
+        while next_index in results:
+            result = results.pop(next_index)
+            emitted.append(result)
+            on_result(result)
+            next_index += 1
+
+    async def run_case(session: AsyncSession, index: int, case: List[Instruction]) -> CaseResult:
+        # 與 parallel_runner.run_case 相同: 連續的唯讀驗證合併為一次腳本呼叫
+        result = CaseResult(index, case_name(case))
+        start_time = time.perf_counter()
+        for group in verify_batch.group_instructions(case):
+            if not should_continue():
+                break
+            try:
+                outcomes = await session.execute_group(group)
+            except RunCancelled as e:
+                result.steps.extend((f"{instruction.display_text()} ({str(e)})", False) for instruction in group)
+                break
+            result.steps.extend((instruction.display_text(), success) for instruction, success in zip(group, outcomes))
+        result.duration = time.perf_counter() - start_time
+        return result
+
+    async def worker() -> None:
+        nonlocal setup_reported
+        session = None
+        try:
+            while should_continue() and not control.cancelled:
+                # 事件迴圈為單執行緒，多個工作協程可直接共用同一個案例產生器
+                item = next(cases, None)
+                if item is None:
+                    return
+                index, case = item
+
+                if session is None:
+                    async with start_limit:
+                        session = await AsyncSession.create(client, profile, control, wait_stats)
+                    if setup:
+                        setup_result = await run_case(session, 0, setup)
+                        if not setup_reported:
+                            setup_reported = True
+                            results[0] = setup_result
+                            emit_ready()
+
+                results[index] = await run_case(session, index, case)
+                emit_ready()
+        finally:
+            if session is not None:
+                await session.quit()
+
+    try:
+        outcomes = await asyncio.gather(*(worker() for _ in range(max(1, sessions))), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                logging.error(f"非同步工作階段執行錯誤: {str(outcome)}")
+    finally:
+        await client.close()
+        await service.stop()
+
+    # 停止或工作階段異常時，依序回報已完成的案例
+    for index in sorted(results):
+        emitted.append(results[index])
+        on_result(results[index])
+    return emitted
+
+def run(instructions, sessions: int, chromedriver_path: str, on_result: Callable[[CaseResult], None],
+        should_continue: Callable[[], bool] = lambda: True,
+        profile: str = utils.DEFAULT_BROWSER_PROFILE,
+        control: Optional[RunControl] = None,
+        wait_stats: Optional[wait_engine.WaitStats] = None) -> List[CaseResult]:
+    """在目前執行緒建立事件迴圈並執行 run_async"""
+    return asyncio.run(run_async(instructions, sessions, chromedriver_path, on_result, should_continue,
+                                 profile, control, wait_stats))
+
+def main() -> int:
+    """命令列執行: python async_runner.py --sessions 50 [命令檔]"""
+    parser = argparse.ArgumentParser(description="以單一事件迴圈驅動多個瀏覽器工作階段執行測試案例")
+    parser.add_argument("command_file", nargs="?", default=utils.COMMAND_FILE)
+    parser.add_argument("--sessions", type=int, default=utils.DEFAULT_ASYNC_SESSIONS)
+    parser.add_argument("--chromedriver", default=os.path.join(os.getcwd(), "chromedriver.exe"))
+    parser.add_argument("--profile", default=None, help="瀏覽器執行設定檔，可用 + 組合 (例如 headless+no-images)")
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    settings = utils.load_settings()
+    command_registry.load_plugins(settings.get("command_plugins", []))
+    profile = args.profile or settings.get("browser_profile", utils.DEFAULT_BROWSER_PROFILE)
+    try:
+        utils.get_browser_profile(profile)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def on_result(result: CaseResult) -> None:
+        logging.info(f"{'✓' if result.passed else '✗'} {result.name} ({result.duration:.1f} 秒)")
+
+    pattern_errors = command_program.check_patterns(args.command_file)
+    if pattern_errors:
+        parser.error("\n".join(pattern_errors))
+
+    start_time = time.perf_counter()
+    wait_stats = wait_engine.WaitStats()
+    results = run(command_program.iter_program(args.command_file), args.sessions, args.chromedriver,
+                  on_result, profile=profile, wait_stats=wait_stats)
+    report = build_report(results, "async", time.perf_counter() - start_time, profile=profile,
+                          sessions=args.sessions, waits=wait_stats.snapshot())
+    utils.write_run_report(report)
+    return 0 if report["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
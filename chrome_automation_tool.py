@@ -6,21 +6,40 @@ import sys
 import time
 import threading
 import logging
+import argparse
+import multiprocessing
 import traceback
 from typing import List, Optional, Tuple, Dict, Any
 from selenium.webdriver.common.by import By
 
 # 導入自定義模塊
 import utils
+import command_program
+import command_registry
 from step_window import StepWindow
 from selenium_handler import SeleniumHandler
 from command_editor import CommandEditor
+import parallel_runner
+import shard_runner
+import async_runner
+import verify_batch
+from session_pool import SessionPool
+from ui_events import UIEventQueue
+from run_control import RunCancelled
 
 # 初始化日誌
 utils.setup_logging()
 
+class StepRef:
+    """步驟視窗中的一個步驟: 工作執行緒持有的代號，索引由主執行緒新增步驟時填入"""
+    __slots__ = ("text", "index")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.index = -1
+
 class ChromeAutomationTool:
-    def __init__(self, root: tk.Tk) -> None:
+    def __init__(self, root: tk.Tk, profile: Optional[str] = None) -> None:
         self.root = root
         self.root.title("Chrome 自動化工具")
         self.root.geometry(f"{utils.WINDOW_WIDTH}x{utils.WINDOW_HEIGHT}")
@@ -34,15 +53,43 @@ class ChromeAutomationTool:
         self.keywords: List[str] = []
         self.test_results: Dict[str, bool] = {}
         
+        # 執行緒安全的 UI 更新通道 (工作執行緒只放入佇列，由主執行緒分批套用)
+        self.ui_events = UIEventQueue(root)
+        self.ui_events.start()
+        self._pending_log: List[str] = []
+        self._log_lock = threading.Lock()
+        self._step_count = 0
+        
         # 載入設置
         self.settings = utils.load_settings()
         self.font_size = self.settings.get("font_size", utils.DEFAULT_FONT_SIZE)
         
+        # 載入外部指令擴充模組
+        command_registry.load_plugins(self.settings.get("command_plugins", []))
+        
+        # 瀏覽器執行設定檔: 命令列參數優先，其次為設定檔
+        self.profile = profile or self.settings.get("browser_profile", utils.DEFAULT_BROWSER_PROFILE)
+        try:
+            utils.get_browser_profile(self.profile)
+        except ValueError as e:
+            logging.error(f"{str(e)}，改用預設設定檔")
+            self.profile = utils.DEFAULT_BROWSER_PROFILE
+        self.selenium_handler.profile = self.profile
+        
+        # WebDriver 工作階段池: 執行結束後保留瀏覽器，下次執行直接重複使用
+        self.session_pool = SessionPool(
+            lambda profile: self.selenium_handler.create_driver(profile),
+            max_idle=self.settings.get("session_pool_size", utils.SESSION_POOL_SIZE),
+            idle_ttl=self.settings.get("session_idle_ttl", utils.SESSION_IDLE_TTL))
+        self.selenium_handler.session_pool = self.session_pool
+        
         # 建立 UI
         self.create_ui()
         
         # 自動尋找 chromedriver.exe
         self.find_chromedriver()
+        if self.selenium_handler.chromedriver_path and self.settings.get("prewarm_sessions", False):
+            self.session_pool.prewarm(key=self.profile)
         
         # 綁定關閉事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -325,9 +372,6 @@ class ChromeAutomationTool:
         # 顯示步驟視窗
         self.show_step_window()
         
-        # 讀取關鍵字
-        self.keywords = utils.load_keywords_from_command()
-        
         # 基本步驟
         basic_steps = [
             "初始化 Chrome WebDriver",
@@ -338,13 +382,11 @@ class ChromeAutomationTool:
             "互動按鈕測試"
         ]
         
-        # 關鍵字搜尋步驟
-        keyword_steps = []
-        for keyword in self.keywords:
-            keyword_steps.append(f"搜尋關鍵字: {keyword}")
+        # 關鍵字於執行時隨命令串流收集 (不列為步驟，執行結束後更新)
+        self.keywords = []
         
         # 合併所有步驟
-        all_steps = basic_steps + keyword_steps + ["測試完成"]
+        all_steps = basic_steps + ["測試完成"]
         
         # 設定步驟列表
         if self.step_window:
@@ -359,20 +401,26 @@ class ChromeAutomationTool:
             messagebox.showerror("錯誤", "未找到 chromedriver.exe，請確保它與程式在同一目錄")
     
     def add_log(self, message: str) -> None:
-        """新增日誌訊息"""
+        """新增日誌訊息 (可由任何執行緒呼叫，畫面更新由 UI 事件佇列分批處理)"""
         timestamp = time.strftime("%H:%M:%S")
         log_message = f"[{timestamp}] {message}"
         
         # 顯示在 UI 上
-        self.log_text.insert(tk.END, f"{log_message}\n")
-        self.log_text.see(tk.END)
-        
-        # 更新 UI
-        self.root.update_idletasks()
+        with self._log_lock:
+            self._pending_log.append(log_message)
+        self.ui_events.post_latest("log", self._flush_log)
         
         # 寫入日誌檔
         logging.info(message)
     
+    def _flush_log(self) -> None:
+        """將累積的日誌訊息一次插入日誌區"""
+        with self._log_lock:
+            lines, self._pending_log = self._pending_log, []
+        if lines:
+            self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+            self.log_text.see(tk.END)
+    
     def save_settings(self) -> None:
         """保存設置"""
         self.settings["font_size"] = self.font_size
@@ -442,6 +490,12 @@ class ChromeAutomationTool:
         if not self.selenium_handler:
             logging.info("創建新的 SeleniumHandler 實例")
             self.selenium_handler = SeleniumHandler()
+            self.selenium_handler.session_pool = self.session_pool
+            self.selenium_handler.profile = self.profile
+        
+        # 開始新的執行: 清除取消狀態並設定整體執行時間上限 (run_timeout 秒，未設定則不限)
+        self.selenium_handler.run_control.start(self.settings.get("run_timeout"))
+        self.selenium_handler.wait_stats.reset()
         
         # 確保 chromedriver 路徑正確
         if not self.selenium_handler.find_chromedriver():
@@ -450,17 +504,19 @@ class ChromeAutomationTool:
             self.reset_ui()
             return
             
-        if not self.selenium_handler.initialize_driver():
-            logging.error("初始化 WebDriver 失敗")
-            self.add_log("錯誤: 初始化 WebDriver 失敗")
-            self.reset_ui()
-            return
+        # 只有依序執行時在主工作階段上先開啟測試頁面；平行、分片與非同步執行由各工作階段自行建立
+        if self._execution_counts() == (1, 1, 1):
+            if not self.selenium_handler.initialize_driver():
+                logging.error("初始化 WebDriver 失敗")
+                self.add_log("錯誤: 初始化 WebDriver 失敗")
+                self.reset_ui()
+                return
             
-        if not self.selenium_handler.open_html_page("web/360_TEST_WEBFILE.html"):
-            logging.error("開啟測試頁面失敗")
-            self.add_log("錯誤: 開啟測試頁面失敗")
-            self.reset_ui()
-            return
+            if not self.selenium_handler.open_html_page("web/360_TEST_WEBFILE.html"):
+                logging.error("開啟測試頁面失敗")
+                self.add_log("錯誤: 開啟測試頁面失敗")
+                self.reset_ui()
+                return
         
         # 添加調試日誌
         logging.info("準備啟動自動化執行線程")
@@ -480,77 +536,208 @@ class ChromeAutomationTool:
             self.reset_ui()
     
     def stop_automation(self) -> None:
-        """停止自動化測試"""
+        """停止自動化測試 (正在等待的指令會在 0.1 秒內中斷)"""
         self.is_running = False
+        self.selenium_handler.run_control.cancel()
         self.status.set("停止中...")
         self.add_log("正在停止自動化測試...")
     
+    def _execution_counts(self) -> Tuple[int, int, int]:
+        """返回 (分片程序數, 非同步工作階段數, 平行工作階段數)，皆為 1 時依序執行"""
+        shards = max(1, int(self.settings.get("shard_processes", utils.DEFAULT_SHARD_PROCESSES)))
+        async_sessions = max(1, int(self.settings.get("async_sessions", utils.DEFAULT_ASYNC_SESSIONS)))
+        workers = max(1, int(self.settings.get("parallel_sessions", utils.DEFAULT_PARALLEL_SESSIONS)))
+        return shards, async_sessions, workers
+    
     def run_automation(self) -> None:
         """執行自動化測試"""
         try:
-            # 初始化 WebDriver
-            if not self.selenium_handler.initialize_driver():
-                self.add_log("錯誤: 無法初始化 WebDriver")
-                self.reset_ui()
+            shards, async_sessions, workers = self._execution_counts()
+            
+            # 執行前檢查所有正則表達式，避免長時間執行到一半才發現模式錯誤
+            pattern_errors = command_program.check_patterns()
+            if pattern_errors:
+                for error in pattern_errors:
+                    self.add_log(f"錯誤: {error}")
+                self.add_log("錯誤: 命令檔含有無效的正則表達式，未執行任何命令")
                 return
             
-            # 讀取命令
-            commands = utils.read_commands()
-            if not commands:
-                self.add_log("錯誤: 沒有可執行的命令")
-                self.reset_ui()
+            # 初始化 WebDriver (start_automation 已取得工作階段時沿用；分片與非同步執行時自行建立工作階段)
+            if shards == 1 and async_sessions == 1 and not self.selenium_handler.driver and not self.selenium_handler.initialize_driver():
+                self.add_log("錯誤: 無法初始化 WebDriver")
                 return
             
             # 初始化步驟視窗
-            if not self.step_window:
-                self.step_window = StepWindow(self.root, self.font_size)
-            else:
-                self.step_window.show_window()
+            self.ui_events.post(self._reset_step_window)
             
-            # 設置步驟
-            steps = [f"{cmd}: {', '.join(params)}" for cmd, params in commands]
-            self.step_window.set_steps(steps)
+            # 串流讀取並編譯命令，解析的同時即開始執行 (內容未變更時使用快取)
+            keyword_collector = utils.KeywordCollector()
+            executed_count = 0
             
-            # 執行命令
-            for i, (cmd, params) in enumerate(commands):
-                if not self.is_running:
-                    break
+            def instructions():
+                nonlocal executed_count
+                for instruction in command_program.iter_program():
+                    # 關鍵字由原始行收集 (含導航序列與資料驅動區塊內的命令)
+                    for item in command_program.iter_nested(instruction):
+                        keyword_collector.add(item.cmd, item.params, item.line)
+                    executed_count += 1
+                    yield instruction
+            
+            start_time = time.perf_counter()
+            report_extra = {"profile": self.profile}
+            if shards > 1:
+                self.add_log(f"以 {shards} 個工作程序分片執行測試案例")
+                results, shard_names = shard_runner.run_sharded(
+                    instructions(), shards, self.selenium_handler.chromedriver_path,
+                    self._show_case_result, self._should_continue,
+                    plugins=self.settings.get("command_plugins", []),
+                    history=self.settings.get("case_durations", {}), profile=self.profile,
+                    wait_stats=self.selenium_handler.wait_stats)
+                mode = "sharded"
+                report_extra.update(shards=len(shard_names), shard_assignments=shard_names)
+            elif async_sessions > 1:
+                self.add_log(f"以單一事件迴圈驅動 {async_sessions} 個瀏覽器工作階段執行測試案例")
+                results = async_runner.run(instructions(), async_sessions, self.selenium_handler.chromedriver_path,
+                                           self._show_case_result, self._should_continue, profile=self.profile,
+                                           control=self.selenium_handler.run_control,
+                                           wait_stats=self.selenium_handler.wait_stats)
+                mode = "async"
+                report_extra.update(sessions=async_sessions)
+            elif workers > 1:
+                self.add_log(f"以 {workers} 個瀏覽器工作階段平行執行測試案例")
+                results = []
+                
+                def on_result(result: parallel_runner.CaseResult) -> None:
+                    results.append(result)
+                    self._show_case_result(result)
                 
-                try:
-                    self.step_window.set_current_step(i)
-                    self.update_action(f"執行: {cmd}")
-                    
-                    # 執行命令
-                    success = self._execute_command(cmd, params)
-                    
-                    # 更新步驟狀態
-                    if success:
-                        self.step_window.mark_step_passed(i)
-                        self.add_log(f"✓ {cmd}: {', '.join(params)}")
-                    else:
-                        self.step_window.mark_step_failed(i)
-                        self.add_log(f"✗ {cmd}: {', '.join(params)}")
-                    
-                    # 更新測試結果摘要
-                    self.step_window.update_summary()
-                    self.update_summary()
-                    
-                except Exception as e:
-                    self.step_window.mark_step_failed(i)
-                    self.add_log(f"錯誤: {cmd} 執行失敗 - {str(e)}")
-                    logging.error(f"命令執行錯誤: {str(e)}")
-                    continue
+                parallel_runner.run_parallel(instructions(), self.selenium_handler, workers,
+                                             on_result, self._should_continue)
+                mode = "parallel"
+                report_extra.update(sessions=workers)
+            else:
+                results = self._run_serial(instructions())
+                mode = "serial"
+            
+            # 本次執行收集到的關鍵字 (最多 MAX_KEYWORDS 個)
+            self.keywords = keyword_collector.result()
             
+            if executed_count == 0:
+                self.add_log("錯誤: 沒有可執行的命令")
+            else:
+                # 寫入執行報告 (記錄瀏覽器設定檔以便比較耗時)，並保存各案例耗時供分片分配參考
+                waits = self.selenium_handler.wait_stats.snapshot()
+                if waits["replaced"]:
+                    self.add_log(f"條件等待取代固定等待 {waits['replaced']} 次，節省 {waits['saved_seconds']:.1f} 秒")
+                report = parallel_runner.build_report(results, mode, time.perf_counter() - start_time,
+                                                      waits=waits, **report_extra)
+                report_file = utils.write_run_report(report)
+                if report_file:
+                    self.add_log(f"執行報告: {report_file}")
+                shard_runner.record_case_durations(self.settings, results)
+            
+        except RunCancelled as e:
+            self.add_log(f"自動化執行已中斷: {str(e)}")
+            logging.warning(f"自動化執行已中斷: {str(e)}")
         except Exception as e:
             self.add_log(f"自動化執行過程中發生錯誤: {str(e)}")
             logging.error(f"自動化執行錯誤: {str(e)}")
         finally:
-            self.reset_ui()
-            self.selenium_handler.close_driver()
+            self.ui_events.post(self.reset_ui)
+            self.selenium_handler.release_driver()
+    
+    def _run_serial(self, instructions) -> List[parallel_runner.CaseResult]:
+        """在單一瀏覽器工作階段上依序執行指令，返回依 TEST_CASE 分組的結果"""
+        results: List[parallel_runner.CaseResult] = []
+        case_start = time.perf_counter()
+        # 連續的唯讀驗證合併為一組，以一次腳本呼叫執行
+        for group in verify_batch.group_instructions(instructions):
+            if not self._should_continue():
+                break
+            
+            instruction = group[0]
+            if not results or instruction.cmd == "TEST_CASE":
+                if results:
+                    results[-1].duration = time.perf_counter() - case_start
+                results.append(parallel_runner.CaseResult(len(results), parallel_runner.case_name([instruction])))
+                case_start = time.perf_counter()
+            
+            cmd = instruction.cmd
+            step_texts = [member.display_text() for member in group]
+            steps = [self._step_started(step_text) for step_text in step_texts]
+            try:
+                self.update_action(f"執行: {cmd}" if len(group) == 1 else f"執行: {len(group)} 個驗證")
+                
+                # 執行命令
+                outcomes = self._execute_group(group)
+            except RunCancelled as e:
+                for step in steps:
+                    results[-1].steps.append((step.text, False))
+                    self._step_finished(step, False)
+                self.add_log(f"已中斷: {cmd} - {str(e)}")
+                break
+            except Exception as e:
+                outcomes = [False] * len(group)
+                self.add_log(f"錯誤: {cmd} 執行失敗 - {str(e)}")
+                logging.error(f"命令執行錯誤: {str(e)}")
+            
+            # 更新各步驟狀態與測試結果摘要
+            for step, success in zip(steps, outcomes):
+                results[-1].steps.append((step.text, success))
+                self._step_finished(step, success)
+        
+        if results:
+            results[-1].duration = time.perf_counter() - case_start
+        return results
+    
+    def _show_case_result(self, result: parallel_runner.CaseResult) -> None:
+        """依腳本順序將平行執行的測試案例結果合併到步驟視窗與摘要"""
+        for step_text, success in result.steps:
+            self._step_finished(self._step_started(step_text), success)
+        
+        self.add_log(f"測試案例 '{result.name}' {'通過' if result.passed else '失敗'} ({result.duration:.1f} 秒)")
+    
+    def _should_continue(self) -> bool:
+        """執行器在每個步驟之間檢查是否繼續 (停止或超過執行時間上限時為 False)"""
+        return self.is_running and not self.selenium_handler.run_control.cancelled
+    
+    # 以下方法可由工作執行緒呼叫，實際的視窗更新經由 UI 事件佇列在主執行緒套用
+    def _reset_step_window(self) -> None:
+        """清空步驟視窗以開始新的執行"""
+        self._step_count = 0
+        self.show_step_window()
+        self.step_window.set_steps([])
+    
+    def _step_started(self, step_text: str) -> StepRef:
+        """新增步驟並設為目前步驟，返回步驟代號 (索引於主執行緒套用時決定)"""
+        step = StepRef(step_text)
+        self.ui_events.post(self._apply_step_started, step)
+        return step
+    
+    def _apply_step_started(self, step: StepRef) -> None:
+        step.index = self._step_count
+        self._step_count += 1
+        if self.step_window:
+            self.step_window.add_step(step.text)
+            self.step_window.set_current_step(step.index)
+    
+    def _step_finished(self, step: StepRef, success: bool) -> None:
+        """標記步驟結果並更新摘要 (摘要每個畫面週期最多更新一次)"""
+        self.ui_events.post(self._apply_step_finished, step, success)
+        self.add_log(f"{'✓' if success else '✗'} {step.text}")
+        self.ui_events.post_latest("summary", self.update_summary)
+    
+    def _apply_step_finished(self, step: StepRef, success: bool) -> None:
+        # 事件依序套用，新增步驟的事件已先填入索引
+        if self.step_window:
+            if success:
+                self.step_window.mark_step_passed(step.index)
+            else:
+                self.step_window.mark_step_failed(step.index)
     
     def update_action(self, action: str) -> None:
         """更新當前動作"""
-        self.current_action.set(action)
+        self.ui_events.post_latest("action", self.current_action.set, action)
         self.add_log(f"執行: {action}")
     
     def reset_ui(self) -> None:
@@ -567,13 +754,15 @@ class ChromeAutomationTool:
             if self.is_running:
                 self.stop_automation()
             
-            # 關閉 step_window
+            # 停止 UI 更新並關閉 step_window
+            self.ui_events.stop()
             if self.step_window:
                 self.step_window.destroy()
             
-            # 關閉 selenium driver
+            # 關閉 selenium driver 與工作階段池
             if self.selenium_handler:
                 self.selenium_handler.close_driver()
+            self.session_pool.close()
             
             # 保存設置
             self.save_settings()
@@ -585,31 +774,25 @@ class ChromeAutomationTool:
             logging.error(f"關閉程式時發生錯誤: {str(e)}")
             self.root.destroy()
     
-    def _execute_command(self, cmd: str, params: List[str]) -> bool:
-        """執行單一命令"""
+    def _execute_instruction(self, instruction: command_program.Instruction) -> bool:
+        """執行已編譯的指令"""
         if not self.selenium_handler:
             logging.error("Selenium Handler 未初始化")
             return False
-            
-        try:
-            # 特殊處理 WAIT 命令
-            if cmd == "WAIT":
-                try:
-                    import time
-                    seconds = int(params[0]) if params else 1
-                    time.sleep(seconds)
-                    logging.info(f"已等待 {seconds} 秒")
-                    return True
-                except Exception as e:
-                    logging.error(f"等待時發生錯誤: {str(e)}")
-                    return False
-            else:
-                # 其他命令轉發給 selenium_handler 執行
-                result = self.selenium_handler._execute_command(cmd, params)
-                return result
-        except Exception as e:
-            logging.error(f"執行命令 {cmd} 時發生錯誤: {str(e)}")
-            return False
+        
+        return self.selenium_handler.execute_instruction(instruction)
+    
+    def _execute_group(self, group: List[command_program.Instruction]) -> List[bool]:
+        """執行一組指令 (單一指令或合併的唯讀驗證)，返回每個指令的結果"""
+        if not self.selenium_handler:
+            logging.error("Selenium Handler 未初始化")
+            return [False] * len(group)
+        
+        return self.selenium_handler.execute_group(group)
+    
+    def _execute_command(self, cmd: str, params: List[str]) -> bool:
+        """執行單一命令 (與 SeleniumHandler 共用指令註冊表)"""
+        return self._execute_instruction(command_program.compile_command(cmd, params))
     
     def show_fullscreen_editor(self) -> None:
         """顯示全螢幕命令編輯器視窗"""
@@ -645,9 +828,18 @@ class ChromeAutomationTool:
         editor_window.destroy()
 
 def main() -> None:
+    # 打包後的執行檔需要此呼叫才能啟動分片工作程序
+    multiprocessing.freeze_support()
+    
+    # 命令列參數
+    parser = argparse.ArgumentParser(description="Chrome 自動化工具")
+    parser.add_argument("--profile", default=None,
+                        help=f"瀏覽器執行設定檔 ({', '.join(utils.BROWSER_PROFILES)})，可用 + 組合")
+    args, _ = parser.parse_known_args()
+    
     # 建立主視窗
     root = tk.Tk()
-    app = ChromeAutomationTool(root)
+    app = ChromeAutomationTool(root, profile=args.profile)
     
     # 設定圖標
     try:
@@ -663,10 +855,12 @@ def main() -> None:
     
     # 視窗關閉處理
     def on_closing() -> None:
+        app.ui_events.stop()
         if app.step_window:
             app.step_window.destroy()
         if app.selenium_handler.driver:
             app.selenium_handler.close_driver()
+        app.session_pool.close()
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -29,13 +29,15 @@ class CommandEditor:
             "點擊元素（CSS）": "CLICK_BY_CSS",
             "輸入文字": "TYPE",
             "等待時間（秒）": "WAIT",
+            "等待網路請求完成": "WAIT_FOR_NETWORK_IDLE",
             "驗證文字存在": "VERIFY_TEXT_EXISTS",
             "驗證文字不存在": "VERIFY_TEXT_NOT_EXISTS",
             "驗證文字包含": "VERIFY_TEXT_CONTAINS",
             "驗證文字相似度": "VERIFY_TEXT_SIMILAR",
             "登入帳號密碼": "LOGIN",
             "測試案例名稱": "TEST_CASE",
-            "測試案例描述": "DESCRIPTION"
+            "測試案例描述": "DESCRIPTION",
+            "資料來源檔案": "DATA_SOURCE"
         }
         
         # 反向映射表 (英文 -> 中文)
@@ -82,6 +84,20 @@ class CommandEditor:
                 "CLICK_BY_ID=submit-button",
                 "VERIFY_TEXT_EXISTS=表單提交成功"
             ],
+            "資料驅動表單填寫": [
+                "TEST_CASE=資料驅動表單填寫測試",
+                "DESCRIPTION=以資料檔的每一列填寫表單 (欄位: name, email, phone)",
+                "DATA_SOURCE=data/form_rows.csv || 2",
+                "NAVIGATE=web/360_TEST_WEBFILE.html",
+                "CLICK_BY_ID=name",
+                "TYPE=${name}",
+                "CLICK_BY_ID=email",
+                "TYPE=${email}",
+                "CLICK_BY_ID=phone",
+                "TYPE=${phone}",
+                "CLICK_BY_ID=submit-button",
+                "VERIFY_TEXT_EXISTS=表單提交成功"
+            ],
             "多欄位驗證測試": [
                 "TEST_CASE=多欄位驗證測試",
                 "DESCRIPTION=測試多個欄位的驗證功能",
@@ -103,7 +119,7 @@ class CommandEditor:
                 "CLICK_BY_ID=search-box",
                 "TYPE=測試關鍵字",
                 "CLICK_BY_ID=search-button",
-                "WAIT=2",
+                "WAIT_FOR_NETWORK_IDLE=10",
                 "VERIFY_TEXT_EXISTS=搜尋結果",
                 "VERIFY_TEXT_CONTAINS=找到 || 筆結果"
             ],
@@ -112,11 +128,18 @@ class CommandEditor:
                 "DESCRIPTION=測試等待和多重驗證功能",
                 "NAVIGATE=web/360_TEST_WEBFILE.html",
                 "CLICK_BY_ID=load-data",
-                "WAIT=3",
+                "WAIT_FOR_NETWORK_IDLE=10",
                 "VERIFY_TEXT_EXISTS=數據載入完成",
                 "VERIFY_TEXT_CONTAINS=共載入",
                 "VERIFY_TEXT_CONTAINS=筆數據"
             ],
+            "等待裝置重新開機": [
+                "TEST_CASE=韌體更新後等待裝置重新開機",
+                "DESCRIPTION=以逐漸拉長的間隔輪詢，最多等待 600 秒",
+                "CLICK_BY_ID=apply-firmware",
+                "POLL_UNTIL=selector:#login-overlay || 600 || 2 || 30",
+                "VERIFY_TEXT_EXISTS=Device Settings"
+            ],
             "元素點擊測試": [
                 "TEST_CASE=元素點擊測試",
                 "DESCRIPTION=測試不同方式的元素點擊",
@@ -483,18 +506,13 @@ class CommandEditor:
     def load_commands(self):
         """載入命令"""
         try:
-            commands_data = utils.read_commands()
+            commands_data = utils.read_commands(expand_includes=False)
             # 將命令數據轉換為純文本命令列表
             self.commands = []
-            for cmd, params in commands_data:
-                if cmd == "NAV_SEQUENCE":
-                    # 處理導航序列
-                    sequence_name = params[0]
-                    sequence_commands = params[1:]
-                    self.commands.append(f"NAV_SEQUENCE_START={sequence_name}")
-                    for seq_cmd in sequence_commands:
-                        self.commands.append(seq_cmd)
-                    self.commands.append("NAV_SEQUENCE_END")
+            for cmd, params, _ in commands_data:
+                if not params:
+                    # 不帶參數的導航序列標記，例如 NAV_SEQUENCE_END
+                    self.commands.append(cmd)
                 else:
                     # 處理一般命令
                     param_text = " || ".join(params)
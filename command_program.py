@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import pickle
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple, Iterable, Iterator
+
+import utils
+import command_registry
+
+# 編譯格式版本，指令表或 Instruction 結構變更時需遞增，使舊快取失效
+PROGRAM_FORMAT_VERSION = 12
+
+# 導航序列區塊
+NAV_BLOCK_STARTS = ("NAV_SEQUENCE_START", "NAV_SEQUENCE_DEFINE")
+# 結束資料驅動區塊的命令
+DATA_BLOCK_ENDS = ("TEST_CASE", "DATA_SOURCE", "DATA_SOURCE_END")
+# 以已編譯的子指令區塊為參數的指令
+NESTED_COMMANDS = ("NAV_SEQUENCE", "NAV_SEQUENCE_CALL")
+DEFAULT_SEQUENCE_NAME = "Navigation Sequence"
+
+# 資料驅動佔位符，例如 ${username}
+PLACEHOLDER_PATTERN = re.compile(r"\$\{(\w+)\}")
+
+class Selector:
+    """預先解析的元素選擇器"""
+    __slots__ = ("by", "value", "raw")
+
+    def __init__(self, raw: str) -> None:
+        self.raw = raw
+        self.by, self.value = parse_selector(raw)
+
+    def __str__(self) -> str:
+        return self.raw
+
+class PollCondition:
+    """POLL_UNTIL 的條件: "text:文字"、"selector:選擇器" 或 "js:運算式"，未加前綴時視為文字"""
+    __slots__ = ("kind", "value", "raw")
+
+    KINDS = ("text", "selector", "js")
+
+    def __init__(self, raw: str) -> None:
+        self.raw = raw
+        kind, sep, value = raw.partition(":")
+        kind = kind.strip().lower()
+        if sep and kind in self.KINDS:
+            self.kind, value = kind, value.strip()
+        else:
+            self.kind, value = "text", raw
+        if not value:
+            raise ValueError(f"條件 '{raw}' 缺少內容")
+        self.value = Selector(value) if self.kind == "selector" else value
+
+    def __str__(self) -> str:
+        return self.raw
+
+class Instruction:
+    """編譯後的單一指令"""
+    __slots__ = ("cmd", "params", "args", "spec", "error", "line")
+
+    def __init__(self, cmd: str, params: List[str], args: tuple = (),
+                 spec: Optional[command_registry.CommandSpec] = None, error: Optional[str] = None,
+                 line: Optional[str] = None) -> None:
+        self.cmd = cmd
+        self.params = params
+        self.args = args
+        self.spec = spec
+        self.error = error
+        # 命令檔中的原始行 (資料列套用前)，非由命令檔編譯時為 None
+        self.line = line
+
+    def display_text(self) -> str:
+        """步驟視窗與日誌使用的顯示文字"""
+        return f"{self.cmd}: {', '.join(self.params)}"
+
+    def __repr__(self) -> str:
+        return f"Instruction({self.cmd!r}, {self.params!r})"
+
+class DataDrivenBlock:
+    """DATA_SOURCE 區塊: 資料來源與需逐列套用的步驟"""
+    __slots__ = ("source", "sessions", "steps", "templated")
+
+    def __init__(self, source: str, sessions: Optional[int] = None) -> None:
+        self.source = source
+        self.sessions = sessions
+        self.steps: List[Instruction] = []
+        # 與 steps 對應，標記參數中含 ${欄位} 佔位符、需於套用資料列時重新編譯的步驟
+        self.templated: List[bool] = []
+
+    def append(self, instruction: Instruction) -> None:
+        self.steps.append(instruction)
+        self.templated.append(_is_templated(instruction))
+
+    def bind(self, row: Dict[str, str]) -> List[Instruction]:
+        """將資料列套用到步驟的 ${欄位} 佔位符，未含佔位符的步驟直接沿用已編譯結果"""
+        def replace(match) -> str:
+            column = match.group(1)
+            if column not in row:
+                logging.warning(f"資料列缺少欄位: {column}")
+                return match.group(0)
+            return str(row[column])
+
+        return [_bind_instruction(instruction, replace) if templated else instruction
+                for instruction, templated in zip(self.steps, self.templated)]
+
+def _nested_steps(instruction: Instruction) -> Optional[List[Instruction]]:
+    """導航序列 (NAV_SEQUENCE、NAV_SEQUENCE_CALL) 的子指令，其他指令返回 None"""
+    if instruction.cmd in NESTED_COMMANDS and instruction.args:
+        return instruction.args[0]
+    return None
+
+def _is_templated(instruction: Instruction) -> bool:
+    """指令本身或巢狀的子指令是否含 ${欄位} 佔位符"""
+    if any(PLACEHOLDER_PATTERN.search(param) for param in instruction.params):
+        return True
+    children = _nested_steps(instruction)
+    return children is not None and any(_is_templated(child) for child in children)
+
+def _bind_instruction(instruction: Instruction, replace) -> Instruction:
+    """套用資料列並重新編譯含佔位符的指令；導航序列只替換顯示參數並遞迴套用到子指令"""
+    params = [PLACEHOLDER_PATTERN.sub(replace, param) for param in instruction.params]
+    if instruction.cmd not in NESTED_COMMANDS:
+        return compile_command(instruction.cmd, params, instruction.line)
+
+    children = _nested_steps(instruction)
+    if children is None:
+        return Instruction(instruction.cmd, params, instruction.args, instruction.spec, instruction.error, instruction.line)
+    bound = [_bind_instruction(child, replace) if _is_templated(child) else child for child in children]
+    return Instruction(instruction.cmd, params, (bound,), instruction.spec, instruction.error, instruction.line)
+
+def iter_nested(instruction: Instruction) -> Iterator[Instruction]:
+    """產生指令本身及其巢狀的子指令 (導航序列與資料驅動區塊的步驟)"""
+    yield instruction
+    children = _nested_steps(instruction)
+    if children is None and instruction.cmd == "DATA_SOURCE" and instruction.args:
+        children = instruction.args[0].steps
+    for child in children or ():
+        yield from iter_nested(child)
+
+class CommandProgram:
+    """編譯後的指令程式"""
+    __slots__ = ("instructions", "source_hash", "dependencies")
+
+    def __init__(self, instructions: List[Instruction], source_hash: str = "",
+                 dependencies: Optional[Dict[str, Tuple[int, int]]] = None) -> None:
+        self.instructions = instructions
+        self.source_hash = source_hash
+        # INCLUDE 引入的檔案: 路徑 -> (修改時間, 大小)，任一變更即視為快取失效
+        self.dependencies = dependencies or {}
+
+    def dependencies_changed(self) -> bool:
+        """檢查引入的檔案自編譯後是否有變更"""
+        for path, (mtime_ns, size) in self.dependencies.items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return True
+            if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self.instructions)
+
+    def __iter__(self):
+        return iter(self.instructions)
+
+def parse_selector(selector: str) -> Tuple[str, str]:
+    """解析選擇器，支援 CSS 和 XPath (返回值與 selenium By 常量相同)"""
+    if selector.startswith("#"):
+        return "id", selector[1:]
+    elif selector.startswith("."):
+        return "class name", selector[1:]
+    elif selector.startswith("//"):
+        return "xpath", selector
+    else:
+        return "css selector", selector
+
+def compile_regex(pattern: str):
+    """預先編譯正則表達式 (共用 utils.compile_pattern 的快取)，無效的模式拋出 ValueError"""
+    try:
+        return utils.compile_pattern(pattern)
+    except re.error as e:
+        raise ValueError(f"無效的正則表達式 '{pattern}': {str(e)}")
+
+def compile_command(cmd: str, params: List[str], line: Optional[str] = None) -> Instruction:
+    """將 (指令, 參數) 編譯為 Instruction，參數轉換失敗時記錄錯誤於執行時回報"""
+    spec = command_registry.get_command(cmd)
+    if spec is None:
+        return Instruction(cmd, params, line=line)
+
+    try:
+        args = spec.convert(params)
+    except (TypeError, ValueError) as e:
+        return Instruction(cmd, params, spec=spec, error=f"{cmd} 參數無效: {str(e)}", line=line)
+
+    return Instruction(cmd, params, args, spec, line=line)
+
+def compile_commands(commands: Iterable[utils.ParsedCommand]) -> List[Instruction]:
+    """編譯 (指令, 參數, 原始行) 列表"""
+    return list(iter_compile(commands))
+
+def _sequence_name(params: List[str]) -> str:
+    return params[0] if params and params[0] else DEFAULT_SEQUENCE_NAME
+
+def _call_instruction(params: List[str], sequences: Dict[str, List[Instruction]], line: str) -> Instruction:
+    """編譯具名導航序列的呼叫，直接引用已解析的序列區塊"""
+    name = _sequence_name(params)
+    spec = command_registry.get_command("NAV_SEQUENCE_CALL")
+    if name not in sequences:
+        return Instruction("NAV_SEQUENCE_CALL", params, spec=spec, error=f"未定義的導航序列: {name}", line=line)
+    return Instruction("NAV_SEQUENCE_CALL", params, (sequences[name],), spec, line=line)
+
+def _data_source_instruction(params: List[str], line: str) -> Tuple[Instruction, Optional[DataDrivenBlock]]:
+    """編譯 DATA_SOURCE=路徑 || 工作階段數，返回指令與待填入步驟的區塊"""
+    spec = command_registry.get_command("DATA_SOURCE")
+    if not params or not params[0]:
+        return Instruction("DATA_SOURCE", params, spec=spec, error="DATA_SOURCE 缺少資料檔路徑", line=line), None
+
+    try:
+        sessions = int(params[1]) if len(params) > 1 and params[1] else None
+    except ValueError as e:
+        return Instruction("DATA_SOURCE", params, spec=spec, error=f"DATA_SOURCE 參數無效: {str(e)}", line=line), None
+
+    block = DataDrivenBlock(params[0], sessions)
+    return Instruction("DATA_SOURCE", params, (block,), spec, line=line), block
+
+def iter_compile(commands: Iterable[utils.ParsedCommand]) -> Iterator[Instruction]:
+    """逐一編譯 (指令, 參數, 原始行)，可搭配串流讀取使用
+
+    NAV_SEQUENCE_START/NAV_SEQUENCE_DEFINE 至 NAV_SEQUENCE_END 之間的命令編譯為巢狀區塊，
+    區塊於結束標記出現時產生。具名序列只解析一次，NAV_SEQUENCE_CALL 共用同一份區塊。
+
+    DATA_SOURCE 之後到下一個 TEST_CASE (或 DATA_SOURCE_END、檔案結尾) 的命令編譯為資料驅動區塊，
+    執行時對資料檔的每一列套用一次。導航序列內的 DATA_SOURCE 編譯為錯誤指令。
+    """
+    # 開啟中的區塊堆疊: (開始標記, 序列名稱, 子指令, 開始標記的原始行)
+    stack: List[Tuple[str, str, List[Instruction], str]] = []
+    sequences: Dict[str, List[Instruction]] = {}
+    # 開啟中的資料驅動區塊
+    data_instruction: Optional[Instruction] = None
+    data_block: Optional[DataDrivenBlock] = None
+
+    for cmd, params, line in commands:
+        if not stack and data_instruction is not None and cmd in DATA_BLOCK_ENDS:
+            yield data_instruction
+            data_instruction = data_block = None
+            if cmd == "DATA_SOURCE_END":
+                continue
+
+        if cmd in NAV_BLOCK_STARTS:
+            stack.append((cmd, _sequence_name(params), [], line))
+            continue
+
+        if cmd == "NAV_SEQUENCE_END":
+            if not stack:
+                logging.warning("NAV_SEQUENCE_END 沒有對應的開始標記，已忽略")
+                continue
+            start_cmd, name, children, start_line = stack.pop()
+            sequences[name] = children
+            if start_cmd == "NAV_SEQUENCE_DEFINE":
+                continue
+            instruction = Instruction("NAV_SEQUENCE", [name], (children,), command_registry.get_command("NAV_SEQUENCE"),
+                                      line=start_line)
+        elif cmd == "NAV_SEQUENCE_CALL":
+            instruction = _call_instruction(params, sequences, line)
+        elif cmd == "INCLUDE":
+            # 能引入的檔案已由 utils.iter_commands 展開，留下的 INCLUDE 表示引入失敗
+            instruction = Instruction(cmd, params, error=f"無法引入檔案: {params[0] if params else ''}", line=line)
+        elif cmd == "DATA_SOURCE" and not stack:
+            data_instruction, data_block = _data_source_instruction(params, line)
+            if data_block is None:
+                instruction, data_instruction = data_instruction, None
+            else:
+                continue
+        elif stack and cmd in ("DATA_SOURCE", "DATA_SOURCE_END"):
+            # 資料驅動區塊只能位於最外層，導航序列內的資料區塊無法逐列執行
+            instruction = Instruction(cmd, params, spec=command_registry.get_command(cmd),
+                                      error=f"{cmd} 不可位於導航序列內", line=line)
+        else:
+            instruction = compile_command(cmd, params, line)
+
+        if stack:
+            stack[-1][2].append(instruction)
+        elif data_block is not None:
+            data_block.append(instruction)
+        else:
+            yield instruction
+
+    for _, name, _, _ in stack:
+        logging.warning(f"導航序列 '{name}' 缺少 NAV_SEQUENCE_END，已忽略")
+    if data_instruction is not None:
+        yield data_instruction
+
+def _hash_file(path: str) -> str:
+    """分段計算命令檔內容雜湊 (含編譯格式版本)，不需將整個檔案載入記憶體"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(f"v{PROGRAM_FORMAT_VERSION}".encode("ascii"))
+    return digest.hexdigest()
+
+def _cache_path(source_hash: str) -> str:
+    return os.path.join(utils.COMMAND_CACHE_DIR, f"{source_hash}.pkl")
+
+def _load_cached_program(source_hash: str) -> Optional[CommandProgram]:
+    """從磁碟讀取編譯快取，不存在或損毀時返回 None"""
+    path = _cache_path(source_hash)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            program = pickle.load(f)
+        if isinstance(program, CommandProgram) and program.source_hash == source_hash:
+            if program.dependencies_changed():
+                logging.info("引入的命令片段已變更，重新編譯")
+                return None
+            return program
+    except Exception as e:
+        logging.warning(f"讀取指令快取失敗，將重新編譯: {str(e)}")
+    return None
+
+def _store_cached_program(program: CommandProgram) -> None:
+    """寫入編譯快取並清理過舊的快取檔"""
+    try:
+        os.makedirs(utils.COMMAND_CACHE_DIR, exist_ok=True)
+        path = _cache_path(program.source_hash)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(program, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        cache_files = sorted(
+            (os.path.join(utils.COMMAND_CACHE_DIR, name) for name in os.listdir(utils.COMMAND_CACHE_DIR) if name.endswith(".pkl")),
+            key=os.path.getmtime,
+        )
+        for old_path in cache_files[:-utils.COMMAND_CACHE_MAX_FILES]:
+            os.remove(old_path)
+    except Exception as e:
+        logging.warning(f"寫入指令快取失敗: {str(e)}")
+
+def iter_program(path: str = None) -> Iterator[Instruction]:
+    """串流產生已編譯的指令
+
+    內容未變更時直接從快取產生；否則邊讀邊編譯，執行端可在解析完成前開始執行第一個步驟。
+    串流結束後，若指令數量未超過 COMMAND_CACHE_MAX_INSTRUCTIONS 則寫入快取。
+    """
+    if path is None:
+        path = utils.COMMAND_FILE
+
+    if not os.path.exists(path):
+        logging.info(f"找不到 {path} 檔案")
+        return
+
+    source_hash = _hash_file(path)
+    program = _load_cached_program(source_hash)
+    if program is not None:
+        logging.info(f"使用已編譯的指令快取，共 {len(program)} 個命令")
+        yield from program.instructions
+        return
+
+    collected: Optional[List[Instruction]] = []
+    dependencies: Dict[str, Tuple[int, int]] = {}
+    count = 0
+    for instruction in iter_compile(utils.iter_commands(path, dependencies=dependencies)):
+        count += 1
+        if collected is not None:
+            if count > utils.COMMAND_CACHE_MAX_INSTRUCTIONS:
+                collected = None
+            else:
+                collected.append(instruction)
+        yield instruction
+
+    if collected is not None:
+        _store_cached_program(CommandProgram(collected, source_hash, dependencies))
+    logging.info(f"已編譯 {count} 個命令")
+
+def check_patterns(path: str = None) -> List[str]:
+    """在執行前檢查命令檔中所有 VERIFY_TEXT_PATTERN (含導航序列與資料驅動區塊內的)，返回錯誤訊息 (空列表表示全部有效)
+
+    只解析命令，不編譯其他指令；模式經 compile_command 編譯並保留在共用的正則表達式快取中，
+    之後串流編譯時不必重新編譯。含 ${欄位} 佔位符的模式於套用資料列時才編譯，不在此檢查。
+    """
+    if path is None:
+        path = utils.COMMAND_FILE
+
+    if not os.path.exists(path):
+        return []
+
+    errors = []
+    for cmd, params, line in utils.iter_commands(path):
+        if cmd != "VERIFY_TEXT_PATTERN" or any(PLACEHOLDER_PATTERN.search(param) for param in params):
+            continue
+        error = compile_command(cmd, params, line).error
+        if error:
+            errors.append(f"{error} ({line})")
+    return errors
+
+def load_program(path: str = None) -> CommandProgram:
+    """載入並編譯整個命令檔，內容未變更時直接使用磁碟快取"""
+    if path is None:
+        path = utils.COMMAND_FILE
+
+    if not os.path.exists(path):
+        logging.info(f"找不到 {path} 檔案")
+        return CommandProgram([])
+
+    source_hash = _hash_file(path)
+    program = _load_cached_program(source_hash)
+    if program is not None:
+        logging.info(f"使用已編譯的指令快取，共 {len(program)} 個命令")
+        return program
+
+    dependencies: Dict[str, Tuple[int, int]] = {}
+    instructions = compile_commands(utils.iter_commands(path, dependencies=dependencies))
+    program = CommandProgram(instructions, source_hash, dependencies)
+    if len(program) <= utils.COMMAND_CACHE_MAX_INSTRUCTIONS:
+        _store_cached_program(program)
+    logging.info(f"已編譯 {len(program)} 個命令")
+    return program
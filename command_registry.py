@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+import logging
+import importlib
+from typing import Callable, Dict, List, Optional
+
+import utils
+
+# 參數轉換器標記: 其餘參數全部以列表傳入
+VARARGS = "varargs"
+
+class CommandSpec:
+    """已註冊指令的描述: 處理函式、參數數量與參數轉換器
+
+    mutating 表示指令可能改變頁面 (點擊、輸入、導航)，執行後會使頁面快照失效。
+    """
+    __slots__ = ("name", "handler", "converters", "min_args", "max_args", "parser", "mutating")
+
+    def __init__(self, name: str, handler: Callable, converters=(), min_args: int = 0,
+                 max_args: Optional[int] = None, parser: Optional[Callable] = None,
+                 mutating: bool = True) -> None:
+        self.name = name
+        self.handler = handler
+        self.converters = converters
+        self.min_args = min_args
+        self.max_args = max_args
+        self.parser = parser
+        self.mutating = mutating
+
+    def __reduce__(self):
+        # 編譯快取中只保存指令名稱，載入時從註冊表重新取得
+        return (_resolve_spec, (self.name,))
+
+    def convert(self, params: List[str]) -> tuple:
+        """依宣告的參數數量與轉換器將原始參數轉為呼叫參數，失敗時拋出 ValueError
+
+        參數依位置對應轉換器: 空的選用參數傳入 None (使用預設值)，不會使後面的參數往前移；
+        已寫出的必要參數保留原值 (第一個參數除外可為空字串，例如驗證元素值為空)。
+        """
+        values = list(params)
+        # 只去掉結尾的空選用參數
+        while len(values) > self.min_args and not values[-1]:
+            values.pop()
+        if len(values) < self.min_args or (self.min_args and not values[0]):
+            raise ValueError(f"{self.name} 至少需要 {self.min_args} 個參數")
+
+        if self.parser:
+            return tuple(self.parser(params))
+
+        if self.converters == VARARGS:
+            return ([value for value in values if value],)
+
+        if self.max_args is not None:
+            values = values[:self.max_args]
+        return tuple(convert(value) if value or index < self.min_args else None
+                     for index, (convert, value) in enumerate(zip(self.converters, values)))
+
+    def __call__(self, handler, *args) -> bool:
+        return self.handler(handler, *args)
+
+# 指令註冊表: 指令名稱 -> CommandSpec
+COMMAND_REGISTRY: Dict[str, CommandSpec] = {}
+
+def _resolve_spec(name: str) -> CommandSpec:
+    return COMMAND_REGISTRY[name]
+
+def register_command(name: str, converters=(), min_args: int = 0, max_args: Optional[int] = None,
+                     parser: Optional[Callable] = None, command_type: Optional[str] = None,
+                     mutating: bool = True):
+    """註冊指令處理函式的裝飾器，處理函式簽名為 handler(selenium_handler, *args) -> bool
+
+    外部模組可直接使用此裝飾器新增或覆寫指令，不需修改 SeleniumHandler。
+    只讀取頁面而不改變頁面的指令可傳入 mutating=False，讓連續的驗證共用頁面快照。
+    """
+    def decorator(func: Callable) -> Callable:
+        if max_args is None and converters != VARARGS and parser is None:
+            limit = len(converters)
+        else:
+            limit = max_args
+        COMMAND_REGISTRY[name] = CommandSpec(name, func, converters, min_args, limit, parser, mutating)
+        if command_type and name not in utils.COMMANDS:
+            utils.COMMANDS[name] = command_type
+        return func
+    return decorator
+
+def unregister_command(name: str) -> None:
+    """移除已註冊的指令"""
+    COMMAND_REGISTRY.pop(name, None)
+
+def get_command(name: str) -> Optional[CommandSpec]:
+    """取得指令描述，未註冊時返回 None"""
+    return COMMAND_REGISTRY.get(name)
+
+def load_plugins(module_names: List[str]) -> None:
+    """匯入外部指令模組 (模組於匯入時自行呼叫 register_command)"""
+    for module_name in module_names:
+        try:
+            importlib.import_module(module_name)
+            logging.info(f"已載入指令擴充模組: {module_name}")
+        except Exception as e:
+            logging.error(f"載入指令擴充模組 {module_name} 時發生錯誤: {str(e)}")
+
+def _method(method_name: str) -> Callable:
+    """建立轉呼叫 SeleniumHandler 方法的處理函式"""
+    def call(handler, *args) -> bool:
+        return getattr(handler, method_name)(*args)
+    call.__name__ = method_name
+    return call
+
+def _selector(raw: str):
+    # 延遲匯入以避免與 command_program 互相匯入
+    from command_program import Selector
+    return Selector(raw)
+
+def _poll_condition(raw: str):
+    from command_program import PollCondition
+    return PollCondition(raw)
+
+def _poll_seconds(raw: str) -> float:
+    # 條件中的 || 會被視為參數分隔符，條件被拆開後其餘部分落在秒數參數
+    try:
+        return float(raw)
+    except ValueError:
+        raise ValueError(f"'{raw}' 不是秒數 (條件不可包含參數分隔符 ||)") from None
+
+def _regex(pattern: str):
+    from command_program import compile_regex
+    return compile_regex(pattern)
+
+# 文字驗證的選用參數: SCOPE=選擇器，只在該元素內擷取與比對文字
+SCOPE_PARAM = "SCOPE="
+
+def _scoped(converters) -> Callable:
+    """建立文字驗證的參數解析器: 取出 SCOPE= 參數作為最後一個呼叫參數 (未指定時為 None)
+
+    其餘參數依位置對應轉換器，空的選用參數為 None (使用預設值)。
+    """
+    def parse(params: List[str]) -> tuple:
+        scope = None
+        values = []
+        for param in params:
+            if param.startswith(SCOPE_PARAM):
+                scope = _selector(param[len(SCOPE_PARAM):].strip())
+            else:
+                values.append(param)
+
+        if converters == VARARGS:
+            values = [value for value in values if value]
+            if not values:
+                raise ValueError("缺少要驗證的文字")
+            return values, scope
+        if not values or not values[0]:
+            raise ValueError("缺少要驗證的文字")
+        args = [convert(value) if value else None for convert, value in zip(converters, values)]
+        args += [None] * (len(converters) - len(args))
+        return (*args, scope)
+    return parse
+
+# 內建指令: 名稱 -> (SeleniumHandler 方法, 參數轉換器, 必要參數數量)
+_BUILTIN_COMMANDS = {
+    # 基本操作指令
+    "OPEN_URL": ("open_html_page", (str,), 1),
+    "NAVIGATE": ("open_html_page", (str,), 1),
+    "WAIT": ("wait_seconds", (int,), 1),
+    "REFRESH": ("refresh_page", (), 0),
+    "BACK": ("go_back", (), 0),
+    "CLICK_BY_TEXT": ("click_by_text", (str,), 1),
+    "CLICK_BY_ID": ("click_by_id", (str,), 1),
+    "CLICK_BY_CSS": ("click_by_css", (str,), 1),
+    "TYPE": ("type_text", (str,), 1),
+    "LOGIN": ("login", (str, str), 2),
+
+    # 驗證指令
+    "VERIFY_TEXT_EXISTS": ("verify_text_exists", (str,), 1),
+    "VERIFY_TEXT_NOT_EXISTS": ("verify_text_not_exists", (str,), 1),
+    "VERIFY_ELEMENT_EXISTS": ("verify_element_exists", (_selector,), 1),
+    "VERIFY_ELEMENT_VALUE": ("verify_element_value", (_selector, str), 2),
+    "VERIFY_COUNT": ("verify_count", (_selector, int), 2),
+
+    # 等待指令
+    "WAIT_FOR_TEXT": ("wait_for_text", (str, int), 1),
+    "WAIT_FOR_ELEMENT": ("wait_for_element", (_selector, int), 1),
+    "WAIT_FOR_PAGE_LOAD": ("wait_for_page_load", (int,), 0),
+    "WAIT_UNTIL_CHANGES": ("wait_until_changes", (_selector, int), 1),
+    # 最長等待秒數 || 閒置判定毫秒數
+    "WAIT_FOR_NETWORK_IDLE": ("wait_for_network_idle", (float, int), 0),
+    # 條件 || 最長等待秒數 || 初始輪詢間隔 || 間隔上限 (每次輪詢後間隔加倍)
+    "POLL_UNTIL": ("poll_until", (_poll_condition, _poll_seconds, _poll_seconds, _poll_seconds), 1),
+
+    # 導航與互動指令
+    "SCROLL_TO_ELEMENT": ("scroll_to_element", (_selector,), 1),
+    "SCROLL_TO_BOTTOM": ("scroll_to_bottom", (), 0),
+    "EXPAND": ("expand", (_selector,), 1),
+
+    # 測試案例相關
+    "TEST_CASE": ("log_test_case", (str,), 0),
+    "DESCRIPTION": ("log_description", (str,), 0),
+    "SEVERITY": ("log_severity", (str,), 0),
+
+    # 模糊匹配指令
+    "VERIFY_TEXT_CONTAINS": ("verify_text_contains", (str,), 1),
+    "VERIFY_TEXT_PATTERN": ("verify_text_pattern", (_regex,), 1),
+    "VERIFY_TEXT_SIMILAR": ("verify_text_similar", (str, float), 1),
+    "VERIFY_ANY_TEXT": ("verify_any_text", VARARGS, 1),
+    "VERIFY_ALL_TEXT": ("verify_all_text", VARARGS, 1),
+}
+
+# 只讀取頁面的內建指令 (不會使頁面快照失效)
+_READ_ONLY_COMMANDS = {
+    "VERIFY_TEXT_EXISTS", "VERIFY_TEXT_NOT_EXISTS", "VERIFY_ELEMENT_EXISTS", "VERIFY_ELEMENT_VALUE", "VERIFY_COUNT",
+    "VERIFY_TEXT_CONTAINS", "VERIFY_TEXT_PATTERN", "VERIFY_TEXT_SIMILAR", "VERIFY_ANY_TEXT", "VERIFY_ALL_TEXT",
+    "WAIT", "WAIT_FOR_TEXT", "WAIT_FOR_ELEMENT", "WAIT_FOR_PAGE_LOAD", "WAIT_UNTIL_CHANGES", "WAIT_FOR_NETWORK_IDLE",
+    "POLL_UNTIL", "TEST_CASE", "DESCRIPTION", "SEVERITY",
+}
+
+# 可加上 SCOPE=選擇器 的文字驗證
+SCOPED_COMMANDS = {
+    "VERIFY_TEXT_EXISTS", "VERIFY_TEXT_NOT_EXISTS", "VERIFY_TEXT_CONTAINS", "VERIFY_TEXT_PATTERN",
+    "VERIFY_TEXT_SIMILAR", "VERIFY_ANY_TEXT", "VERIFY_ALL_TEXT",
+}
+
+for _name, (_method_name, _converters, _min_args) in _BUILTIN_COMMANDS.items():
+    register_command(_name, _converters, _min_args,
+                     parser=_scoped(_converters) if _name in SCOPED_COMMANDS else None,
+                     mutating=_name not in _READ_ONLY_COMMANDS)(_method(_method_name))
+
+# 導航序列區塊: 參數 (子指令列表) 由 command_program 編譯時直接提供
+register_command("NAV_SEQUENCE", command_type=utils.CMD_NAV)(_method("execute_nav_sequence"))
+register_command("NAV_SEQUENCE_CALL", command_type=utils.CMD_NAV)(_method("execute_nav_sequence"))
+
+# 資料驅動區塊: 參數 (DataDrivenBlock) 由 command_program 編譯時直接提供
+register_command("DATA_SOURCE", command_type=utils.CMD_TEST)(_method("run_data_driven"))
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import os
+import csv
+import json
+import mmap
+import logging
+import threading
+from typing import Dict, Iterator
+
+import utils
+from command_program import DataDrivenBlock
+from run_control import RunCancelled
+from verify_batch import group_instructions
+
+def _iter_text_lines(path: str) -> Iterator[str]:
+    """逐行讀取文字檔，超過 DATA_SOURCE_MMAP_THRESHOLD 的檔案使用記憶體映射"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return
+
+    if size < utils.DATA_SOURCE_MMAP_THRESHOLD:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            yield from f
+        return
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        first_line = True
+        for raw_line in iter(mm.readline, b""):
+            line = raw_line.decode("utf-8")
+            if first_line:
+                line = line.lstrip("\ufeff")
+                first_line = False
+            yield line
+
+def iter_rows(path: str) -> Iterator[Dict[str, str]]:
+    """串流讀取資料檔 (CSV 或 JSONL)，每次產生一列 {欄位: 值}"""
+    extension = os.path.splitext(path)[1].lower()
+    lines = _iter_text_lines(path)
+
+    if extension == ".csv":
+        yield from csv.DictReader(lines)
+    elif extension in (".jsonl", ".ndjson"):
+        for line_no, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                logging.warning(f"資料檔 {path} 第 {line_no} 行格式錯誤，已略過: {str(e)}")
+                continue
+            if isinstance(row, dict):
+                yield row
+            else:
+                logging.warning(f"資料檔 {path} 第 {line_no} 行不是物件，已略過")
+    else:
+        raise ValueError(f"不支援的資料檔格式: {extension}")
+
+def run_data_driven(handler, block: DataDrivenBlock) -> bool:
+    """對資料檔每一列執行區塊步驟，資料列分配給多個瀏覽器工作階段同時執行"""
+    if not os.path.exists(block.source):
+        logging.error(f"找不到資料檔: {block.source}")
+        return False
+
+    sessions = block.sessions
+    if sessions is None:
+        sessions = utils.load_settings().get("data_sessions", utils.DEFAULT_DATA_SESSIONS)
+    sessions = max(1, int(sessions))
+
+    rows = enumerate(iter_rows(block.source), 1)
+    lock = threading.Lock()
+    counts = {"passed": 0, "failed": 0}
+
+    def next_row():
+        # 多個工作階段共用同一個資料列產生器，依序取用
+        with lock:
+            try:
+                return next(rows, None)
+            except Exception as e:
+                logging.error(f"讀取資料檔 {block.source} 時發生錯誤: {str(e)}")
+                return None
+
+    def run_rows(session_handler) -> None:
+        while session_handler.driver:
+            item = next_row()
+            if item is None:
+                return
+
+            row_no, row = item
+            row_passed = True
+            for group in group_instructions(block.bind(row)):
+                if not all(session_handler.execute_group(group)):
+                    row_passed = False
+
+            with lock:
+                counts["passed" if row_passed else "failed"] += 1
+            logging.info(f"資料列 {row_no}: {'通過' if row_passed else '失敗'}")
+
+    def run_spawned(session_handler) -> None:
+        try:
+            if session_handler.initialize_driver():
+                run_rows(session_handler)
+            else:
+                logging.error("額外的瀏覽器工作階段初始化失敗")
+        except RunCancelled:
+            logging.info("資料驅動工作階段已停止")
+        finally:
+            session_handler.release_driver()
+
+    # 目前的工作階段在本執行緒執行，其餘工作階段各自建立瀏覽器
+    threads = [threading.Thread(target=run_spawned, args=(handler.spawn(),), daemon=True) for _ in range(sessions - 1)]
+    for thread in threads:
+        thread.start()
+    try:
+        run_rows(handler)
+    finally:
+        # 停止時其他工作階段也共用同一個取消事件，會在 0.1 秒內結束
+        for thread in threads:
+            thread.join()
+
+    total = counts["passed"] + counts["failed"]
+    if total == 0:
+        logging.warning(f"資料檔 {block.source} 沒有可執行的資料列")
+        return False
+
+    logging.info(f"資料驅動執行完成: {counts['passed']} 列通過, {counts['failed']} 列失敗 (使用 {sessions} 個工作階段)")
+    return counts["failed"] == 0
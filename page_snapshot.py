@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import verify_scripts
+
+# DOM 版本探測: 第一次呼叫時安裝 MutationObserver 計算變動次數，返回 [文件識別碼, 變動次數]
+# 新文件 (導航、重新整理) 會有新的識別碼；傳回的資料只有數十位元組
+DOM_VERSION_FUNCTION = """
+function domVersion() {
+    let state = window.__automationDomVersion;
+    if (!state) {
+        state = window.__automationDomVersion = {doc: Date.now() + ':' + Math.random(), version: 0};
+        new MutationObserver(() => { state.version++; })
+            .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    }
+    return [state.doc, state.version];
+}
+"""
+DOM_VERSION_SCRIPT = DOM_VERSION_FUNCTION + "return domVersion();"
+
+# 取得快照內容時一併返回 DOM 版本: [版本, 內容]，不需另外探測
+SOURCE_SCRIPT = DOM_VERSION_FUNCTION + "return [domVersion(), document.documentElement.outerHTML];"
+TEXT_SCRIPT = DOM_VERSION_FUNCTION + "return [domVersion(), document.body ? document.body.innerText : ''];"
+SCOPE_SCRIPT = verify_scripts.SCOPE_CONTENT_FUNCTION + DOM_VERSION_FUNCTION + \
+    "return [domVersion(), scopeContent(arguments[0], arguments[1], arguments[2])];"
+
+class PageSnapshot:
+    """某一 DOM 版本的頁面內容，原始碼與可見文字在第一次使用時才向瀏覽器取得
+
+    version 為取得內容時的 DOM 版本 (由取得內容的同一個腳本返回)；
+    尚未取得任何內容時可直接沿用，內容無法確定版本時為 None，之後不再沿用。
+    """
+    __slots__ = ("driver", "version", "_source", "_text", "_scopes")
+
+    def __init__(self, driver, version: Optional[tuple] = None, text: Optional[str] = None) -> None:
+        self.driver = driver
+        self.version = version
+        self._source: Optional[str] = None
+        self._text: Optional[str] = text
+        # 驗證範圍元素的內容: (by, value, 是否為 HTML) -> 內容 (找不到元素時為 None)
+        self._scopes: Dict[Tuple[str, str, bool], Optional[str]] = {}
+
+    @property
+    def empty(self) -> bool:
+        """尚未取得任何內容"""
+        return self._source is None and self._text is None and not self._scopes
+
+    def _fetch(self, script: str, *args) -> Any:
+        """執行返回 [版本, 內容] 的腳本並記錄版本；同一快照的內容來自不同版本時不再沿用"""
+        version, content = self.driver.execute_script(script, *args)
+        version = tuple(version)
+        if self.empty:
+            self.version = version
+        elif self.version != version:
+            self.version = None
+        return content
+
+    @property
+    def source(self) -> str:
+        if self._source is None:
+            self._source = self._fetch(SOURCE_SCRIPT)
+        return self._source
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self._fetch(TEXT_SCRIPT)
+        return self._text
+
+    def scope_content(self, by: str, value: str, html: bool = False) -> Optional[str]:
+        """範圍元素 (第一個符合的元素) 的可見文字或 HTML，只傳回該元素的內容；找不到元素時返回 None"""
+        key = (by, value, html)
+        if key not in self._scopes:
+            self._scopes[key] = self._fetch(SCOPE_SCRIPT, by, value, html)
+        return self._scopes[key]
+
+class SnapshotCache:
+    """連續的驗證指令共用的頁面快照
+
+    快照在執行可能改變頁面的指令後失效 (invalidate)，或在 DOM 版本探測結果改變時自動重新建立。
+    探測只需一次很小的請求，取代每個驗證各自傳回整份頁面；快照剛失效或尚未取得內容時不需要探測。
+    """
+
+    def __init__(self) -> None:
+        self._snapshot: Optional[PageSnapshot] = None
+        self._pinned: Optional[PageSnapshot] = None
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+        self._pinned = None
+
+    def pin(self, snapshot: PageSnapshot) -> None:
+        """在 unpin 之前直接使用指定的快照，不再探測 DOM 版本 (批次驗證期間使用)"""
+        self._snapshot = snapshot
+        self._pinned = snapshot
+
+    def unpin(self) -> None:
+        self._pinned = None
+
+    def get(self, driver) -> PageSnapshot:
+        """取得目前 DOM 版本的快照"""
+        if self._pinned is not None and self._pinned.driver is driver:
+            self.hits += 1
+            return self._pinned
+
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.driver is driver:
+            # 尚未取得內容的快照沒有過期的資料，內容取得時即記錄當時的版本
+            if snapshot.empty:
+                self.hits += 1
+                return snapshot
+            if snapshot.version is not None and self._probe(driver) == snapshot.version:
+                self.hits += 1
+                return snapshot
+
+        # 剛失效 (或沒有快照) 時直接建立新的快照，不探測 DOM 版本
+        self.misses += 1
+        self._snapshot = PageSnapshot(driver)
+        return self._snapshot
+
+    def _probe(self, driver) -> Optional[tuple]:
+        try:
+            return tuple(driver.execute_script(DOM_VERSION_SCRIPT))
+        except Exception as e:
+            # 無法探測時 (例如有未處理的對話框) 不使用快取
+            logging.debug(f"DOM 版本探測失敗: {str(e)}")
+            return None
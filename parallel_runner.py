@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from command_program import Instruction
+from run_control import RunCancelled
+from verify_batch import group_instructions
+
+class CaseResult:
+    """單一測試案例的執行結果"""
+    __slots__ = ("index", "name", "steps", "duration")
+
+    def __init__(self, index: int, name: str) -> None:
+        self.index = index
+        self.name = name
+        # (步驟顯示文字, 是否通過)
+        self.steps: List[Tuple[str, bool]] = []
+        self.duration = 0.0
+
+    @property
+    def passed(self) -> bool:
+        return all(success for _, success in self.steps)
+
+def split_test_cases(instructions: Iterable[Instruction]) -> Iterator[List[Instruction]]:
+    """在 TEST_CASE 邊界切分指令串流，第一個 TEST_CASE 之前的指令 (共用前置步驟) 自成一組"""
+    current: List[Instruction] = []
+    for instruction in instructions:
+        if instruction.cmd == "TEST_CASE" and current:
+            yield current
+            current = []
+        current.append(instruction)
+    if current:
+        yield current
+
+def case_name(instructions: List[Instruction]) -> str:
+    """取得測試案例名稱"""
+    first = instructions[0]
+    if first.cmd == "TEST_CASE" and first.params and first.params[0]:
+        return first.params[0]
+    return "前置步驟"
+
+def run_case(handler, index: int, instructions: List[Instruction],
+             should_continue: Callable[[], bool] = lambda: True) -> CaseResult:
+    """在指定的處理器上執行一個測試案例"""
+    result = CaseResult(index, case_name(instructions))
+    start_time = time.perf_counter()
+    for group in group_instructions(instructions):
+        if not should_continue():
+            break
+        try:
+            outcomes = handler.execute_group(group)
+        except RunCancelled as e:
+            result.steps.extend((instruction.display_text(), False) for instruction in group)
+            logging.warning(f"測試案例 '{result.name}' 已中斷: {str(e)}")
+            break
+        result.steps.extend((instruction.display_text(), success) for instruction, success in zip(group, outcomes))
+    result.duration = time.perf_counter() - start_time
+    return result
+
+class SessionSet:
+    """平行執行時使用的瀏覽器工作階段集合: 主處理器加上按需建立的額外處理器"""
+
+    def __init__(self, primary, limit: int, setup: List[Instruction]) -> None:
+        self.primary = primary
+        self.limit = limit
+        self.setup = setup
+        self._idle: "queue.Queue" = queue.Queue()
+        self._idle.put(primary)
+        self._spawned = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得閒置的處理器，沒有閒置且未達上限時建立新的瀏覽器工作階段
+
+        新的工作階段無法初始化時返回 None (由呼叫端將案例記為失敗)，並不再建立額外的工作階段。
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_spawn = len(self._spawned) < self.limit - 1
+            if can_spawn:
+                handler = self.primary.spawn()
+                self._spawned.append(handler)
+
+        if not can_spawn:
+            return self._idle.get()
+
+        if not handler.initialize_driver():
+            logging.error("額外的瀏覽器工作階段初始化失敗，之後的案例改用既有工作階段")
+            with self._lock:
+                self._spawned.remove(handler)
+                self.limit = len(self._spawned) + 1
+            handler.release_driver()
+            return None
+
+        # 新的工作階段先執行共用前置步驟 (停止時由後續的案例執行回報)
+        try:
+            for instruction in self.setup:
+                if not handler.execute_instruction(instruction):
+                    logging.warning(f"工作階段前置步驟 '{instruction.cmd}' 執行失敗")
+        except RunCancelled:
+            pass
+        return handler
+
+    def release(self, handler) -> None:
+        self._idle.put(handler)
+
+    def close(self) -> None:
+        """關閉額外建立的工作階段 (主處理器由呼叫端負責)"""
+        for handler in self._spawned:
+            handler.release_driver()
+        self._spawned = []
+
+def run_parallel(instructions: Iterable[Instruction], primary_handler, workers: int,
+                 on_result: Callable[[CaseResult], None],
+                 should_continue: Callable[[], bool] = lambda: True) -> None:
+    """以 TEST_CASE 為單位，在多個瀏覽器工作階段上同時執行測試案例
+
+    結果依腳本順序交給 on_result (在呼叫端執行緒中呼叫)。
+    第一個 TEST_CASE 之前的前置步驟先在主處理器上執行並回報，之後每個新工作階段也會各自執行一次。
+    """
+    groups = split_test_cases(instructions)
+    first_group = next(groups, None)
+    if first_group is None:
+        return
+
+    setup: List[Instruction] = []
+    if first_group[0].cmd != "TEST_CASE":
+        setup = first_group
+        on_result(run_case(primary_handler, 0, setup, should_continue))
+        cases = groups
+        index = 1
+    else:
+        cases = chain([first_group], groups)
+        index = 0
+
+    sessions = SessionSet(primary_handler, workers, setup)
+
+    def run_on_session(case_index: int, case: List[Instruction]) -> CaseResult:
+        handler = sessions.acquire()
+        if handler is None:
+            result = CaseResult(case_index, case_name(case))
+            result.steps.append(("初始化瀏覽器工作階段", False))
+            return result
+        try:
+            return run_case(handler, case_index, case, should_continue)
+        finally:
+            sessions.release(handler)
+
+    def emit(future) -> None:
+        try:
+            on_result(future.result())
+        except CancelledError:
+            pass
+
+    # 限制同時排隊的案例數，避免串流腳本一次全部載入記憶體
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="case-worker") as executor:
+        try:
+            for case in cases:
+                if not should_continue():
+                    break
+                pending.append(executor.submit(run_on_session, index, case))
+                index += 1
+                while len(pending) >= workers * 2:
+                    emit(pending.popleft())
+
+            if not should_continue():
+                for future in pending:
+                    future.cancel()
+            while pending:
+                emit(pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            sessions.close()
+
+def build_report(results: List[CaseResult], mode: str, duration: float, **extra) -> Dict[str, Any]:
+    """建立執行報告 (依序、平行或分片執行共用)"""
+    passed = sum(1 for result in results if result.steps and result.passed)
+    report = {
+        "mode": mode,
+        "duration": round(duration, 3),
+        "passed": passed,
+        "failed": len(results) - passed,
+    }
+    report.update(extra)
+    report["cases"] = [
+        {
+            "name": result.name,
+            "passed": bool(result.steps) and result.passed,
+            "duration": round(result.duration, 3),
+            "steps": [{"step": text, "passed": success} for text, success in result.steps],
+        }
+        for result in results
+    ]
+    return report
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import time
+import threading
+from typing import Optional
+
+class RunCancelled(BaseException):
+    """執行已停止或超過時間上限
+
+    繼承 BaseException，讓各指令內的 except Exception 不會攔截，停止時可立即跳出正在等待的指令。
+    """
+
+class RunControl:
+    """一次執行共用的取消事件與截止時間，所有等待都透過它進行以便隨時中斷"""
+    __slots__ = ("event", "deadline", "reason")
+
+    # 中斷等待時的最大延遲 (秒)
+    POLL_INTERVAL = 0.1
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.deadline: Optional[float] = None
+        self.reason = ""
+
+    def start(self, budget: Optional[float] = None) -> None:
+        """開始新的一次執行，budget 為整體執行時間上限 (秒)"""
+        self.event.clear()
+        self.reason = ""
+        self.deadline = time.monotonic() + budget if budget else None
+
+    def cancel(self, reason: str = "執行已停止") -> None:
+        if not self.event.is_set():
+            self.reason = reason
+            self.event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("超過執行時間上限")
+        return self.event.is_set()
+
+    def check(self) -> None:
+        """已停止或超過截止時間時拋出 RunCancelled"""
+        if self.cancelled:
+            raise RunCancelled(self.reason)
+
+    def remaining(self, timeout: float) -> float:
+        """將等待時間限制在截止時間之前"""
+        if self.deadline is None:
+            return timeout
+        return max(0.0, min(timeout, self.deadline - time.monotonic()))
+
+    def sleep(self, seconds: float) -> None:
+        """可中斷的等待，停止時立即拋出 RunCancelled"""
+        self.check()
+        self.event.wait(self.remaining(seconds))
+        self.check()
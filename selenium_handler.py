@@ -8,11 +8,54 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException, ElementNotInteractableException
+from selenium.common.exceptions import (TimeoutException, NoSuchElementException, WebDriverException, ElementNotInteractableException,
+                                        StaleElementReferenceException, JavascriptException)
 
 import utils
+import command_program
+import data_driven
+import wait_engine
+import page_snapshot
+import verify_scripts
+import verify_batch
+from run_control import RunControl
+
+class CancellableWait:
+    """與 WebDriverWait 相同介面的等待，輪詢間的等待可被停止或截止時間立即中斷"""
+
+    def __init__(self, driver, control: RunControl, timeout: float,
+                 poll_frequency: float = RunControl.POLL_INTERVAL,
+                 ignored_exceptions: tuple = (NoSuchElementException,)) -> None:
+        self.driver = driver
+        self.control = control
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+        self.ignored_exceptions = ignored_exceptions
+
+    def until(self, method, message: str = ""):
+        return self._poll(method, True, message)
+
+    def until_not(self, method, message: str = ""):
+        return self._poll(method, False, message)
+
+    def _poll(self, method, expected: bool, message: str):
+        end_time = time.monotonic() + self.control.remaining(self.timeout)
+        while True:
+            self.control.check()
+            try:
+                value = method(self.driver)
+                if bool(value) == expected:
+                    return value if expected else True
+            except self.ignored_exceptions:
+                if not expected:
+                    return True
+            if time.monotonic() >= end_time:
+                break
+            self.control.sleep(min(self.poll_frequency, max(0.0, end_time - time.monotonic())))
+        # 因截止時間而結束時回報為取消，而非一般逾時
+        self.control.check()
+        raise TimeoutException(message)
 
 class SeleniumHandler:
     def __init__(self) -> None:
@@ -20,13 +63,33 @@ class SeleniumHandler:
         self.driver: Optional[webdriver.Chrome] = None
         self.chromedriver_path: Optional[str] = None
         self.default_wait_time: int = utils.DEFAULT_WAIT_TIME
-        self.wait: Optional[WebDriverWait] = None
+        self.wait: Optional[CancellableWait] = None
+        # 設定後 initialize_driver / release_driver 會向池取用與歸還工作階段
+        self.session_pool = None
+        self.profile: str = utils.DEFAULT_BROWSER_PROFILE
+        # 取消事件與截止時間 (由 spawn 建立的處理器共用，停止時所有工作階段一起中斷)
+        self.run_control = RunControl()
+        # 條件等待節省時間的統計 (同一次執行的處理器共用)
+        self.wait_stats = wait_engine.WaitStats()
+        # 連續驗證共用的頁面快照 (每個處理器各自擁有，與瀏覽器工作階段對應)
+        self.page_cache = page_snapshot.SnapshotCache()
+    
+    def spawn(self) -> "SeleniumHandler":
+        """建立使用相同設定的新處理器 (需另行初始化自己的瀏覽器工作階段)"""
+        handler = SeleniumHandler()
+        handler.chromedriver_path = self.chromedriver_path
+        handler.default_wait_time = self.default_wait_time
+        handler.session_pool = self.session_pool
+        handler.profile = self.profile
+        handler.run_control = self.run_control
+        handler.wait_stats = self.wait_stats
+        return handler
     
     def set_wait_time(self, seconds: int) -> None:
         """設置等待時間"""
         self.default_wait_time = seconds
         if self.driver:
-            self.wait = WebDriverWait(self.driver, self.default_wait_time)
+            self.wait = self._wait()
     
     def find_chromedriver(self) -> bool:
         """尋找 chromedriver.exe"""
@@ -41,25 +104,48 @@ class SeleniumHandler:
         logging.error("錯誤: 未找到 chromedriver.exe，請確保它與程式在同一目錄")
         return False
     
+    def create_driver(self, profile: Optional[str] = None) -> webdriver.Chrome:
+        """以指定的瀏覽器執行設定檔 (預設為 self.profile) 啟動新的 Chrome 工作階段"""
+        arguments, prefs = utils.get_browser_profile(profile or self.profile)
+        
+        options = webdriver.ChromeOptions()
+        for argument in arguments:
+            options.add_argument(argument)
+        options.add_argument("--disable-notifications")
+        options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        options.add_experimental_option('useAutomationExtension', False)
+        if prefs:
+            options.add_experimental_option("prefs", prefs)
+        
+        service = Service(executable_path=self.chromedriver_path)
+        driver = webdriver.Chrome(service=service, options=options)
+        self._install_network_tracker(driver)
+        return driver
+    
+    @staticmethod
+    def _install_network_tracker(driver) -> None:
+        """在每個新文件載入前注入 fetch/XHR 追蹤，使 WAIT_FOR_NETWORK_IDLE 能涵蓋頁面載入時發出的請求"""
+        try:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": wait_engine.NETWORK_TRACKER_SCRIPT})
+        except Exception as e:
+            # 不支援 CDP 時於等待時才注入
+            logging.debug(f"無法預先注入網路請求追蹤: {str(e)}")
+    
     def initialize_driver(self) -> bool:
-        """初始化 WebDriver"""
+        """初始化 WebDriver (有工作階段池時優先使用池中已啟動的工作階段)"""
         if not self.chromedriver_path or not os.path.exists(self.chromedriver_path):
             logging.error("錯誤: 未找到 chromedriver.exe")
             return False
         
         try:
             # 初始化 WebDriver
-            options = webdriver.ChromeOptions()
-            options.add_argument("--start-maximized")
-            options.add_argument("--disable-notifications")
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            options.add_experimental_option('useAutomationExtension', False)
-            
-            service = Service(executable_path=self.chromedriver_path)
-            self.driver = webdriver.Chrome(service=service, options=options)
-            self.wait = WebDriverWait(self.driver, self.default_wait_time)
+            if self.session_pool:
+                self.driver = self.session_pool.acquire(self.profile)
+            else:
+                self.driver = self.create_driver()
+            self.wait = self._wait()
             
-            logging.info("Chrome WebDriver 初始化成功")
+            logging.info(f"Chrome WebDriver 初始化成功 (設定檔: {self.profile})")
             return True
             
         except WebDriverException as e:
@@ -76,61 +162,19 @@ class SeleniumHandler:
             return False
         
         try:
-            # 使用多種方法嘗試找到 HTML 檔案
-            html_paths = []
-            
-            # 獲取基礎目錄
-            if getattr(sys, 'frozen', False):
-                # 如果是打包後的執行檔
-                base_dir = sys._MEIPASS
-            else:
-                # 如果是直接執行 Python 腳本
-                base_dir = os.path.dirname(os.path.abspath(__file__))
-            
-            logging.info(f"基礎目錄: {base_dir}")
-            
-            # 方法1: 在 web 資料夾下尋找
-            html_paths.append(os.path.join(base_dir, "web", os.path.basename(url_path)))
-            
-            # 方法2: 直接在基礎目錄下尋找
-            html_paths.append(os.path.join(base_dir, os.path.basename(url_path)))
-            
-            # 方法3: 使用相對路徑
-            html_paths.append(os.path.join(base_dir, url_path))
-            
-            # 方法4: 使用當前工作目錄
-            html_paths.append(os.path.join(os.getcwd(), "web", os.path.basename(url_path)))
-            
-            # 嘗試所有可能的路徑
-            html_path = None
-            for path in html_paths:
-                logging.info(f"嘗試路徑: {path}")
-                if os.path.exists(path):
-                    html_path = path
-                    logging.info(f"找到 HTML 檔案: {html_path}")
-                    break
-            
-            if not html_path:
-                # 如果找不到檔案，列出可用的檔案
-                web_dir = os.path.join(base_dir, "web")
-                if os.path.exists(web_dir):
-                    files = os.listdir(web_dir)
-                    logging.warning(f"找不到 HTML 檔案，但 web 資料夾中有以下檔案: {files}")
-                else:
-                    logging.warning(f"找不到 HTML 檔案，且 web 資料夾不存在")
+            file_url = utils.resolve_html_url(url_path)
+            if not file_url:
                 return False
             
-            # 轉換為 file:// URL 格式
-            file_url = f"file:///{html_path.replace(os.sep, '/').lstrip('/')}"
             logging.info(f"嘗試打開頁面: {file_url}")
             
             self.driver.get(file_url)
             
             # 等待頁面載入
             try:
-                wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+                wait = self._wait(utils.DEFAULT_WAIT_TIME)
                 wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                time.sleep(2)  # 增加等待時間確保頁面完全載入
+                self._settle(2, wait_engine.page_settled())  # 等待載入完成、動畫結束且 DOM 穩定
                 logging.info("頁面已成功載入")
                 return True
             except TimeoutException:
@@ -153,28 +197,30 @@ class SeleniumHandler:
                 logging.error("找不到登入遮罩層")
                 return False
             
-            time.sleep(0.5)  # 等待動畫完成
+            self._settle(0.5, wait_engine.animations_finished(), wait_engine.clickable((By.ID, "username")))  # 等待動畫完成
             
             # 輸入使用者名稱
             username_input = self.wait_for_clickable(By.ID, "username")
             if not self.safe_send_keys(username_input, "admin"):
                 return False
             
-            time.sleep(0.3)  # 輸入間隔
+            self._settle(0.3, wait_engine.value_equals(username_input, "admin"))  # 等待輸入完成
             
             # 輸入密碼
             password_input = self.wait_for_clickable(By.ID, "password")
             if not self.safe_send_keys(password_input, "Pega#1234"):
                 return False
             
-            time.sleep(0.3)  # 輸入間隔
+            self._settle(0.3, wait_engine.value_equals(password_input, "Pega#1234"))  # 等待輸入完成
             
             # 點擊登入按鈕
             login_button = self.wait_for_clickable(By.CSS_SELECTOR, "button.login-button")
             if not self.safe_click(login_button):
                 return False
             
-            time.sleep(0.5)  # 等待登入處理
+            # 等待登入處理 (出現成功或錯誤訊息)
+            self._settle(0.5, wait_engine.any_of(wait_engine.visible((By.CLASS_NAME, "login-success")),
+                                                 wait_engine.visible((By.CLASS_NAME, "login-error"))))
             
             # 檢查登入結果
             try:
@@ -215,7 +261,7 @@ class SeleniumHandler:
             return False
         
         try:
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             
             # 檢查是否在首頁
             try:
@@ -225,7 +271,7 @@ class SeleniumHandler:
                     if "Nokia 基本設定" in item.text:
                         item.click()
                         logging.info("點擊 Nokia 基本設定 導航項目")
-                        time.sleep(1)
+                        self._settle(1, wait_engine.section_active("nokia-basic"), wait_engine.page_settled())
                         break
                 
                 # 檢查是否成功切換到 Nokia 基本設定頁面
@@ -242,7 +288,7 @@ class SeleniumHandler:
                     hostname_input.clear()
                     hostname_input.send_keys("NOKIA-TEST-HOST")
                     logging.info("輸入主機名稱: NOKIA-TEST-HOST")
-                    time.sleep(0.5)
+                    self._settle(0.5, wait_engine.value_equals(hostname_input, "NOKIA-TEST-HOST"))
                 except Exception as e:
                     logging.warning(f"主機名稱輸入框操作失敗: {str(e)}")
                     # 繼續測試，不中斷
@@ -252,7 +298,7 @@ class SeleniumHandler:
                     wireless_priority = wait.until(EC.element_to_be_clickable((By.ID, "wireless-priority")))
                     wireless_priority.click()
                     logging.info("點擊無線優先按鈕")
-                    time.sleep(0.5)
+                    self._settle(0.5, wait_engine.page_settled())
                 except Exception as e:
                     logging.warning(f"無線優先按鈕操作失敗: {str(e)}")
                     # 繼續測試，不中斷
@@ -262,7 +308,7 @@ class SeleniumHandler:
                     wifi_mode = wait.until(EC.element_to_be_clickable((By.ID, "wifi-mode")))
                     wifi_mode.click()
                     logging.info("點擊 Wi-Fi 模式按鈕")
-                    time.sleep(0.5)
+                    self._settle(0.5, wait_engine.page_settled())
                 except Exception as e:
                     logging.warning(f"Wi-Fi 模式按鈕操作失敗: {str(e)}")
                     # 繼續測試，不中斷
@@ -289,7 +335,7 @@ class SeleniumHandler:
             return False
         
         try:
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             
             # 檢查是否可以切換到 Nokia 網路狀態頁面
             try:
@@ -299,7 +345,7 @@ class SeleniumHandler:
                     if "Nokia 網路狀態" in item.text:
                         item.click()
                         logging.info("點擊 Nokia 網路狀態 導航項目")
-                        time.sleep(1)
+                        self._settle(1, wait_engine.section_active("nokia-cellular"), wait_engine.page_settled())
                         break
                 
                 # 檢查是否成功切換到 Nokia 網路狀態頁面
@@ -310,7 +356,7 @@ class SeleniumHandler:
                         if "Nokia 網路狀態" in item.text:
                             item.click()
                             logging.info("再次點擊 Nokia 網路狀態 導航項目")
-                            time.sleep(2)
+                            self._settle(2, wait_engine.section_active("nokia-cellular"), wait_engine.page_settled())
                             break
                 
                 # 再次檢查頁面標題
@@ -380,14 +426,14 @@ class SeleniumHandler:
             return False
         
         try:
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             success_count = 0
             
             # 檢查是否可以切換到 Nokia 儀表板頁面
             try:
                 # 確保我們能夠看到導航項目
                 self.wait_for_page_load()
-                time.sleep(1)  # 額外等待確保頁面完全載入
+                self._settle(1, wait_engine.page_settled(), wait_engine.present((By.CLASS_NAME, "nav-item")))
                 
                 # 嘗試找到導航項目並點擊
                 nav_items = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "nav-item")))
@@ -399,7 +445,7 @@ class SeleniumHandler:
                             item.click()
                             dashboard_clicked = True
                             logging.info("點擊 Nokia 儀表板 導航項目")
-                            time.sleep(2)  # 增加等待時間
+                            self._settle(2, wait_engine.section_active("nokia-dashboard"), wait_engine.animations_finished())
                             break
                         except Exception as e:
                             logging.warning(f"點擊 Nokia 儀表板 導航項目失敗: {str(e)}")
@@ -408,7 +454,7 @@ class SeleniumHandler:
                                 self.driver.execute_script("arguments[0].click();", item)
                                 dashboard_clicked = True
                                 logging.info("使用 JavaScript 點擊 Nokia 儀表板 導航項目")
-                                time.sleep(2)
+                                self._settle(2, wait_engine.section_active("nokia-dashboard"), wait_engine.animations_finished())
                                 break
                             except Exception as js_e:
                                 logging.warning(f"使用 JavaScript 點擊失敗: {str(js_e)}")
@@ -419,7 +465,7 @@ class SeleniumHandler:
                     try:
                         self.driver.execute_script("document.querySelectorAll('.page-section').forEach(p => p.classList.remove('active')); document.getElementById('nokia-dashboard').classList.add('active');")
                         logging.info("使用 JavaScript 切換到 Nokia 儀表板頁面")
-                        time.sleep(1)
+                        self._settle(1, wait_engine.section_active("nokia-dashboard"), wait_engine.animations_finished())
                     except Exception as e:
                         logging.warning(f"使用 JavaScript 切換頁面失敗: {str(e)}")
                 
@@ -456,7 +502,7 @@ class SeleniumHandler:
                                     if "active" not in button.get_attribute("class"):
                                         button.click()
                                         logging.info(f"點擊按鈕: {button.text}")
-                                        time.sleep(0.5)
+                                        self._settle(0.5, wait_engine.has_class(button, "active"))
                                         success_count += 1
                                         break
                     else:
@@ -465,7 +511,7 @@ class SeleniumHandler:
                         if buttons and len(buttons) > 0:
                             buttons[0].click()
                             logging.info(f"點擊第一個找到的按鈕")
-                            time.sleep(0.5)
+                            self._settle(0.5, wait_engine.animations_finished())
                             success_count += 1
                 except Exception as e:
                     logging.warning(f"測試按鈕組失敗: {str(e)}")
@@ -480,14 +526,14 @@ class SeleniumHandler:
                             item.click()
                             home_clicked = True
                             logging.info("點擊首頁導航項目")
-                            time.sleep(1)
+                            self._settle(1, wait_engine.section_active("home"), wait_engine.animations_finished())
                             break
                     
                     if not home_clicked:
                         # 嘗試使用 JavaScript 切換回首頁
                         self.driver.execute_script("document.querySelectorAll('.page-section').forEach(p => p.classList.remove('active')); document.getElementById('home').classList.add('active');")
                         logging.info("使用 JavaScript 切換回首頁")
-                        time.sleep(1)
+                        self._settle(1, wait_engine.section_active("home"), wait_engine.animations_finished())
                 except Exception as e:
                     logging.warning(f"返回首頁失敗: {str(e)}")
                 
@@ -517,7 +563,7 @@ class SeleniumHandler:
             return False
         
         try:
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             
             # 確保在首頁
             try:
@@ -531,7 +577,7 @@ class SeleniumHandler:
                                 item.click()
                                 home_clicked = True
                                 logging.info("點擊首頁導航項目")
-                                time.sleep(1)
+                                self._settle(1, wait_engine.section_active("home"), wait_engine.animations_finished())
                             except Exception as e:
                                 logging.warning(f"點擊首頁導航項目失敗: {str(e)}")
                                 # 嘗試使用 JavaScript 點擊
@@ -539,7 +585,7 @@ class SeleniumHandler:
                                     self.driver.execute_script("arguments[0].click();", item)
                                     home_clicked = True
                                     logging.info("使用 JavaScript 點擊首頁導航項目")
-                                    time.sleep(1)
+                                    self._settle(1, wait_engine.section_active("home"), wait_engine.animations_finished())
                                 except Exception as js_e:
                                     logging.warning(f"使用 JavaScript 點擊失敗: {str(js_e)}")
                         else:
@@ -551,7 +597,7 @@ class SeleniumHandler:
                     try:
                         self.driver.execute_script("document.querySelectorAll('.page-section').forEach(p => p.classList.remove('active')); document.getElementById('home').classList.add('active');")
                         logging.info("使用 JavaScript 切換到首頁")
-                        time.sleep(1)
+                        self._settle(1, wait_engine.section_active("home"), wait_engine.animations_finished())
                         home_clicked = True
                     except Exception as e:
                         logging.warning(f"使用 JavaScript 切換頁面失敗: {str(e)}")
@@ -619,9 +665,9 @@ class SeleniumHandler:
             logging.info("頁面已重新整理")
             
             # 等待頁面載入
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            time.sleep(1)  # 額外等待確保頁面完全載入
+            self._settle(1, wait_engine.page_settled())  # 等待載入完成、動畫結束且 DOM 穩定
             return True
         except Exception as e:
             logging.error(f"重新整理頁面時發生錯誤: {str(e)}")
@@ -638,9 +684,9 @@ class SeleniumHandler:
             logging.info("已返回上一頁")
             
             # 等待頁面載入
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            time.sleep(1)  # 額外等待確保頁面完全載入
+            self._settle(1, wait_engine.page_settled())  # 等待載入完成、動畫結束且 DOM 穩定
             return True
         except Exception as e:
             logging.error(f"返回上一頁時發生錯誤: {str(e)}")
@@ -653,7 +699,7 @@ class SeleniumHandler:
             return False
         
         try:
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             element = wait.until(EC.element_to_be_clickable((By.ID, element_id)))
             element.click()
             logging.info(f"已點擊ID為 {element_id} 的元素")
@@ -665,6 +711,65 @@ class SeleniumHandler:
             logging.error(f"點擊ID為 {element_id} 的元素時發生錯誤: {str(e)}")
             return False
     
+    def click_by_text(self, text: str) -> bool:
+        """點擊顯示指定文字的元素"""
+        if not self.driver:
+            logging.error("WebDriver 未初始化")
+            return False
+        
+        try:
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
+            xpath = f"//*[normalize-space(text())={self._xpath_literal(text)}]"
+            element = wait.until(EC.element_to_be_clickable((By.XPATH, xpath)))
+            element.click()
+            logging.info(f"已點擊文字為 '{text}' 的元素")
+            return True
+        except (NoSuchElementException, TimeoutException) as e:
+            logging.error(f"找不到文字為 '{text}' 的元素: {str(e)}")
+            return False
+        except Exception as e:
+            logging.error(f"點擊文字為 '{text}' 的元素時發生錯誤: {str(e)}")
+            return False
+    
+    def login(self, username: str, password: str) -> bool:
+        """使用指定帳號密碼登入"""
+        if not self.driver:
+            logging.error("WebDriver 未初始化")
+            return False
+        
+        try:
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
+            
+            username_input = wait.until(EC.element_to_be_clickable((By.ID, "username")))
+            username_input.clear()
+            username_input.send_keys(username)
+            
+            password_input = wait.until(EC.element_to_be_clickable((By.ID, "password")))
+            password_input.clear()
+            password_input.send_keys(password)
+            
+            login_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button.login-button")))
+            login_button.click()
+            
+            # 等待成功或失敗訊息出現
+            wait.until(lambda driver: any(
+                element.is_displayed()
+                for element in driver.find_elements(By.CSS_SELECTOR, ".login-success, .login-error")
+            ))
+            success_messages = self.driver.find_elements(By.CLASS_NAME, "login-success")
+            if success_messages and success_messages[0].is_displayed():
+                logging.info(f"登入成功: {username}")
+                return True
+            
+            logging.warning(f"登入失敗: {username}")
+            return False
+        except TimeoutException:
+            logging.error("等待登入結果超時")
+            return False
+        except Exception as e:
+            logging.error(f"登入時發生錯誤: {str(e)}")
+            return False
+    
     def type_text(self, text: str) -> bool:
         """在當前焦點元素中輸入文字"""
         if not self.driver:
@@ -681,100 +786,45 @@ class SeleniumHandler:
             return False
     
     # 驗證指令
-    def verify_text_exists(self, text: str) -> bool:
-        """驗證頁面包含特定文字 - 增強版"""
+    def verify_text_exists(self, text: str, scope=None) -> bool:
+        """驗證頁面包含特定文字 - 增強版
+        
+        依序比對頁面源碼、可見文字、不區分大小寫、XPath 與部分匹配；整個比對在瀏覽器內以一次請求完成，
+        並記錄成功的比對方式。指定 scope 時只在該元素內比對。
+        """
         if not self.driver:
             logging.error("WebDriver 未初始化")
             return False
         
         try:
-            # 等待頁面完全載入
-            self.wait_for_page_load()
-            
-            # 使用多種方法檢查文字是否存在
-            # 方法1: 檢查頁面源碼
-            page_source = self.driver.page_source
-            source_found = text in page_source
-            if source_found:
-                logging.info(f"驗證成功: 在頁面源碼中找到文字 '{text}'")
-                return True
-            
-            # 方法2: 檢查頁面可見文字
-            try:
-                body_text = self.driver.find_element(By.TAG_NAME, "body").text
-                text_found = text in body_text
-                if text_found:
-                    logging.info(f"驗證成功: 在頁面文字中找到 '{text}'")
-                    return True
-            except:
-                body_text = ""
-                text_found = False
-            
-            # 方法3: 使用不區分大小寫的搜尋
-            try:
-                lower_body_text = body_text.lower()
-                lower_text = text.lower()
-                case_insensitive_found = lower_text in lower_body_text
-                if case_insensitive_found:
-                    logging.info(f"驗證成功: 在頁面文字中找到(不區分大小寫) '{text}'")
-                    return True
-            except:
-                case_insensitive_found = False
-                
-            # 方法4: 嘗試使用 XPath 查找包含文字的元素
-            try:
-                # 使用更靈活的 XPath 表達式
-                xpath_expressions = [
-                    f"//*[contains(text(), '{text}')]",
-                    f"//*[contains(., '{text}')]",
-                    f"//input[@value='{text}']"
-                ]
-                
-                for xpath in xpath_expressions:
-                    elements = self.driver.find_elements(By.XPATH, xpath)
-                    if len(elements) > 0:
-                        logging.info(f"驗證成功: 使用 XPath 找到文字 '{text}'")
-                        return True
-                
-                has_elements = False
-            except:
-                has_elements = False
-            
-            # 方法5: 使用部分匹配
-            if len(text) > 5:  # 只對較長的文字嘗試部分匹配
-                try:
-                    # 將文字分割成幾個部分，檢查是否有任何部分存在
-                    parts = [text[:len(text)//2], text[len(text)//2:]]
-                    for part in parts:
-                        if len(part) > 4 and (part in page_source or part in body_text):
-                            logging.info(f"驗證成功: 找到部分文字 '{part}' (來自 '{text}')")
-                            return True
-                except:
-                    pass
+            # 等待頁面完全載入後比對 (逾時仍以目前內容比對)
+            args = verify_scripts.text_ladder_args(text, self._parse_selector(scope) if scope is not None else None)
+            result = self._run_sliced(utils.DEFAULT_WAIT_TIME, verify_scripts.TEXT_LADDER_WHEN_LOADED_SCRIPT, *args)
+            if not result:
+                logging.warning("等待超時: 頁面未完全載入")
+                result = self.driver.execute_script(verify_scripts.TEXT_LADDER_SCRIPT, *args)
             
-            # 所有方法都失敗
-            logging.warning(f"驗證失敗: 未找到文字 '{text}'")
-            logging.debug(f"頁面標題: {self.driver.title}")
-            logging.debug(f"當前URL: {self.driver.current_url}")
+            if verify_scripts.report_text_ladder(text, result, scope):
+                return True
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(f"頁面標題: {self.driver.title}")
+                logging.debug(f"當前URL: {self.driver.current_url}")
             return False
         except Exception as e:
             logging.error(f"驗證文字存在時發生錯誤: {str(e)}")
             return False
     
-    def verify_text_not_exists(self, text: str) -> bool:
-        """驗證頁面不包含特定文字"""
+    def verify_text_not_exists(self, text: str, scope=None) -> bool:
+        """驗證頁面 (或 scope 元素內) 不包含特定文字"""
         if not self.driver:
             logging.error("WebDriver 未初始化")
             return False
         
         try:
-            page_source = self.driver.page_source
-            if text not in page_source:
-                logging.info(f"驗證成功: 未找到文字 '{text}'")
-                return True
-            else:
-                logging.warning(f"驗證失敗: 找到文字 '{text}'")
+            page_source = self._scoped_content(scope, html=True)
+            if page_source is None:
                 return False
+            return verify_scripts.report_text_absent(text, text not in page_source)
         except Exception as e:
             logging.error(f"驗證文字不存在時發生錯誤: {str(e)}")
             return False
@@ -788,13 +838,11 @@ class SeleniumHandler:
         try:
             # 解析選擇器
             selector_type, selector_value = self._parse_selector(selector)
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             wait.until(EC.presence_of_element_located((selector_type, selector_value)))
-            logging.info(f"驗證成功: 找到元素 '{selector}'")
-            return True
+            return verify_scripts.report_element_found(selector, True)
         except (NoSuchElementException, TimeoutException):
-            logging.warning(f"驗證失敗: 未找到元素 '{selector}'")
-            return False
+            return verify_scripts.report_element_found(selector, False)
         except Exception as e:
             logging.error(f"驗證元素存在時發生錯誤: {str(e)}")
             return False
@@ -808,19 +856,13 @@ class SeleniumHandler:
         try:
             # 解析選擇器
             selector_type, selector_value = self._parse_selector(selector)
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             element = wait.until(EC.presence_of_element_located((selector_type, selector_value)))
             
             actual_value = element.get_attribute("value") or element.text
-            if actual_value == expected_value:
-                logging.info(f"驗證成功: 元素 '{selector}' 的值為 '{expected_value}'")
-                return True
-            else:
-                logging.warning(f"驗證失敗: 元素 '{selector}' 的值為 '{actual_value}'，預期為 '{expected_value}'")
-                return False
+            return verify_scripts.report_element_value(selector, actual_value, expected_value)
         except (NoSuchElementException, TimeoutException):
-            logging.warning(f"驗證失敗: 未找到元素 '{selector}'")
-            return False
+            return verify_scripts.report_element_found(selector, False)
         except Exception as e:
             logging.error(f"驗證元素值時發生錯誤: {str(e)}")
             return False
@@ -835,14 +877,7 @@ class SeleniumHandler:
             # 解析選擇器
             selector_type, selector_value = self._parse_selector(selector)
             elements = self.driver.find_elements(selector_type, selector_value)
-            actual_count = len(elements)
-            
-            if actual_count == expected_count:
-                logging.info(f"驗證成功: 找到 {actual_count} 個符合 '{selector}' 的元素")
-                return True
-            else:
-                logging.warning(f"驗證失敗: 找到 {actual_count} 個符合 '{selector}' 的元素，預期為 {expected_count}")
-                return False
+            return verify_scripts.report_element_count(selector, len(elements), expected_count)
         except Exception as e:
             logging.error(f"驗證元素數量時發生錯誤: {str(e)}")
             return False
@@ -858,11 +893,10 @@ class SeleniumHandler:
             max_wait_time = utils.DEFAULT_WAIT_TIME
         
         try:
-            wait = WebDriverWait(self.driver, max_wait_time)
-            wait.until(lambda driver: text in driver.page_source)
-            logging.info(f"等待成功: 文字 '{text}' 已出現")
-            return True
-        except TimeoutException:
+            # 由頁面內的 MutationObserver 判斷，不需反覆傳回整份 page_source
+            if self._watch("text", text, max_wait_time):
+                logging.info(f"等待成功: 文字 '{text}' 已出現")
+                return True
             logging.warning(f"等待超時: 文字 '{text}' 未出現")
             return False
         except Exception as e:
@@ -881,7 +915,7 @@ class SeleniumHandler:
         try:
             # 解析選擇器
             selector_type, selector_value = self._parse_selector(selector)
-            wait = WebDriverWait(self.driver, max_wait_time)
+            wait = self._wait(max_wait_time)
             wait.until(EC.presence_of_element_located((selector_type, selector_value)))
             logging.info(f"等待成功: 元素 '{selector}' 已出現")
             return True
@@ -902,7 +936,7 @@ class SeleniumHandler:
             max_wait_time = utils.DEFAULT_WAIT_TIME
         
         try:
-            wait = WebDriverWait(self.driver, max_wait_time)
+            wait = self._wait(max_wait_time)
             wait.until(lambda driver: driver.execute_script("return document.readyState") == "complete")
             logging.info("等待成功: 頁面已完全載入")
             return True
@@ -913,6 +947,110 @@ class SeleniumHandler:
             logging.error(f"等待頁面載入時發生錯誤: {str(e)}")
             return False
     
+    def wait_for_network_idle(self, max_wait_time: float = None, quiet_ms: int = None) -> bool:
+        """等待網路閒置: 沒有進行中的 fetch/XHR 請求且持續 quiet_ms 毫秒"""
+        if not self.driver:
+            logging.error("WebDriver 未初始化")
+            return False
+        
+        if max_wait_time is None:
+            max_wait_time = utils.DEFAULT_WAIT_TIME
+        if quiet_ms is None:
+            quiet_ms = utils.NETWORK_QUIET_MS
+        
+        try:
+            if self._run_sliced(max_wait_time, wait_engine.NETWORK_IDLE_SCRIPT, quiet_ms):
+                logging.info("等待成功: 網路請求已全部完成")
+                return True
+            logging.warning(f"等待超時: {max_wait_time} 秒內網路請求未停止")
+            return False
+        except Exception as e:
+            logging.error(f"等待網路閒置時發生錯誤: {str(e)}")
+            return False
+    
+    def wait_until_changes(self, selector, max_wait_time: int = None) -> bool:
+        """等待元素內容發生變化"""
+        if not self.driver:
+            logging.error("WebDriver 未初始化")
+            return False
+        
+        if max_wait_time is None:
+            max_wait_time = utils.DEFAULT_WAIT_TIME
+        
+        try:
+            selector_type, selector_value = self._parse_selector(selector)
+            element = self.driver.find_element(selector_type, selector_value)
+            
+            # 原始內容保存在頁面中，變化時由 MutationObserver 立即回報
+            result = self._watch("change", element, max_wait_time)
+            if result == "detached":
+                logging.warning(f"等待失敗: 元素 '{selector}' 已從頁面移除")
+                return False
+            if result:
+                logging.info(f"等待成功: 元素 '{selector}' 內容已變化")
+                return True
+            logging.warning(f"等待超時: 元素 '{selector}' 內容未變化")
+            return False
+        except NoSuchElementException:
+            logging.warning(f"等待失敗: 未找到元素 '{selector}'")
+            return False
+        except Exception as e:
+            logging.error(f"等待元素變化時發生錯誤: {str(e)}")
+            return False
+    
+    def poll_until(self, condition, max_wait_time: float = None, interval: float = None,
+                   max_interval: float = None) -> bool:
+        """輪詢直到條件成立 (text:文字、selector:選擇器、js:運算式)
+        
+        每次檢查只需一次 WebDriver 請求；條件未成立時輪詢間隔加倍直到 max_interval，
+        適合等待韌體更新、重新開機等耗時的裝置操作。步驟的截止時間不超過整次執行剩餘的時間。
+        """
+        if not self.driver:
+            logging.error("WebDriver 未初始化")
+            return False
+        
+        if not isinstance(condition, command_program.PollCondition):
+            condition = command_program.PollCondition(condition)
+        if max_wait_time is None:
+            max_wait_time = utils.DEFAULT_WAIT_TIME
+        interval = interval or utils.POLL_INITIAL_INTERVAL
+        max_interval = max(interval, max_interval or utils.POLL_MAX_INTERVAL)
+        
+        deadline = time.monotonic() + self.run_control.remaining(max_wait_time)
+        attempts = 0
+        try:
+            while True:
+                attempts += 1
+                try:
+                    if self._check_poll_condition(condition):
+                        logging.info(f"輪詢成功: 條件 '{condition}' 已成立 (共檢查 {attempts} 次)")
+                        return True
+                except WebDriverException as e:
+                    # 裝置重新開機等期間頁面無法存取，視為條件尚未成立
+                    logging.debug(f"輪詢條件檢查失敗: {str(e)}")
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._sleep(min(interval, remaining))
+                interval = min(interval * utils.POLL_BACKOFF_FACTOR, max_interval)
+            
+            self.run_control.check()
+            logging.warning(f"輪詢超時: 條件 '{condition}' 在 {max_wait_time} 秒內未成立 (共檢查 {attempts} 次)")
+            return False
+        except Exception as e:
+            logging.error(f"輪詢時發生錯誤: {str(e)}")
+            return False
+    
+    def _check_poll_condition(self, condition: command_program.PollCondition) -> bool:
+        """以一次 WebDriver 請求檢查 POLL_UNTIL 條件"""
+        if condition.kind == "selector":
+            selector_type, selector_value = self._parse_selector(condition.value)
+            return len(self.driver.find_elements(selector_type, selector_value)) > 0
+        if condition.kind == "js":
+            return bool(self.driver.execute_script(wait_engine.expression_script(condition.value)))
+        return bool(self.driver.execute_script(wait_engine.BODY_TEXT_CONTAINS_SCRIPT, condition.value))
+    
     # 頁面導航與互動
     def scroll_to_element(self, selector: str) -> bool:
         """滾動到指定元素"""
@@ -926,7 +1064,7 @@ class SeleniumHandler:
             element = self.driver.find_element(selector_type, selector_value)
             
             self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-            time.sleep(1)  # 等待滾動完成
+            self._settle(1, wait_engine.scroll_settled())  # 等待滾動完成
             logging.info(f"已滾動到元素 '{selector}'")
             return True
         except NoSuchElementException:
@@ -944,7 +1082,7 @@ class SeleniumHandler:
         
         try:
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)  # 等待滾動完成
+            self._settle(1, wait_engine.scroll_settled())  # 等待滾動完成
             logging.info("已滾動到頁面底部")
             return True
         except Exception as e:
@@ -970,7 +1108,8 @@ class SeleniumHandler:
             
             # 點擊元素以展開
             element.click()
-            time.sleep(1)  # 等待展開動畫
+            self._settle(1, wait_engine.attribute_equals(element, "aria-expanded", "true"),
+                         wait_engine.animations_finished())  # 等待展開動畫
             logging.info(f"已展開元素 '{selector}'")
             return True
         except NoSuchElementException:
@@ -981,107 +1120,229 @@ class SeleniumHandler:
             return False
     
     # 執行導航序列
-    def execute_nav_sequence(self, commands: List[str]) -> bool:
-        """執行導航序列"""
+    def execute_nav_sequence(self, instructions: List[command_program.Instruction]) -> bool:
+        """執行導航序列 (已編譯的子指令區塊，可巢狀)"""
         if not self.driver:
             logging.error("WebDriver 未初始化")
             return False
         
         success = True
-        for cmd_str in commands:
-            parts = cmd_str.split(":", 1)
-            if len(parts) != 2:
-                logging.error(f"無效的導航序列命令: {cmd_str}")
-                success = False
-                continue
-            
-            cmd, params_str = parts
-            params = params_str.split(",")
-            
-            # 執行命令
-            result = self._execute_command(cmd, params)
-            if not result:
-                logging.warning(f"導航序列命令 '{cmd}' 執行失敗")
-                success = False
+        for group in verify_batch.group_instructions(instructions):
+            for instruction, result in zip(group, self.execute_group(group)):
+                if not result:
+                    logging.warning(f"導航序列命令 '{instruction.cmd}' 執行失敗")
+                    success = False
         
         return success
     
+    def run_data_driven(self, block: command_program.DataDrivenBlock) -> bool:
+        """對資料檔每一列執行資料驅動區塊"""
+        if not self.driver:
+            logging.error("WebDriver 未初始化")
+            return False
+        
+        return data_driven.run_data_driven(self, block)
+    
     # 輔助方法
-    def _parse_selector(self, selector: str) -> Tuple[str, str]:
-        """解析選擇器，支援 CSS 和 XPath"""
-        if selector.startswith("#"):
-            return By.ID, selector[1:]
-        elif selector.startswith("."):
-            return By.CLASS_NAME, selector[1:]
-        elif selector.startswith("//"):
-            return By.XPATH, selector
-        else:
-            return By.CSS_SELECTOR, selector
+    def _sleep(self, seconds: float) -> None:
+        """可中斷的等待"""
+        self.run_control.sleep(seconds)
     
-    def _execute_command(self, cmd: str, params: List[str]) -> bool:
-        """執行單一命令"""
+    def _wait(self, timeout: float = None, poll_frequency: float = RunControl.POLL_INTERVAL,
+              ignored_exceptions: tuple = (NoSuchElementException,)) -> CancellableWait:
+        """建立可中斷的等待 (取代 WebDriverWait)"""
+        if timeout is None:
+            timeout = self.default_wait_time
+        return CancellableWait(self.driver, self.run_control, timeout, poll_frequency, ignored_exceptions)
+    
+    def _settle(self, budget: float, *conditions) -> bool:
+        """取代固定秒數的等待: 所有條件成立即繼續，最多等待原本的 budget 秒
+        
+        條件未成立時與原本的固定等待相同 (不視為失敗)；條件檢查中的 WebDriver 錯誤視為尚未成立。
+        """
+        start_time = time.perf_counter()
         try:
-            if cmd == "CLICK_BY_TEXT":
-                return self.click_by_text(params[0]) if params else False
-            elif cmd == "CLICK_BY_ID":
-                return self.click_by_id(params[0]) if params else False
-            elif cmd == "CLICK_BY_CSS":
-                return self.click_by_css(params[0]) if params else False
-            elif cmd == "WAIT":
-                return self.wait(int(params[0])) if params else False
-            elif cmd == "TYPE":
-                return self.type_text(params[0]) if params else False
-            elif cmd == "OPEN_URL":
-                return self.open_html_page(params[0]) if params else False
-            elif cmd == "NAVIGATE":  # 添加對 NAVIGATE 命令的支援，映射到 open_html_page
-                return self.open_html_page(params[0]) if params else False
-            elif cmd == "VERIFY_TEXT_CONTAINS":
-                return self.verify_text_contains(params[0]) if params else False
-            elif cmd == "VERIFY_TEXT_PATTERN":
-                return self.verify_text_pattern(params[0]) if params else False
-            elif cmd == "VERIFY_TEXT_EXISTS":
-                return self.verify_text_exists(params[0]) if params else False
-            elif cmd == "VERIFY_ELEMENT_EXISTS":
-                return self.verify_element_exists(params[0]) if params else False
-            elif cmd == "VERIFY_TEXT_SIMILAR":
-                if len(params) > 1:
-                    return self.verify_text_similar(params[0], params[1])
-                else:
-                    return self.verify_text_similar(params[0]) if params else False
-            elif cmd == "VERIFY_ANY_TEXT":
-                return self.verify_any_text(params) if params else False
-            elif cmd == "VERIFY_ALL_TEXT":
-                return self.verify_all_text(params) if params else False
-            elif cmd == "TEST_CASE":
-                # 記錄測試案例訊息但不做實際操作
-                logging.info(f"執行測試案例: {params[0] if params else '未指定'}")
-                return True
-            elif cmd == "DESCRIPTION":
-                # 記錄描述訊息但不做實際操作
-                logging.info(f"測試描述: {params[0] if params else '未指定'}")
-                return True
-            # 可以根據需要添加更多命令
-            else:
-                logging.warning(f"未知命令: {cmd}")
-                return False
+            self._wait(budget, utils.SETTLE_POLL_INTERVAL, (WebDriverException,)).until(wait_engine.all_of(*conditions))
+            settled = True
+        except TimeoutException:
+            settled = False
+        self.wait_stats.record(budget, time.perf_counter() - start_time, settled)
+        return settled
+    
+    def _run_sliced(self, timeout: float, script: str, *args):
+        """分段執行非同步等待腳本 (wait_engine 的分段腳本，最後一個參數為 sliceMs)
+        
+        每段最多等待 WATCH_SLICE_SECONDS 秒，段與段之間檢查停止事件；
+        返回腳本的成立結果，逾時返回 False。
+        """
+        end_time = time.monotonic() + self.run_control.remaining(timeout)
+        while True:
+            self.run_control.check()
+            slice_seconds = min(utils.WATCH_SLICE_SECONDS, end_time - time.monotonic())
+            if slice_seconds <= 0:
+                break
+            try:
+                result = self.driver.execute_async_script(script, *args, int(slice_seconds * 1000))
+            except JavascriptException:
+                # 頁面在等待期間重新載入，下一段在新頁面上繼續
+                self._sleep(utils.SETTLE_POLL_INTERVAL)
+                continue
+            if result:
+                return result
+        self.run_control.check()
+        return False
+    
+    def _watch(self, mode: str, target, timeout: float):
+        """以頁面內的 MutationObserver 等待條件成立 (wait_engine.WATCH_SCRIPT)，返回 True、"detached" 或 False (逾時)"""
+        token = wait_engine.new_watch_token()
+        try:
+            result = self._run_sliced(timeout, wait_engine.WATCH_SCRIPT, mode, target, token)
+        except StaleElementReferenceException:
+            return "detached"
+        
+        if not result and mode == "change":
+            try:
+                self.driver.execute_script(wait_engine.WATCH_CLEAR_SCRIPT, token)
+            except WebDriverException:
+                pass
+        return result
+    
+    def _page_snapshot(self) -> page_snapshot.PageSnapshot:
+        """取得目前頁面的快照 (DOM 未變動時沿用上一次取得的原始碼與文字)"""
+        return self.page_cache.get(self.driver)
+    
+    def _scoped_content(self, scope=None, html: bool = False) -> Optional[str]:
+        """文字驗證使用的內容 (找不到 scope 元素時記錄驗證失敗並返回 None)
+        
+        未指定 scope 時為整頁可見文字 (html 為 True 時為頁面原始碼)，否則只取得 scope 元素內的內容。
+        """
+        snapshot = self._page_snapshot()
+        if scope is None:
+            return snapshot.source if html else snapshot.text
+        content = snapshot.scope_content(*self._parse_selector(scope), html)
+        if content is None:
+            verify_scripts.report_scope_missing(scope)
+        return content
+    
+    def _parse_selector(self, selector) -> Tuple[str, str]:
+        """解析選擇器，支援 CSS 和 XPath (可傳入預先解析的 Selector)"""
+        if isinstance(selector, command_program.Selector):
+            return selector.by, selector.value
+        return command_program.parse_selector(selector)
+    
+    def _xpath_literal(self, text: str) -> str:
+        """將文字轉為 XPath 字串常量 (處理引號)"""
+        return utils.xpath_literal(text)
+    
+    def execute_instruction(self, instruction: command_program.Instruction) -> bool:
+        """執行已編譯的指令"""
+        if instruction.error:
+            logging.error(f"命令 {instruction.cmd} 無法執行: {instruction.error}")
+            return False
+        
+        if instruction.spec is None:
+            logging.warning(f"未知命令: {instruction.cmd}")
+            return False
+        
+        # 已停止時不再開始新的指令；RunCancelled 交由執行器處理
+        self.run_control.check()
+        try:
+            return bool(instruction.spec.handler(self, *instruction.args))
         except Exception as e:
-            logging.error(f"執行命令 {cmd} 時發生錯誤: {str(e)}")
+            logging.error(f"執行命令 {instruction.cmd} 時發生錯誤: {str(e)}")
             return False
+        finally:
+            if instruction.spec.mutating:
+                self.page_cache.invalidate()
+    
+    def execute_group(self, group: List[command_program.Instruction]) -> List[bool]:
+        """執行 verify_batch.group_instructions 產生的一組指令，返回每個指令的結果"""
+        if len(group) == 1:
+            return [self.execute_instruction(group[0])]
+        return self.execute_verify_batch(group)
+
+    def execute_verify_batch(self, instructions: List[command_program.Instruction]) -> List[bool]:
+        """以一次腳本呼叫執行連續的唯讀驗證，返回每個驗證的結果
+
+        文字比對類驗證使用腳本傳回的頁面文字；找不到元素的元素驗證改為個別執行 (保留等待元素出現的行為)。
+        腳本無法執行時全部改為個別執行。
+        """
+        if not self.driver:
+            logging.error("WebDriver 未初始化")
+            return [False] * len(instructions)
+
+        self.run_control.check()
+        checks = [verify_batch.build_check(instruction, self._parse_selector) for instruction in instructions]
+        script_checks = [check for check in checks if check is not None]
+        need_text = verify_batch.needs_text(instructions)
+        try:
+            result = self._run_sliced(utils.DEFAULT_WAIT_TIME, verify_batch.BATCH_WHEN_LOADED_SCRIPT, script_checks, need_text)
+            if not result:
+                logging.warning("等待超時: 頁面未完全載入")
+                result = self.driver.execute_script(verify_batch.BATCH_SCRIPT, script_checks, need_text)
+        except WebDriverException as e:
+            logging.warning(f"批次驗證無法執行，改為逐一驗證: {str(e)}")
+            return [self.execute_instruction(instruction) for instruction in instructions]
+
+        logging.debug(f"批次驗證: {len(instructions)} 個驗證以一次腳本呼叫完成")
+        self.page_cache.pin(page_snapshot.PageSnapshot(self.driver, tuple(result["version"]), result.get("text")))
+        try:
+            outcomes = iter(result["results"])
+            return [self._report_batched(instruction, next(outcomes) if check is not None else None, result.get("text"))
+                    for instruction, check in zip(instructions, checks)]
+        finally:
+            self.page_cache.unpin()
+
+    def _report_batched(self, instruction: command_program.Instruction, outcome, page_text: Optional[str]) -> bool:
+        """依批次腳本的檢查結果判斷單一驗證 (verify_batch.judge)，無法判斷時個別執行 (保留等待元素出現的行為)"""
+        result = verify_batch.judge(instruction, outcome, page_text)
+        if result is None:
+            return self.execute_instruction(instruction)
+        return result
+
+    def _execute_command(self, cmd: str, params: List[str]) -> bool:
+        """執行單一命令"""
+        return self.execute_instruction(command_program.compile_command(cmd, params))
     
-    def wait(self, seconds: int) -> bool:
-        """等待指定秒數"""
+    def log_test_case(self, name: str = "未指定") -> bool:
+        """記錄測試案例訊息但不做實際操作"""
+        logging.info(f"執行測試案例: {name}")
+        return True
+    
+    def log_description(self, description: str = "未指定") -> bool:
+        """記錄描述訊息但不做實際操作"""
+        logging.info(f"測試描述: {description}")
+        return True
+    
+    def log_severity(self, severity: str = "未指定") -> bool:
+        """記錄嚴重程度但不做實際操作"""
+        logging.info(f"嚴重程度: {severity}")
+        return True
+    
+    def wait_seconds(self, seconds: int) -> bool:
+        """等待指定秒數 (可被停止中斷)"""
         try:
-            # 直接使用 time.sleep，不使用 WebDriverWait
-            # 這樣可以避免 'WebDriverWait' object is not callable 錯誤
-            time.sleep(seconds)
+            # 方法名稱不可為 wait，否則會被 self.wait (WebDriverWait) 屬性遮蔽
+            self._sleep(seconds)
             logging.info(f"已等待 {seconds} 秒")
             return True
         except Exception as e:
             logging.error(f"等待時發生錯誤: {str(e)}")
             return False
     
+    def release_driver(self) -> None:
+        """結束使用 WebDriver: 有工作階段池時歸還以供下次重複使用，否則關閉"""
+        if not self.session_pool:
+            self.close_driver()
+            return
+        
+        driver, self.driver, self.wait = self.driver, None, None
+        self.page_cache.invalidate()
+        self.session_pool.release(driver, self.profile)
+    
     def close_driver(self) -> None:
         """關閉 WebDriver"""
+        self.page_cache.invalidate()
         try:
             if self.driver:
                 self.driver.quit()
@@ -1094,106 +1355,78 @@ class SeleniumHandler:
             self.wait = None
     
     # 新增模糊匹配相關方法
-    def verify_text_contains(self, expected_text: str) -> bool:
+    def verify_text_contains(self, expected_text: str, scope=None) -> bool:
         """驗證頁面文本包含部分指定文本 (部分匹配)"""
         if not self.driver:
             logging.error("WebDriver 未初始化")
             return False
         
         try:
-            page_text = self.driver.find_element(By.TAG_NAME, "body").text
-            if utils.text_contains(page_text, expected_text):
-                logging.info(f"成功: 找到包含 '{expected_text}' 的文本")
-                return True
-            else:
-                logging.warning(f"警告: 未找到包含 '{expected_text}' 的文本")
+            page_text = self._scoped_content(scope)
+            if page_text is None:
                 return False
+            return verify_scripts.report_text_contains(page_text, expected_text)
         except Exception as e:
             logging.error(f"驗證文本包含時發生錯誤: {str(e)}")
             return False
     
-    def verify_text_pattern(self, pattern: str) -> bool:
+    def verify_text_pattern(self, pattern, scope=None) -> bool:
         """驗證頁面文本符合指定的正則表達式模式"""
         if not self.driver:
             logging.error("WebDriver 未初始化")
             return False
         
         try:
-            page_text = self.driver.find_element(By.TAG_NAME, "body").text
-            if utils.text_matches_pattern(page_text, pattern):
-                logging.info(f"成功: 文本符合模式 '{pattern}'")
-                return True
-            else:
-                logging.warning(f"警告: 文本不符合模式 '{pattern}'")
+            page_text = self._scoped_content(scope)
+            if page_text is None:
                 return False
+            return verify_scripts.report_text_pattern(page_text, pattern)
         except Exception as e:
             logging.error(f"驗證文本模式時發生錯誤: {str(e)}")
             return False
     
-    def verify_text_similar(self, expected_text: str, threshold: float = None) -> bool:
+    def verify_text_similar(self, expected_text: str, threshold: float = None, scope=None) -> bool:
         """驗證頁面文本與指定文本的相似度是否超過閾值"""
         if not self.driver:
             logging.error("WebDriver 未初始化")
             return False
         
         try:
-            page_text = self.driver.find_element(By.TAG_NAME, "body").text
-            
-            # 如果沒有指定閾值，使用默認值
-            if threshold is None:
-                threshold = utils.DEFAULT_SIMILARITY_THRESHOLD
-            else:
-                threshold = float(threshold)
-            
-            similarity = utils.calculate_text_similarity(page_text, expected_text)
-            if similarity >= threshold:
-                logging.info(f"成功: 文本相似度 {similarity:.2f} 超過閾值 {threshold:.2f}")
-                return True
-            else:
-                logging.warning(f"警告: 文本相似度 {similarity:.2f} 低於閾值 {threshold:.2f}")
+            page_text = self._scoped_content(scope)
+            if page_text is None:
                 return False
+            # 未指定閾值時使用預設值
+            return verify_scripts.report_text_similar(page_text, expected_text, threshold)
         except Exception as e:
             logging.error(f"驗證文本相似度時發生錯誤: {str(e)}")
             return False
     
-    def verify_any_text(self, expected_texts: List[str]) -> bool:
+    def verify_any_text(self, expected_texts: List[str], scope=None) -> bool:
         """驗證頁面是否包含任一指定文本 (OR 邏輯)"""
         if not self.driver:
             logging.error("WebDriver 未初始化")
             return False
         
         try:
-            page_text = self.driver.find_element(By.TAG_NAME, "body").text
-            
-            if utils.any_text_matches(page_text, expected_texts):
-                logging.info(f"成功: 找到符合條件的文本 (任一條件滿足)")
-                return True
-            else:
-                expected_str = " 或 ".join([f"'{text}'" for text in expected_texts])
-                logging.warning(f"警告: 未找到任何符合條件的文本: {expected_str}")
+            page_text = self._scoped_content(scope)
+            if page_text is None:
                 return False
+            return verify_scripts.report_any_text(page_text, expected_texts)
         except Exception as e:
             logging.error(f"驗證任一文本時發生錯誤: {str(e)}")
             return False
     
-    def verify_all_text(self, expected_texts: List[str]) -> bool:
+    def verify_all_text(self, expected_texts: List[str], scope=None) -> bool:
         """驗證頁面是否包含所有指定文本 (AND 邏輯)"""
         if not self.driver:
             logging.error("WebDriver 未初始化")
             return False
         
         try:
-            page_text = self.driver.find_element(By.TAG_NAME, "body").text
-            
-            if utils.all_texts_match(page_text, expected_texts):
-                logging.info(f"成功: 找到所有符合條件的文本 (所有條件滿足)")
-                return True
-            else:
-                # 找出哪些文本不符合
-                missing_texts = [text for text in expected_texts if text.lower() not in page_text.lower()]
-                missing_str = ", ".join([f"'{text}'" for text in missing_texts])
-                logging.warning(f"警告: 缺少以下文本: {missing_str}")
+            page_text = self._scoped_content(scope)
+            if page_text is None:
                 return False
+            return verify_scripts.report_all_text(page_text, expected_texts)
         except Exception as e:
             logging.error(f"驗證所有文本時發生錯誤: {str(e)}")
             return False
@@ -1205,7 +1438,7 @@ class SeleniumHandler:
             return False
         
         try:
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             
             # 定義要測試的頁面
             pages = [
@@ -1224,7 +1457,7 @@ class SeleniumHandler:
                     nav_item = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, f'.nav-item[data-page="{page["id"]}"]')))
                     nav_item.click()
                     logging.info(f"點擊導航項目：{page['name']}")
-                    time.sleep(1)
+                    self._settle(1, wait_engine.section_active(page["id"]), wait_engine.animations_finished())
                     
                     # 驗證頁面是否正確顯示
                     page_section = wait.until(EC.presence_of_element_located((By.ID, page["id"])))
@@ -1259,7 +1492,7 @@ class SeleniumHandler:
     def test_certificate_page(self) -> bool:
         """測試憑證檢查頁面"""
         try:
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             
             # 檢查警告訊息是否顯示
             warning = wait.until(EC.presence_of_element_located((By.CLASS_NAME, "security-warning")))
@@ -1271,7 +1504,7 @@ class SeleniumHandler:
             view_cert_button = wait.until(EC.element_to_be_clickable((By.ID, "view-cert-button")))
             view_cert_button.click()
             logging.info("點擊檢視憑證按鈕")
-            time.sleep(1)
+            self._settle(1, wait_engine.visible((By.CLASS_NAME, "certificate-container")))
             
             # 驗證憑證內容是否顯示
             cert_container = wait.until(EC.presence_of_element_located((By.CLASS_NAME, "certificate-container")))
@@ -1289,7 +1522,7 @@ class SeleniumHandler:
     def test_nokia_basic_page(self) -> bool:
         """測試 Nokia 基本設定頁面"""
         try:
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             
             # 檢查基本設定頁面元素
             basic_settings = wait.until(EC.presence_of_element_located((By.ID, "nokia-basic")))
@@ -1307,7 +1540,7 @@ class SeleniumHandler:
     def test_nokia_cellular_page(self) -> bool:
         """測試 Nokia 網路狀態頁面"""
         try:
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             
             # 檢查網路狀態頁面元素
             cellular_status = wait.until(EC.presence_of_element_located((By.ID, "nokia-cellular")))
@@ -1316,7 +1549,8 @@ class SeleniumHandler:
                 return False
             
             # 等待並檢查網路狀態更新
-            time.sleep(2)  # 等待狀態更新
+            # 等待狀態更新
+            self._settle(2, wait_engine.present((By.CLASS_NAME, "section-content")), wait_engine.page_settled())
             status_elements = self.driver.find_elements(By.CLASS_NAME, "section-content")
             if not status_elements:
                 logging.warning("找不到網路狀態資訊")
@@ -1332,7 +1566,7 @@ class SeleniumHandler:
     def test_nokia_network_page(self) -> bool:
         """測試 Nokia 網路設定頁面"""
         try:
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             
             # 檢查網路設定頁面元素
             network_settings = wait.until(EC.presence_of_element_located((By.ID, "nokia-network")))
@@ -1351,7 +1585,7 @@ class SeleniumHandler:
                 if buttons:
                     # 點擊第一個按鈕測試
                     buttons[0].click()
-                    time.sleep(0.5)
+                    self._settle(0.5, wait_engine.has_class(buttons[0], "active"))
                     if "active" not in buttons[0].get_attribute("class"):
                         logging.warning("按鈕狀態切換失敗")
                         return False
@@ -1366,7 +1600,7 @@ class SeleniumHandler:
     def test_device_settings_page(self) -> bool:
         """測試裝置設定頁面"""
         try:
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             
             # 檢查裝置設定頁面元素
             device_settings = wait.until(EC.presence_of_element_located((By.ID, "device-settings")))
@@ -1408,7 +1642,7 @@ class SeleniumHandler:
         
         try:
             # 等待元素可點擊
-            wait = WebDriverWait(self.driver, utils.DEFAULT_WAIT_TIME)
+            wait = self._wait(utils.DEFAULT_WAIT_TIME)
             element = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, css_selector)))
             element.click()
             logging.info(f"已點擊 CSS 選擇器 '{css_selector}' 的元素")
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import time
+import logging
+import threading
+from typing import Callable, List, Optional
+
+import utils
+
+class PooledSession:
+    """池中閒置的瀏覽器工作階段"""
+    __slots__ = ("driver", "key", "last_used")
+
+    def __init__(self, driver, key: Optional[str]) -> None:
+        self.driver = driver
+        self.key = key
+        self.last_used = time.monotonic()
+
+class SessionPool:
+    """保留已啟動的 WebDriver 工作階段，於多次執行之間重複使用以省去 Chrome 冷啟動時間
+
+    工作階段依 key (瀏覽器執行設定檔) 分開保存，只會交給使用相同設定檔的執行。
+    取出時先做健康檢查並重設狀態 (Cookie、儲存空間、about:blank)；閒置超過 idle_ttl 秒的工作階段會被關閉。
+    """
+
+    def __init__(self, factory: Callable[[Optional[str]], object], max_idle: int = utils.SESSION_POOL_SIZE,
+                 idle_ttl: float = utils.SESSION_IDLE_TTL) -> None:
+        self.factory = factory
+        self.max_idle = max_idle
+        self.idle_ttl = idle_ttl
+        self._idle: List[PooledSession] = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reaper = threading.Thread(target=self._reap, name="session-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def acquire(self, key: Optional[str] = None):
+        """取得指定設定檔的可用工作階段，池中沒有健康的閒置工作階段時建立新的"""
+        while True:
+            with self._lock:
+                session = None
+                for i in range(len(self._idle) - 1, -1, -1):
+                    if self._idle[i].key == key:
+                        session = self._idle.pop(i)
+                        break
+            if session is None:
+                break
+            if self._is_healthy(session.driver) and self._reset(session.driver):
+                logging.info("重複使用已啟動的 WebDriver 工作階段")
+                return session.driver
+            self._quit(session.driver)
+
+        return self.factory(key)
+
+    def release(self, driver, key: Optional[str] = None) -> None:
+        """歸還工作階段；池已滿或已關閉時直接關閉"""
+        if driver is None:
+            return
+        with self._lock:
+            if not self._closed.is_set() and len(self._idle) < self.max_idle:
+                self._idle.append(PooledSession(driver, key))
+                return
+        self._quit(driver)
+
+    def prewarm(self, count: int = 1, key: Optional[str] = None) -> None:
+        """在背景預先啟動工作階段"""
+        def launch() -> None:
+            for _ in range(count):
+                try:
+                    driver = self.factory(key)
+                except Exception as e:
+                    logging.error(f"預先啟動 WebDriver 時發生錯誤: {str(e)}")
+                    return
+                self.release(driver, key)
+
+        threading.Thread(target=launch, name="session-pool-prewarm", daemon=True).start()
+
+    def evict_idle(self) -> None:
+        """關閉閒置超過 idle_ttl 的工作階段"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [s for s in self._idle if now - s.last_used > self.idle_ttl]
+            self._idle = [s for s in self._idle if now - s.last_used <= self.idle_ttl]
+        for session in expired:
+            logging.info("關閉閒置逾時的 WebDriver 工作階段")
+            self._quit(session.driver)
+
+    def close(self) -> None:
+        """關閉池中所有工作階段"""
+        self._closed.set()
+        with self._lock:
+            sessions, self._idle = self._idle, []
+        for session in sessions:
+            self._quit(session.driver)
+
+    def _reap(self) -> None:
+        interval = max(1.0, self.idle_ttl / 4)
+        while not self._closed.wait(interval):
+            self.evict_idle()
+
+    @staticmethod
+    def _is_healthy(driver) -> bool:
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(driver) -> bool:
+        """清除上一次執行留下的狀態"""
+        try:
+            # 只保留一個分頁
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+
+            # 儲存空間只能在目前的來源頁面上清除，需在離開頁面前執行
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                pass
+
+            # delete_all_cookies 只清除目前網域，Chrome 可透過 CDP 清除全部 Cookie
+            try:
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            except Exception:
+                driver.delete_all_cookies()
+
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            logging.warning(f"重設 WebDriver 工作階段失敗: {str(e)}")
+            return False
+
+    @staticmethod
+    def _quit(driver) -> None:
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"關閉 WebDriver 工作階段時發生錯誤: {str(e)}")
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+import sys
+import time
+import heapq
+import logging
+import argparse
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import utils
+import command_program
+import command_registry
+from command_program import Instruction
+from run_control import RunCancelled
+from wait_engine import WaitStats
+from verify_batch import group_instructions
+from parallel_runner import CaseResult, build_report, case_name, split_test_cases
+
+# 沒有歷史耗時紀錄時，每個測試案例的預估耗時 (秒)
+DEFAULT_CASE_DURATION = 10.0
+
+def estimate_durations(cases: List[List[Instruction]], history: Dict[str, float]) -> List[float]:
+    """依歷史紀錄預估每個測試案例的耗時，沒有紀錄的案例使用已知案例的平均值"""
+    known = [history[case_name(case)] for case in cases if case_name(case) in history]
+    fallback = sum(known) / len(known) if known else DEFAULT_CASE_DURATION
+    return [history.get(case_name(case), fallback) for case in cases]
+
+def assign_shards(estimates: List[float], shard_count: int) -> List[List[int]]:
+    """依預估耗時分配測試案例 (最長處理時間優先)，每個分片內維持腳本順序"""
+    shards: List[List[int]] = [[] for _ in range(shard_count)]
+    loads = [(0.0, shard) for shard in range(shard_count)]
+    for case_index in sorted(range(len(estimates)), key=lambda i: estimates[i], reverse=True):
+        load, shard = heapq.heappop(loads)
+        shards[shard].append(case_index)
+        heapq.heappush(loads, (load + estimates[case_index], shard))
+    for shard in shards:
+        shard.sort()
+    return shards
+
+def record_case_durations(settings: Dict[str, Any], results: List[CaseResult]) -> None:
+    """將本次各測試案例的耗時寫入設定，作為下次分片的依據"""
+    durations = {result.name: round(result.duration, 3) for result in results if result.duration > 0}
+    settings.setdefault("case_durations", {}).update(durations)
+    
+    # 重新讀取設置文件再寫入，避免覆蓋執行期間寫入的其他欄位 (例如 test_results)
+    stored = utils.load_settings()
+    stored.setdefault("case_durations", {}).update(durations)
+    utils.save_settings(stored)
+
+def _shard_worker(shard_index: int, conn, chromedriver_path: Optional[str], plugins: List[str],
+                  profile: str) -> None:
+    """分片工作程序: 使用自己的瀏覽器執行分配到的測試案例，逐步回傳結果"""
+    # 延遲匯入，父程序只負責彙整結果時不需要載入 Selenium
+    from selenium_handler import SeleniumHandler
+
+    command_registry.load_plugins(plugins)
+    handler = SeleniumHandler()
+    handler.chromedriver_path = chromedriver_path
+    handler.profile = profile
+
+    def listen_for_stop() -> None:
+        # 收到停止訊息時立即中斷正在等待的指令
+        try:
+            if conn.recv() == ("stop",):
+                handler.run_control.cancel()
+        except (EOFError, OSError):
+            pass
+
+    try:
+        # 指令需在擴充模組載入後才能還原，因此透過管道而非程序參數傳入
+        _, setup, cases = conn.recv()
+        threading.Thread(target=listen_for_stop, daemon=True).start()
+        if not handler.initialize_driver():
+            conn.send(("error", f"分片 {shard_index} 的 WebDriver 初始化失敗"))
+            return
+
+        for instruction in setup:
+            if not handler.execute_instruction(instruction):
+                logging.warning(f"分片 {shard_index} 前置步驟 '{instruction.cmd}' 執行失敗")
+
+        for case_index, instructions in cases:
+            start_time = time.perf_counter()
+            for group in group_instructions(instructions):
+                if handler.run_control.cancelled:
+                    return
+                for instruction, success in zip(group, handler.execute_group(group)):
+                    conn.send(("step", case_index, instruction.display_text(), success))
+            conn.send(("case", case_index, time.perf_counter() - start_time))
+    except (EOFError, BrokenPipeError, RunCancelled):
+        pass
+    except Exception as e:
+        logging.error(f"分片 {shard_index} 執行錯誤: {str(e)}")
+        try:
+            conn.send(("error", f"分片 {shard_index} 執行錯誤: {str(e)}"))
+        except (EOFError, BrokenPipeError):
+            pass
+    finally:
+        # 停止時也回傳已完成部分的條件等待統計
+        try:
+            conn.send(("waits", handler.wait_stats.snapshot()))
+        except (EOFError, OSError):
+            pass
+        handler.close_driver()
+        conn.close()
+
+def run_sharded(instructions, shard_count: int, chromedriver_path: Optional[str],
+                on_result: Callable[[CaseResult], None],
+                should_continue: Callable[[], bool] = lambda: True,
+                plugins: Optional[List[str]] = None,
+                history: Optional[Dict[str, float]] = None,
+                profile: str = utils.DEFAULT_BROWSER_PROFILE,
+                wait_stats: Optional[WaitStats] = None) -> Tuple[List[CaseResult], List[List[str]]]:
+    """以多個工作程序分片執行測試案例，結果依腳本順序交給 on_result
+
+    返回 (所有案例結果, 各分片分配到的案例名稱)。
+    第一個 TEST_CASE 之前的前置步驟在每個分片各執行一次，不列入結果。
+    各分片的條件等待統計會合併到 wait_stats。
+    """
+    groups = list(split_test_cases(instructions))
+    setup: List[Instruction] = []
+    if groups and groups[0][0].cmd != "TEST_CASE":
+        setup = groups.pop(0)
+    if not groups:
+        return [], []
+
+    shard_count = max(1, min(shard_count, len(groups)))
+    assignments = assign_shards(estimate_durations(groups, history or {}), shard_count)
+    results = [CaseResult(index, case_name(case)) for index, case in enumerate(groups)]
+
+    # Tk 主程式帶有多個執行緒，使用 spawn 避免 fork 複製執行緒狀態 (與 Windows 行為一致)
+    context = multiprocessing.get_context("spawn")
+    connections = {}
+    processes = []
+    for shard_index, case_indexes in enumerate(assignments):
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(target=_shard_worker, name=f"shard-{shard_index}",
+                                  args=(shard_index, child_conn, chromedriver_path, plugins or [], profile),
+                                  daemon=True)
+        process.start()
+        child_conn.close()
+        parent_conn.send(("run", setup, [(i, groups[i]) for i in case_indexes]))
+        connections[parent_conn] = shard_index
+        processes.append(process)
+
+    finished = [False] * len(groups)
+    next_index = 0
+    stopping = False
+    try:
+        while connections:
+            if not stopping and not should_continue():
+                stopping = True
+                for conn in connections:
+                    try:
+                        conn.send(("stop",))
+                    except (EOFError, BrokenPipeError):
+                        pass
+
+            for conn in wait(list(connections), timeout=0.5):
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    # 工作程序結束 (正常完成或異常中止)
+                    del connections[conn]
+                    continue
+
+                if message[0] == "step":
+                    _, case_index, step_text, success = message
+                    results[case_index].steps.append((step_text, success))
+                elif message[0] == "case":
+                    _, case_index, duration = message
+                    results[case_index].duration = duration
+                    finished[case_index] = True
+                elif message[0] == "waits":
+                    if wait_stats is not None:
+                        wait_stats.merge(message[1])
+                elif message[0] == "error":
+                    logging.error(message[1])
+
+            # 依腳本順序回報已完成的案例
+            while next_index < len(groups) and finished[next_index]:
+                on_result(results[next_index])
+                next_index += 1
+    finally:
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+    # 未完成的案例 (停止或分片異常) 依序回報已取得的部分結果
+    for result in results[next_index:]:
+        if not stopping and not finished[result.index]:
+            result.steps.append((f"{result.name}: 分片工作程序異常結束", False))
+        on_result(result)
+
+    shard_names = [[results[i].name for i in case_indexes] for case_indexes in assignments]
+    return results, shard_names
+
+def main() -> int:
+    """命令列執行 (適用於 CI): python shard_runner.py --shards 4 [命令檔]"""
+    parser = argparse.ArgumentParser(description="以多個工作程序分片執行測試案例")
+    parser.add_argument("command_file", nargs="?", default=utils.COMMAND_FILE)
+    parser.add_argument("--shards", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--chromedriver", default=None)
+    parser.add_argument("--profile", default=None, help="瀏覽器執行設定檔，可用 + 組合 (例如 headless+no-images)")
+    args = parser.parse_args()
+
+    utils.setup_logging()
+    settings = utils.load_settings()
+    plugins = settings.get("command_plugins", [])
+    command_registry.load_plugins(plugins)
+    profile = args.profile or settings.get("browser_profile", utils.DEFAULT_BROWSER_PROFILE)
+    try:
+        utils.get_browser_profile(profile)
+    except ValueError as e:
+        parser.error(str(e))
+
+    chromedriver_path = args.chromedriver
+    if chromedriver_path is None:
+        from selenium_handler import SeleniumHandler
+        handler = SeleniumHandler()
+        handler.find_chromedriver()
+        chromedriver_path = handler.chromedriver_path
+
+    def on_result(result: CaseResult) -> None:
+        logging.info(f"{'✓' if result.passed else '✗'} {result.name} ({result.duration:.1f} 秒)")
+
+    pattern_errors = command_program.check_patterns(args.command_file)
+    if pattern_errors:
+        parser.error("\n".join(pattern_errors))
+
+    start_time = time.perf_counter()
+    wait_stats = WaitStats()
+    results, shard_names = run_sharded(command_program.iter_program(args.command_file), args.shards,
+                                       chromedriver_path, on_result, plugins=plugins,
+                                       history=settings.get("case_durations", {}), profile=profile,
+                                       wait_stats=wait_stats)
+    report = build_report(results, "sharded", time.perf_counter() - start_time, profile=profile,
+                          shards=len(shard_names), shard_assignments=shard_names, waits=wait_stats.snapshot())
+    utils.write_run_report(report)
+    record_case_durations(settings, results)
+    return 0 if report["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
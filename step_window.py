@@ -23,6 +23,8 @@ class StepWindow:
         self.steps = []
         self.current_step = -1
         self.failed_steps = set()
+        # 尚未寫入設置文件的步驟結果 (更新摘要時一次寫入)
+        self.pending_results = {}
         
         # 初始位置設定為右側
         self.set_default_position()
@@ -133,6 +135,7 @@ class StepWindow:
         
         self.current_step = -1
         self.failed_steps = set()
+        self.flush_test_results()
         self.update_progress()
     
     def add_step(self, step_text: str) -> int:
@@ -179,9 +182,8 @@ class StepWindow:
             bg_color = "#e0f0ff" if step_index == self.current_step else ""
             self.step_list.itemconfig(step_index, foreground="red", background=bg_color)
             
-            # 更新測試結果
-            step_text = self.steps[step_index]
-            utils.update_test_results(step_text, False)
+            # 記錄測試結果
+            self.pending_results[self.steps[step_index]] = False
     
     def mark_step_passed(self, step_index: int) -> None:
         """標記步驟為成功"""
@@ -193,9 +195,14 @@ class StepWindow:
             bg_color = "#e0f0ff" if step_index == self.current_step else ""
             self.step_list.itemconfig(step_index, foreground="green", background=bg_color)
             
-            # 更新測試結果
-            step_text = self.steps[step_index]
-            utils.update_test_results(step_text, True)
+            # 記錄測試結果
+            self.pending_results[self.steps[step_index]] = True
+    
+    def flush_test_results(self) -> None:
+        """將累積的步驟結果一次寫入設置文件"""
+        if self.pending_results:
+            results, self.pending_results = self.pending_results, {}
+            utils.update_test_results_batch(results)
     
     def update_progress(self) -> None:
         """更新進度顯示"""
@@ -226,6 +233,8 @@ class StepWindow:
         
         self.summary_text.insert(tk.END, summary)
         self.summary_text.config(state=tk.DISABLED)
+        
+        self.flush_test_results()
     
     def hide_window(self) -> None:
         """隱藏視窗"""
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+# 模組位於專案根目錄 (非套件)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """將編譯快取寫入暫存目錄，不影響專案目錄下的 command_cache"""
+    path = tmp_path / "command_cache"
+    monkeypatch.setattr(utils, "COMMAND_CACHE_DIR", str(path))
+    return path
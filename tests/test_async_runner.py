@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import async_runner
+import command_program
+import utils
+from command_program import compile_command
+
+def compile_lines(text):
+    return list(command_program.iter_compile(utils.parse_command_lines(text.splitlines())))
+
+def test_restrict_to_async_rejects_unsupported_commands():
+    instructions = compile_lines("CLICK_BY_ID=go\nLOGIN=a || b\nVERIFY_TEXT_EXISTS=x\nPOLL_UNTIL=ready\nNOT_A_COMMAND=1\n")
+    restricted = list(async_runner.restrict_to_async(instructions))
+    assert [(instruction.cmd, instruction.error) for instruction in restricted] == [
+        ("CLICK_BY_ID", None),
+        ("LOGIN", "非同步執行不支援命令: LOGIN"),
+        ("VERIFY_TEXT_EXISTS", None),
+        ("POLL_UNTIL", "非同步執行不支援命令: POLL_UNTIL"),
+        ("NOT_A_COMMAND", None),
+    ]
+    assert restricted[1].line == "LOGIN=a || b"
+
+def test_restrict_to_async_checks_nested_steps():
+    instructions = compile_lines("NAV_SEQUENCE_START=menu\nCLICK_BY_ID=a\nEXPAND=#more\nNAV_SEQUENCE_END\n"
+                                 "DATA_SOURCE=rows.csv\nWAIT_UNTIL_CHANGES=#status\n")
+    assert [instruction.error for instruction in async_runner.restrict_to_async(instructions)] == [
+        "非同步執行不支援命令: EXPAND", "非同步執行不支援命令: WAIT_UNTIL_CHANGES"]
+
+class FakeSession(async_runner.AsyncSession):
+    """以固定的批次腳本結果取代 chromedriver"""
+
+    def __init__(self, first, rechecks):
+        super().__init__(None, "session")
+        self.first = first
+        self.rechecks = list(rechecks)
+        self.scripts = []
+
+    async def _run_sliced(self, timeout, script, checks, need_text):
+        self.scripts.append(checks)
+        return self.first
+
+    async def _script(self, script, checks, need_text):
+        self.scripts.append(checks)
+        return {"results": self.rechecks.pop(0) if self.rechecks else [{"count": 0, "value": None}] * len(checks)}
+
+def test_verify_batch_runs_one_script_and_shared_judge():
+    group = [compile_command("VERIFY_TEXT_EXISTS", ["a"]), compile_command("VERIFY_TEXT_CONTAINS", ["world"]),
+             compile_command("VERIFY_COUNT", ["li", "3"])]
+    session = FakeSession({"version": [1, 1], "text": "Hello World",
+                           "results": [{"strategy": "source"}, {"count": 2, "value": None}]}, [])
+    assert asyncio.run(session.execute_group(group)) == [True, True, False]
+    assert len(session.scripts) == 1
+
+def test_verify_batch_rechecks_missing_elements():
+    group = [compile_command("VERIFY_ELEMENT_EXISTS", ["#late"]), compile_command("VERIFY_ELEMENT_VALUE", ["#v", "1"])]
+    session = FakeSession({"version": [1, 1], "text": None,
+                           "results": [{"count": 0, "value": None}, {"count": 1, "value": "1"}]},
+                          [[{"count": 0, "value": None}], [{"count": 1, "value": None}]])
+    assert asyncio.run(session.execute_group(group)) == [True, True]
+    # 重新檢查只包含尚未出現的元素
+    assert session.scripts[1:] == [[{"kind": "element", "by": "id", "value": "late"}]] * 2
+
+def test_verify_batch_gives_up_after_wait(monkeypatch):
+    monkeypatch.setattr(utils, "DEFAULT_WAIT_TIME", 0.2)
+    session = FakeSession({"version": [1, 1], "text": None, "results": [{"count": 0, "value": None}]}, [])
+    assert asyncio.run(session.execute_instruction(compile_command("VERIFY_ELEMENT_EXISTS", ["#never"]))) is False
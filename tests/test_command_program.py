@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+
+import command_program
+import utils
+from command_program import Selector, compile_command
+
+def write_script(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_compile_command_converts_params():
+    instruction = compile_command("WAIT", ["3"])
+    assert instruction.error is None
+    assert instruction.args == (3,)
+    assert instruction.spec.handler.__name__ == "wait_seconds"
+
+def test_compile_command_preparses_selectors():
+    instruction = compile_command("VERIFY_COUNT", ["#items", "2"])
+    selector, count = instruction.args
+    assert isinstance(selector, Selector)
+    assert (selector.by, selector.value) == ("id", "items")
+    assert count == 2
+
+def test_compile_command_precompiles_pattern():
+    pattern = compile_command("VERIFY_TEXT_PATTERN", [r"\d+"]).args[0]
+    assert isinstance(pattern, re.Pattern)
+
+def test_compile_command_unknown_command_has_no_spec():
+    instruction = compile_command("NOT_A_COMMAND", ["x"])
+    assert instruction.spec is None
+    assert instruction.error is None
+
+def test_compile_command_invalid_param_reports_error():
+    instruction = compile_command("WAIT", ["soon"])
+    assert instruction.error.startswith("WAIT 參數無效")
+    assert instruction.args == ()
+
+def test_compile_command_keeps_line():
+    assert compile_command("WAIT", ["1"], "WAIT=1").line == "WAIT=1"
+
+def test_parse_selector():
+    assert command_program.parse_selector("#id") == ("id", "id")
+    assert command_program.parse_selector(".name") == ("class name", "name")
+    assert command_program.parse_selector("//div") == ("xpath", "//div")
+    assert command_program.parse_selector("div > a") == ("css selector", "div > a")
+
+def test_load_program_writes_and_reuses_cache(tmp_path, cache_dir, monkeypatch):
+    path = write_script(tmp_path / "command.txt", "WAIT=1\nCLICK_BY_ID=login\n")
+    program = command_program.load_program(path)
+    assert [instruction.cmd for instruction in program] == ["WAIT", "CLICK_BY_ID"]
+    assert len(os.listdir(cache_dir)) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("未變更的命令檔不應重新編譯")
+    monkeypatch.setattr(command_program, "compile_commands", fail)
+    cached = command_program.load_program(path)
+    assert [(instruction.cmd, instruction.args) for instruction in cached] == [("WAIT", (1,)), ("CLICK_BY_ID", ("login",))]
+    assert cached.instructions[0].spec is program.instructions[0].spec
+
+def test_cache_is_keyed_by_content(tmp_path, cache_dir):
+    path = write_script(tmp_path / "command.txt", "WAIT=1\n")
+    first = command_program.load_program(path)
+    write_script(tmp_path / "command.txt", "WAIT=2\n")
+    second = command_program.load_program(path)
+    assert first.source_hash != second.source_hash
+    assert second.instructions[0].args == (2,)
+    assert len(os.listdir(cache_dir)) == 2
+
+def test_iter_program_streams_and_fills_cache(tmp_path, cache_dir):
+    path = write_script(tmp_path / "command.txt", "WAIT=1\nREFRESH=\n")
+    assert [instruction.cmd for instruction in command_program.iter_program(path)] == ["WAIT", "REFRESH"]
+    source_hash = command_program._hash_file(path)
+    assert command_program._load_cached_program(source_hash) is not None
+
+def test_corrupt_cache_is_recompiled(tmp_path, cache_dir):
+    path = write_script(tmp_path / "command.txt", "WAIT=1\n")
+    source_hash = command_program._hash_file(path)
+    os.makedirs(cache_dir)
+    (cache_dir / f"{source_hash}.pkl").write_bytes(b"not a pickle")
+    assert [instruction.args for instruction in command_program.load_program(path)] == [(1,)]
+
+def test_missing_file_gives_empty_program(tmp_path, cache_dir):
+    assert len(command_program.load_program(str(tmp_path / "missing.txt"))) == 0
+
+def compile_lines(text):
+    return list(command_program.iter_compile(utils.parse_command_lines(text.splitlines())))
+
+def test_data_source_collects_block_until_test_case():
+    instructions = compile_lines("DATA_SOURCE=rows.csv || 3\nWAIT=${delay}\nREFRESH=\nTEST_CASE=next\n")
+    assert [instruction.cmd for instruction in instructions] == ["DATA_SOURCE", "TEST_CASE"]
+    block = instructions[0].args[0]
+    assert (block.source, block.sessions) == ("rows.csv", 3)
+    assert [step.cmd for step in block.steps] == ["WAIT", "REFRESH"]
+    assert block.templated == [True, False]
+
+def test_data_source_end_closes_block():
+    instructions = compile_lines("DATA_SOURCE=rows.csv\nREFRESH=\nDATA_SOURCE_END\nBACK=\n")
+    assert [instruction.cmd for instruction in instructions] == ["DATA_SOURCE", "BACK"]
+    assert instructions[0].args[0].sessions is None
+
+def test_data_source_parameter_errors():
+    missing, invalid = compile_lines("DATA_SOURCE=\nDATA_SOURCE=rows.csv || many\n")
+    assert missing.error == "DATA_SOURCE 缺少資料檔路徑"
+    assert invalid.error.startswith("DATA_SOURCE 參數無效")
+
+def test_bind_recompiles_templated_steps_only():
+    block = compile_lines("DATA_SOURCE=rows.csv\nWAIT=${delay}\nCLICK_BY_ID=${id}\nREFRESH=\n")[0].args[0]
+    wait, click, refresh = block.bind({"delay": "5", "id": "save"})
+    assert wait.args == (5,) and wait.params == ["5"]
+    assert click.args == ("save",)
+    assert refresh is block.steps[2]
+    # 原本的步驟不受資料列影響
+    assert block.steps[0].params == ["${delay}"]
+
+def test_bind_keeps_placeholder_for_missing_column():
+    block = compile_lines("DATA_SOURCE=rows.csv\nCLICK_BY_TEXT=${label}\n")[0].args[0]
+    assert block.bind({})[0].args == ("${label}",)
+
+def test_bind_reaches_nested_sequences():
+    text = ("DATA_SOURCE=rows.csv\n"
+            "NAV_SEQUENCE_START=menu\nCLICK_BY_ID=${id}\nREFRESH=\nNAV_SEQUENCE_END\n")
+    block = compile_lines(text)[0].args[0]
+    assert block.templated == [True]
+    sequence = block.bind({"id": "settings"})[0]
+    click, refresh = sequence.args[0]
+    assert click.args == ("settings",)
+    assert refresh is block.steps[0].args[0][1]
+
+def test_data_source_inside_sequence_is_an_error():
+    instructions = compile_lines("NAV_SEQUENCE_START=menu\nDATA_SOURCE=rows.csv\nNAV_SEQUENCE_END\n")
+    step = instructions[0].args[0][0]
+    assert step.error == "DATA_SOURCE 不可位於導航序列內"
+
+def test_invalid_pattern_is_reported_at_compile_time():
+    instruction = compile_command("VERIFY_TEXT_PATTERN", ["(unclosed"])
+    assert instruction.error.startswith("VERIFY_TEXT_PATTERN 參數無效: 無效的正則表達式")
+
+def test_check_patterns_reports_invalid_patterns_anywhere(tmp_path):
+    path = write_script(tmp_path / "command.txt",
+                        "VERIFY_TEXT_PATTERN=\\d+\n"
+                        "NAV_SEQUENCE_START=menu\nVERIFY_TEXT_PATTERN=(unclosed || SCOPE=#m\nNAV_SEQUENCE_END\n"
+                        "DATA_SOURCE=rows.csv\nVERIFY_TEXT_PATTERN=[${col}\nVERIFY_TEXT_PATTERN=*bad\n")
+    errors = command_program.check_patterns(path)
+    assert len(errors) == 2
+    assert errors[0].startswith("VERIFY_TEXT_PATTERN 參數無效") and errors[0].endswith("(VERIFY_TEXT_PATTERN=(unclosed || SCOPE=#m)")
+    assert "*bad" in errors[1]
+
+def test_check_patterns_valid_script(tmp_path):
+    assert command_program.check_patterns(write_script(tmp_path / "command.txt", "VERIFY_TEXT_PATTERN=ok\n")) == []
+    assert command_program.check_patterns(str(tmp_path / "missing.txt")) == []
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
+
+import command_registry
+import utils
+from command_program import Selector
+
+@pytest.fixture
+def registered():
+    """測試結束後移除測試中註冊的指令"""
+    names = []
+    yield names
+    for name in names:
+        command_registry.unregister_command(name)
+        utils.COMMANDS.pop(name, None)
+
+def test_builtin_commands_are_registered():
+    spec = command_registry.get_command("CLICK_BY_ID")
+    assert spec.handler.__name__ == "click_by_id"
+    assert spec.mutating
+    assert not command_registry.get_command("VERIFY_TEXT_EXISTS").mutating
+    assert command_registry.get_command("NOT_A_COMMAND") is None
+
+def test_convert_applies_converters_and_drops_trailing_empty_params():
+    spec = command_registry.get_command("WAIT_FOR_TEXT")
+    assert spec.convert(["ready", ""]) == ("ready",)
+    assert spec.convert(["ready", "5"]) == ("ready", 5)
+
+def test_convert_keeps_positions_of_empty_params():
+    spec = command_registry.get_command("WAIT_FOR_NETWORK_IDLE")
+    assert spec.convert(["", "300"]) == (None, 300)
+    assert spec.convert(["5", ""]) == (5.0,)
+
+def test_convert_allows_empty_required_value():
+    spec = command_registry.get_command("VERIFY_ELEMENT_VALUE")
+    selector, value = spec.convert(["#x", ""])
+    assert (selector.raw, value) == ("#x", "")
+    with pytest.raises(ValueError):
+        spec.convert(["#x"])
+    with pytest.raises(ValueError):
+        spec.convert(["", "value"])
+
+def test_scoped_parser_keeps_positions():
+    spec = command_registry.get_command("VERIFY_TEXT_SIMILAR")
+    assert spec.convert(["hello", "", "SCOPE=#main"])[:2] == ("hello", None)
+    with pytest.raises(ValueError):
+        spec.convert(["", "0.5"])
+
+def test_convert_truncates_extra_params():
+    assert command_registry.get_command("CLICK_BY_ID").convert(["a", "b"]) == ("a",)
+
+def test_convert_requires_min_args():
+    with pytest.raises(ValueError):
+        command_registry.get_command("LOGIN").convert(["user"])
+
+def test_convert_rejects_bad_values():
+    with pytest.raises(ValueError):
+        command_registry.get_command("WAIT").convert(["x"])
+
+def test_varargs_collects_all_params():
+    assert command_registry.get_command("VERIFY_ANY_TEXT").convert(["a", "", "b"])[0] == ["a", "b"]
+
+def test_scoped_parser_extracts_scope():
+    spec = command_registry.get_command("VERIFY_TEXT_SIMILAR")
+    text, threshold, scope = spec.convert(["hello", "SCOPE=#main", "0.5"])
+    assert (text, threshold) == ("hello", 0.5)
+    assert isinstance(scope, Selector) and (scope.by, scope.value) == ("id", "main")
+    assert spec.convert(["hello"]) == ("hello", None, None)
+
+def test_scoped_parser_varargs():
+    texts, scope = command_registry.get_command("VERIFY_ALL_TEXT").convert(["a", "b", "SCOPE=.box"])
+    assert texts == ["a", "b"]
+    assert (scope.by, scope.value) == ("class name", "box")
+
+def test_scoped_parser_requires_text():
+    with pytest.raises(ValueError):
+        command_registry.get_command("VERIFY_TEXT_CONTAINS").convert(["SCOPE=#main"])
+
+def test_register_command_adds_plugin_command(registered):
+    registered.append("TEST_PLUGIN_CMD")
+
+    @command_registry.register_command("TEST_PLUGIN_CMD", (str, int), 1, command_type=utils.CMD_TEST, mutating=False)
+    def handler(selenium_handler, text, count=1):
+        return (selenium_handler, text, count)
+
+    spec = command_registry.get_command("TEST_PLUGIN_CMD")
+    assert spec.max_args == 2 and not spec.mutating
+    assert spec.convert(["x", "3", "extra"]) == ("x", 3)
+    assert spec("handler", "x", 3) == ("handler", "x", 3)
+    assert utils.COMMANDS["TEST_PLUGIN_CMD"] == utils.CMD_TEST
+
+    command_registry.unregister_command("TEST_PLUGIN_CMD")
+    assert command_registry.get_command("TEST_PLUGIN_CMD") is None
+
+def test_spec_pickles_by_name():
+    spec = command_registry.get_command("REFRESH")
+    assert pickle.loads(pickle.dumps(spec)) is spec
+
+def test_poll_until_parses_condition_and_seconds():
+    condition, timeout, interval = command_registry.get_command("POLL_UNTIL").convert(["js: window.done", "300", "2"])
+    assert (condition.kind, condition.value, timeout, interval) == ("js", "window.done", 300.0, 2.0)
+
+def test_poll_until_rejects_separator_inside_condition():
+    spec = command_registry.get_command("POLL_UNTIL")
+    with pytest.raises(ValueError, match=r"\|\|"):
+        spec.convert(["js: window.a", "window.b", "300"])
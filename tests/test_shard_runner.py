@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import shard_runner
+from command_program import compile_command
+
+def case(name):
+    return [compile_command("TEST_CASE", [name]), compile_command("REFRESH", [])]
+
+def test_assign_shards_balances_longest_first():
+    shards = shard_runner.assign_shards([5.0, 1.0, 4.0, 3.0, 3.0], 2)
+    loads = [sum([5.0, 1.0, 4.0, 3.0, 3.0][index] for index in shard) for shard in shards]
+    assert sorted(loads) == [8.0, 8.0]
+
+def test_assign_shards_covers_every_case_once_in_script_order():
+    estimates = [2.0, 7.0, 1.0, 1.0, 9.0, 3.0, 3.0]
+    shards = shard_runner.assign_shards(estimates, 3)
+    assert sorted(index for shard in shards for index in shard) == list(range(len(estimates)))
+    assert all(shard == sorted(shard) for shard in shards)
+
+def test_assign_shards_with_more_shards_than_cases():
+    shards = shard_runner.assign_shards([1.0, 2.0], 4)
+    assert len(shards) == 4
+    assert sorted(map(len, shards)) == [0, 0, 1, 1]
+
+def test_assign_shards_without_cases():
+    assert shard_runner.assign_shards([], 2) == [[], []]
+
+def test_estimate_durations_uses_history_and_average():
+    cases = [case("a"), case("b"), case("new")]
+    assert shard_runner.estimate_durations(cases, {"a": 2.0, "b": 6.0}) == [2.0, 6.0, 4.0]
+
+def test_estimate_durations_without_history():
+    assert shard_runner.estimate_durations([case("a")], {}) == [shard_runner.DEFAULT_CASE_DURATION]
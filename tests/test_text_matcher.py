@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import difflib
+import random
+
+import text_matcher
+from text_matcher import TextMatcher
+
+def naive_found(patterns, text):
+    return {index for index, pattern in enumerate(patterns) if pattern.lower() in text.lower()}
+
+def test_find_reports_every_pattern_present():
+    matcher = TextMatcher(["he", "she", "his", "hers", "missing"])
+    assert matcher.find("ushers") == {0, 1, 3}
+
+def test_matching_ignores_case_by_default():
+    assert TextMatcher(["Router"]).any_in("ROUTER status")
+    assert not TextMatcher(["Router"], ignore_case=False).any_in("ROUTER status")
+
+def test_overlapping_and_nested_patterns():
+    matcher = TextMatcher(["abcd", "bc", "c", "cde"])
+    assert matcher.find("xabcdex") == {0, 1, 2, 3}
+    assert matcher.find("xbcx") == {1, 2}
+
+def test_missing_keeps_original_order():
+    matcher = TextMatcher(["上線", "Offline", "版本", "online"])
+    assert matcher.missing("裝置上線 Online") == ["Offline", "版本"]
+
+def test_empty_pattern_always_matches():
+    matcher = TextMatcher(["", "zzz"])
+    assert matcher.find("abc") == {0}
+    assert matcher.any_in("")
+
+def test_no_patterns():
+    matcher = TextMatcher([])
+    assert not matcher.any_in("anything")
+    assert matcher.missing("anything") == []
+
+def test_duplicate_patterns_are_reported_separately():
+    assert TextMatcher(["ok", "OK"]).find("ok") == {0, 1}
+
+def test_matches_naive_search_on_random_text():
+    rng = random.Random(7)
+    for _ in range(200):
+        text = "".join(rng.choice("abAB ") for _ in range(rng.randint(0, 40)))
+        patterns = ["".join(rng.choice("abAB") for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 6))]
+        assert TextMatcher(patterns).find(text) == naive_found(patterns, text)
+
+def test_get_matcher_reuses_automaton():
+    assert text_matcher.get_matcher(["a", "b"]) is text_matcher.get_matcher(("a", "b"))
+    assert text_matcher.get_matcher(["a", "b"]) is not text_matcher.get_matcher(["b", "a"])
+
+def test_page_text_is_lowered_once_per_text():
+    text_matcher.lowered.cache_clear()
+    page_text = "Welcome Back, " + "Lorem Ipsum " * 1000
+    matcher = text_matcher.get_matcher(["welcome", "IPSUM"])
+    for _ in range(5):
+        assert matcher.missing(page_text) == []
+        assert matcher.any_in(page_text)
+    info = text_matcher.lowered.cache_info()
+    assert (info.misses, info.hits) == (1, 9)
+
+def best_fixed_window(text, expected):
+    size = len(expected)
+    return max(difflib.SequenceMatcher(None, text[start:start + size], expected).ratio()
+               for start in range(max(1, len(text) - size + 1)))
+
+def embedded_cases(seed, count):
+    """隨機文字中嵌入少數字元被替換的預期文字"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        expected = "".join(rng.choice("abcdefgh ") for _ in range(rng.randint(5, 30)))
+        mutated = list(expected)
+        for _ in range(rng.randint(0, 3)):
+            mutated[rng.randrange(len(mutated))] = rng.choice("xyz")
+        filler = lambda: "".join(rng.choice("abcdefghijklmnop ") for _ in range(rng.randint(0, 300)))
+        yield filler() + "".join(mutated) + filler(), expected
+
+def test_similarity_short_text_compares_whole_text():
+    assert text_matcher.best_window_similarity("abc", "abcd") == difflib.SequenceMatcher(None, "abc", "abcd").ratio()
+    assert text_matcher.best_window_similarity("abc", "") == 0.0
+
+def test_similarity_finds_exact_window():
+    text = "Header\n" + "filler text " * 200 + "Firmware version 1.2.3" + " more" * 100
+    assert text_matcher.best_window_similarity(text, "Firmware version 1.2.3") == 1.0
+
+def test_similarity_unrelated_text_is_low():
+    assert text_matcher.best_window_similarity("x" * 500, "status online") < 0.2
+
+def test_similarity_is_at_least_best_fixed_window():
+    for text, expected in embedded_cases(3, 120):
+        assert text_matcher.best_window_similarity(text, expected) >= best_fixed_window(text, expected) - 1e-9
+
+def test_similarity_threshold_stops_early_with_same_verdict():
+    for text, expected in embedded_cases(11, 80):
+        full = text_matcher.best_window_similarity(text, expected)
+        early = text_matcher.best_window_similarity(text, expected, threshold=0.8)
+        assert early <= full
+        assert (early >= 0.8) == (full >= 0.8)
+
+def test_similarity_with_single_candidate():
+    text = "abc " * 300 + "router is online" + " xyz" * 300
+    assert text_matcher.best_window_similarity(text, "router is online", max_candidates=1) == 1.0
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import command_program
+import text_matcher
+import utils
+
+@pytest.fixture(autouse=True)
+def clear_fragment_cache():
+    utils._fragment_cache.clear()
+    yield
+    utils._fragment_cache.clear()
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def commands(path, dependencies=None):
+    return [(cmd, params) for cmd, params, _ in utils.iter_commands(path, dependencies=dependencies)]
+
+def test_parse_command_line():
+    assert utils.parse_command_line(" CLICK_BY_ID = a || b ") == ("CLICK_BY_ID", ["a", "b"], "CLICK_BY_ID = a || b")
+    assert utils.parse_command_line("NAV_SEQUENCE_END") == ("NAV_SEQUENCE_END", [], "NAV_SEQUENCE_END")
+    assert utils.parse_command_line("# comment") is None
+    assert utils.parse_command_line("NO_EQUALS") is None
+
+def test_include_expands_relative_to_including_file(tmp_path):
+    (tmp_path / "shared").mkdir()
+    write(tmp_path / "shared" / "login.txt", "LOGIN=admin || secret\n")
+    main = write(tmp_path / "main.txt", "REFRESH=\nINCLUDE=shared/login.txt\nBACK=\n")
+    assert commands(main) == [("REFRESH", [""]), ("LOGIN", ["admin", "secret"]), ("BACK", [""])]
+
+def test_include_can_be_left_unexpanded(tmp_path):
+    write(tmp_path / "part.txt", "REFRESH=\n")
+    main = write(tmp_path / "main.txt", "INCLUDE=part.txt\n")
+    assert [cmd for cmd, _, _ in utils.iter_commands(main, expand_includes=False)] == ["INCLUDE"]
+
+def test_fragment_cache_reuses_parsed_fragment(tmp_path, monkeypatch):
+    fragment = write(tmp_path / "part.txt", "REFRESH=\n")
+    calls = []
+    parse = utils.parse_command_lines
+    monkeypatch.setattr(utils, "parse_command_lines", lambda lines: calls.append(1) or parse(lines))
+
+    first = utils.load_fragment(fragment)
+    assert utils.load_fragment(fragment) is first
+    assert len(calls) == 1
+
+    write(tmp_path / "part.txt", "REFRESH=\nBACK=\n")
+    assert [cmd for cmd, _, _ in utils.load_fragment(fragment)] == ["REFRESH", "BACK"]
+    assert len(calls) == 2
+
+def test_include_cycle_is_not_followed(tmp_path, caplog):
+    write(tmp_path / "a.txt", "REFRESH=\nINCLUDE=b.txt\n")
+    write(tmp_path / "b.txt", "BACK=\nINCLUDE=a.txt\n")
+    main = str(tmp_path / "a.txt")
+    assert commands(main) == [("REFRESH", [""]), ("BACK", [""]), ("INCLUDE", ["a.txt"])]
+    assert "INCLUDE 循環引入" in caplog.text
+
+def test_same_fragment_may_be_included_twice(tmp_path):
+    write(tmp_path / "part.txt", "REFRESH=\n")
+    main = write(tmp_path / "main.txt", "INCLUDE=part.txt\nINCLUDE=part.txt\n")
+    assert commands(main) == [("REFRESH", [""]), ("REFRESH", [""])]
+
+def test_missing_include_is_recorded_and_compiled_as_error(tmp_path):
+    main = write(tmp_path / "main.txt", "INCLUDE=missing.txt\n")
+    dependencies = {}
+    assert commands(main, dependencies) == [("INCLUDE", ["missing.txt"])]
+    assert list(dependencies.values()) == [(0, -1)]
+
+    instruction = command_program.compile_commands(utils.iter_commands(main))[0]
+    assert instruction.error == "無法引入檔案: missing.txt"
+
+def test_changed_fragment_invalidates_program_cache(tmp_path, cache_dir):
+    fragment = write(tmp_path / "part.txt", "WAIT=1\n")
+    main = write(tmp_path / "main.txt", "INCLUDE=part.txt\n")
+    program = command_program.load_program(main)
+    assert program.dependencies == {os.path.abspath(fragment): (os.stat(fragment).st_mtime_ns, os.stat(fragment).st_size)}
+
+    write(tmp_path / "part.txt", "WAIT=22\n")
+    assert [instruction.args for instruction in command_program.load_program(main)] == [(22,)]
+
+def test_keyword_collector_caps_result():
+    collector = utils.KeywordCollector()
+    for index in range(utils.MAX_KEYWORDS + 5):
+        collector.add("VERIFY_TEXT_EXISTS", [f"keyword {index}"], f"VERIFY_TEXT_EXISTS=keyword {index}")
+    collector.add("VERIFY_TEXT_EXISTS", ["${name}"], "VERIFY_TEXT_EXISTS=${name}")
+    assert len(collector.keywords) == utils.MAX_KEYWORDS + 5
+    assert collector.result() == [f"keyword {index}" for index in range(utils.MAX_KEYWORDS)]
+
+def test_text_contains_reuses_lowered_page_text():
+    text_matcher.lowered.cache_clear()
+    page_text = "Order CONFIRMED " * 500
+    assert utils.text_contains(page_text, "order confirmed")
+    assert not utils.text_contains(page_text, "cancelled")
+    assert text_matcher.lowered.cache_info().misses == 1
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import command_program
+import command_registry
+import verify_batch
+from command_program import Selector, compile_command
+
+def parse_selector(selector):
+    # 與 SeleniumHandler._parse_selector 相同: 接受已預先解析的 Selector
+    return (selector.by, selector.value) if isinstance(selector, Selector) else command_program.parse_selector(selector)
+
+def cmds(groups):
+    return [[instruction.cmd for instruction in group] for group in groups]
+
+def test_consecutive_verifications_form_one_group():
+    instructions = [
+        compile_command("CLICK_BY_ID", ["go"]),
+        compile_command("VERIFY_TEXT_EXISTS", ["a"]),
+        compile_command("VERIFY_COUNT", ["li", "2"]),
+        compile_command("VERIFY_ANY_TEXT", ["x", "y"]),
+        compile_command("REFRESH", []),
+        compile_command("VERIFY_ELEMENT_EXISTS", ["#b"]),
+    ]
+    assert cmds(verify_batch.group_instructions(instructions)) == [
+        ["CLICK_BY_ID"], ["VERIFY_TEXT_EXISTS", "VERIFY_COUNT", "VERIFY_ANY_TEXT"], ["REFRESH"], ["VERIFY_ELEMENT_EXISTS"]]
+
+def test_wait_and_log_commands_are_not_batched():
+    instructions = [compile_command("VERIFY_TEXT_EXISTS", ["a"]), compile_command("WAIT", ["1"]),
+                    compile_command("TEST_CASE", ["t"]), compile_command("VERIFY_TEXT_EXISTS", ["b"])]
+    assert cmds(verify_batch.group_instructions(instructions)) == [
+        ["VERIFY_TEXT_EXISTS"], ["WAIT"], ["TEST_CASE"], ["VERIFY_TEXT_EXISTS"]]
+
+def test_invalid_verification_is_not_batched():
+    invalid = compile_command("VERIFY_COUNT", ["li", "many"])
+    assert invalid.error
+    assert not verify_batch.is_batchable(invalid)
+    groups = verify_batch.group_instructions([compile_command("VERIFY_TEXT_EXISTS", ["a"]), invalid])
+    assert cmds(groups) == [["VERIFY_TEXT_EXISTS"], ["VERIFY_COUNT"]]
+
+@pytest.fixture
+def overridden_verify():
+    original = command_registry.get_command("VERIFY_TEXT_EXISTS")
+
+    @command_registry.register_command("VERIFY_TEXT_EXISTS", (str,), 1, mutating=False)
+    def custom_verify(handler, text):
+        return True
+
+    yield
+    command_registry.COMMAND_REGISTRY["VERIFY_TEXT_EXISTS"] = original
+
+def test_plugin_override_is_not_batched(overridden_verify):
+    assert not verify_batch.is_batchable(compile_command("VERIFY_TEXT_EXISTS", ["a"]))
+
+def test_grouping_is_lazy():
+    def stream():
+        yield compile_command("CLICK_BY_ID", ["go"])
+        raise AssertionError("不應預先讀取後續指令")
+
+    assert cmds([next(verify_batch.group_instructions(stream()))]) == [["CLICK_BY_ID"]]
+
+def test_build_check_kinds():
+    def check(cmd, params):
+        return verify_batch.build_check(compile_command(cmd, params), parse_selector)
+
+    assert check("VERIFY_TEXT_EXISTS", ["it's"]) == {"kind": "ladder", "text": "it's", "xpath": "\"it's\"", "scope": None}
+    assert check("VERIFY_TEXT_NOT_EXISTS", ["x", "SCOPE=#main"]) == {"kind": "absent", "text": "x", "scope": ["id", "main"]}
+    assert check("VERIFY_TEXT_CONTAINS", ["x", "SCOPE=.box"]) == {"kind": "scope", "scope": ["class name", "box"]}
+    assert check("VERIFY_ELEMENT_VALUE", ["#name", "v"]) == {"kind": "element", "by": "id", "value": "name"}
+    assert check("VERIFY_TEXT_CONTAINS", ["x"]) is None
+
+def test_needs_text_only_for_unscoped_text_checks():
+    assert verify_batch.needs_text([compile_command("VERIFY_TEXT_PATTERN", ["a+"])])
+    assert not verify_batch.needs_text([compile_command("VERIFY_TEXT_PATTERN", ["a+", "SCOPE=#m"]),
+                                        compile_command("VERIFY_TEXT_EXISTS", ["a"])])
+
+def test_judge_element_checks():
+    count = compile_command("VERIFY_COUNT", ["li", "2"])
+    value = compile_command("VERIFY_ELEMENT_VALUE", ["#name", "v"])
+    assert verify_batch.judge(count, {"count": 2, "value": None}, None) is True
+    assert verify_batch.judge(count, {"count": 0, "value": None}, None) is False
+    assert verify_batch.judge(value, {"count": 1, "value": "v"}, None) is True
+    assert verify_batch.judge(value, {"count": 1, "value": "w"}, None) is False
+    # 元素尚未出現時交由呼叫端等待後重新檢查
+    assert verify_batch.judge(value, {"count": 0, "value": None}, None) is None
+    assert verify_batch.awaits_element(value, {"count": 0, "value": None})
+    assert verify_batch.report_unresolved(value, {"count": 0, "value": None}) is False
+
+def test_judge_text_checks():
+    ladder = compile_command("VERIFY_TEXT_EXISTS", ["a"])
+    absent = compile_command("VERIFY_TEXT_NOT_EXISTS", ["a"])
+    contains = compile_command("VERIFY_TEXT_CONTAINS", ["World"])
+    scoped = compile_command("VERIFY_ALL_TEXT", ["x", "y", "SCOPE=#box"])
+    assert verify_batch.judge(ladder, {"strategy": "text"}, None) is True
+    assert verify_batch.judge(ladder, {"strategy": None}, None) is False
+    assert verify_batch.judge(absent, True, None) is True
+    assert verify_batch.judge(contains, None, "hello world") is True
+    assert verify_batch.judge(scoped, "x and y", "unrelated page") is True
+    assert verify_batch.judge(scoped, {"scopeMissing": True}, None) is False
+
+def test_judge_leaves_errors_unresolved():
+    count = compile_command("VERIFY_COUNT", ["li", "2"])
+    assert verify_batch.judge(count, {"error": "SyntaxError"}, None) is None
+    assert not verify_batch.awaits_element(count, {"error": "SyntaxError"})
+    assert verify_batch.report_unresolved(count, {"error": "SyntaxError"}) is False
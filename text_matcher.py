@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import difflib
+import heapq
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# 同時保留的自動機數量 (每個驗證指令的文字組合各一個)
+MATCHER_CACHE_SIZE = 256
+# 保留的小寫頁面文字數量 (整頁文字與數個範圍元素的文字)
+LOWERED_CACHE_SIZE = 8
+
+@lru_cache(maxsize=LOWERED_CACHE_SIZE)
+def lowered(text: str) -> str:
+    """頁面文字的小寫版本: 同一快照的文字在 DOM 版本改變前是同一個字串，只在第一次比對時轉換"""
+    return text.lower()
+
+class TextMatcher:
+    """多字串比對 (Aho-Corasick 自動機)，掃描一次頁面文字即可找出所有出現的預期文字
+
+    預設不區分大小寫 (與 utils.text_contains 相同，兩邊都先轉為小寫)。
+    """
+    __slots__ = ("patterns", "ignore_case", "_goto", "_fail", "_output", "_always")
+
+    def __init__(self, patterns: Sequence[str], ignore_case: bool = True) -> None:
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+        self.ignore_case = ignore_case
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[List[int]] = [[]]
+        # 空字串出現在任何文字中
+        self._always: List[int] = []
+
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                self._always.append(index)
+                continue
+            node = 0
+            for char in (pattern.lower() if ignore_case else pattern):
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._output.append([])
+                node = next_node
+            self._output[node].append(index)
+
+        # 以廣度優先建立失敗連結，並合併後綴節點的輸出
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def _normalize(self, text: str) -> str:
+        return lowered(text) if self.ignore_case else text
+
+    def _scan(self, normalized_text: str, stop_after: int) -> Set[int]:
+        """掃描已正規化的文字，返回找到的預期文字索引 (找到 stop_after 個即停止)"""
+        found: Set[int] = set(self._always)
+        if len(found) >= stop_after:
+            return found
+
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in normalized_text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+                if len(found) >= stop_after:
+                    break
+        return found
+
+    def find(self, text: str) -> Set[int]:
+        """返回文字中出現的所有預期文字索引"""
+        return self._scan(self._normalize(text), len(self.patterns))
+
+    def any_in(self, text: str) -> bool:
+        """任一預期文字出現在文字中"""
+        return bool(self.patterns) and bool(self._scan(self._normalize(text), 1))
+
+    def missing(self, text: str) -> List[str]:
+        """未出現在文字中的預期文字 (依原本順序)"""
+        found = self.find(text)
+        return [pattern for index, pattern in enumerate(self.patterns) if index not in found]
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def _cached_matcher(patterns: Tuple[str, ...]) -> TextMatcher:
+    return TextMatcher(patterns)
+
+def get_matcher(patterns: Iterable[str]) -> TextMatcher:
+    """取得預期文字組合的自動機 (相同組合重複使用，不必每次重建)"""
+    return _cached_matcher(tuple(patterns))
+
+def best_window_similarity(text: str, expected: str, threshold: Optional[float] = None,
+                           max_candidates: int = 50, ngram_size: int = 3) -> float:
+    """返回 text 中與 expected 最相似的區段的相似度 (SequenceMatcher.ratio，0.0 到 1.0)
+
+    以與 expected 等長的視窗滑過 text，逐步更新兩者共有的 n-gram 數；每半個視窗長度只保留共有數最多的視窗，
+    並以固定大小的堆積保留共有數最多的 max_candidates 個候選，之後才在候選視窗附近對齊並計算實際相似度。
+    對齊範圍內共有的字元數算出的上限不超過目前最佳值的候選略過。指定 threshold 時達到閾值即停止。
+    text 不長於 expected 時與直接比較整段文字相同。
+    """
+    size = len(expected)
+    if not size or len(text) <= size:
+        return difflib.SequenceMatcher(None, text, expected).ratio()
+
+    # 短文字改用較短的 n-gram，少數字元不同時仍有共同的 n-gram
+    n = max(1, min(ngram_size, size // 4))
+    expected_grams = Counter(expected[i:i + n] for i in range(size - n + 1))
+    window_grams = Counter(text[i:i + n] for i in range(size - n + 1))
+    shared_grams = sum(min(count, window_grams[gram]) for gram, count in expected_grams.items())
+
+    spacing = max(1, size // 2)
+    # 堆積元素為 (共有 n-gram 數, -起點)，堆頂是目前保留的候選中最差的一個
+    heap: List[Tuple[int, int]] = []
+
+    def keep(candidate: Tuple[int, int]) -> None:
+        if len(heap) < max_candidates:
+            heapq.heappush(heap, candidate)
+        elif candidate > heap[0]:
+            heapq.heapreplace(heap, candidate)
+
+    # 同一段 (spacing 個起點) 內的視窗互相重疊，只保留共有數最多的一個
+    bucket_best = (shared_grams, 0)
+    for start in range(1, len(text) - size + 1):
+        # 移出 text[start - 1]、移入 text[start + size - 1]，共有數只在未超過 expected 的數量時改變
+        removed_gram, added_gram = text[start - 1:start - 1 + n], text[start + size - n:start + size]
+        if window_grams[removed_gram] <= expected_grams[removed_gram]:
+            shared_grams -= 1
+        window_grams[removed_gram] -= 1
+        window_grams[added_gram] += 1
+        if window_grams[added_gram] <= expected_grams[added_gram]:
+            shared_grams += 1
+
+        if start % spacing == 0:
+            if bucket_best[0]:
+                keep(bucket_best)
+            bucket_best = (shared_grams, -start)
+        elif shared_grams > bucket_best[0]:
+            bucket_best = (shared_grams, -start)
+    if bucket_best[0]:
+        keep(bucket_best)
+
+    if not heap:
+        return 0.0
+
+    matcher = difflib.SequenceMatcher(None, "", expected)
+    best = 0.0
+    chosen: List[int] = []
+    for _, negative_start in sorted(heap, reverse=True):
+        start = -negative_start
+        if any(abs(start - other) < spacing for other in chosen):
+            continue
+        chosen.append(start)
+
+        # 在候選視窗前後各延伸半個長度內對齊，取實際匹配到的區段 (可與 expected 不等長)
+        region_start = max(0, start - spacing)
+        matcher.set_seq1(text[region_start:start + size + spacing])
+        # 計算的區段都在對齊範圍內: 範圍內共有的字元數 common 可達到的最高相似度為 2 * common / (common + size)
+        common = matcher.quick_ratio() * (len(matcher.a) + size) / 2
+        if 2 * common / (common + size) <= best:
+            continue
+        blocks = [block for block in matcher.get_matching_blocks() if block.size]
+        if not blocks:
+            continue
+        span_start = region_start + blocks[0].a
+        span_end = region_start + blocks[-1].a + blocks[-1].size
+        windows = (text[span_start:span_end], text[start:start + size],
+                   text[span_start:span_start + size], text[max(0, span_end - size):span_end])
+        for window in windows:
+            matcher.set_seq1(window)
+            if matcher.real_quick_ratio() > best and matcher.quick_ratio() > best:
+                best = max(best, matcher.ratio())
+        if best >= 1.0 or (threshold is not None and best >= threshold):
+            break
+    return best
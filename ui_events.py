@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import queue
+import logging
+import threading
+import tkinter as tk
+from typing import Callable, Dict, Tuple
+
+import utils
+
+class UIEventQueue:
+    """執行緒安全的 UI 更新通道
+
+    執行緒只把更新放入佇列，由 Tk 主執行緒的 root.after 迴圈以固定的最高頻率分批套用，
+    避免每個步驟都在錯誤的執行緒上觸發同步重繪。
+    """
+
+    def __init__(self, root: tk.Tk, fps: int = utils.UI_MAX_FPS, max_batch: int = utils.UI_MAX_BATCH) -> None:
+        self.root = root
+        self.interval = max(1, int(1000 / fps))
+        self.max_batch = max_batch
+        self._events: "queue.SimpleQueue" = queue.SimpleQueue()
+        # 同一個 key 在一個畫面週期內只套用最後一次 (例如摘要、狀態文字)
+        self._latest: Dict[str, Tuple[Callable, tuple]] = {}
+        self._lock = threading.Lock()
+        self._after_id = None
+
+    def post(self, func: Callable, *args) -> None:
+        """依序套用的更新"""
+        self._events.put((func, args))
+
+    def post_latest(self, key: str, func: Callable, *args) -> None:
+        """可合併的更新: 每個畫面週期只套用同一 key 的最後一次呼叫"""
+        with self._lock:
+            self._latest[key] = (func, args)
+
+    def start(self) -> None:
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval, self._pump)
+
+    def stop(self) -> None:
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def flush(self) -> None:
+        """立即套用所有待處理的更新 (僅限主執行緒呼叫)"""
+        while self._drain():
+            pass
+
+    def _pump(self) -> None:
+        try:
+            self._drain()
+        finally:
+            self._after_id = self.root.after(self.interval, self._pump)
+
+    def _drain(self) -> bool:
+        """套用一批更新，返回佇列中是否還有剩餘"""
+        for _ in range(self.max_batch):
+            try:
+                func, args = self._events.get_nowait()
+            except queue.Empty:
+                break
+            self._apply(func, args)
+
+        with self._lock:
+            latest, self._latest = self._latest, {}
+        for func, args in latest.values():
+            self._apply(func, args)
+        return not self._events.empty()
+
+    @staticmethod
+    def _apply(func: Callable, args: tuple) -> None:
+        try:
+            func(*args)
+        except tk.TclError as e:
+            # 視窗已關閉等情況
+            logging.debug(f"UI 更新略過: {str(e)}")
+        except Exception as e:
+            logging.error(f"套用 UI 更新時發生錯誤: {str(e)}")
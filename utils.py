@@ -5,9 +5,14 @@ import logging
 import json
 import re
 import difflib
-from typing import List, Tuple, Dict, Any, Optional
+import traceback
+import threading
+from typing import List, Tuple, Dict, Any, Optional, Iterable, Iterator
 from datetime import datetime
 import time
+from functools import lru_cache
+
+import text_matcher
 
 # 版本信息
 VERSION = "1.2"
@@ -25,6 +30,10 @@ DEFAULT_FONT_SIZE = 12
 MIN_FONT_SIZE = 8
 MAX_FONT_SIZE = 18
 
+# UI 更新頻率上限 (每秒套用次數) 與每次最多套用的更新數
+UI_MAX_FPS = 20
+UI_MAX_BATCH = 500
+
 # 指令類型常量
 CMD_BASIC = "basic"           # 基本操作指令
 CMD_VERIFY = "verify"         # 驗證指令
@@ -33,8 +42,54 @@ CMD_NAV = "navigation"        # 導航指令
 CMD_TEST = "test"             # 測試案例相關指令
 CMD_FUZZY = "fuzzy"           # 模糊匹配指令
 
+# 平行執行測試案例時預設使用的瀏覽器工作階段數 (1 表示依序執行)
+DEFAULT_PARALLEL_SESSIONS = 1
+# 以多個工作程序分片執行測試案例時預設的程序數 (1 表示不分片)
+DEFAULT_SHARD_PROCESSES = 1
+# 以單一事件迴圈非同步驅動多個工作階段時預設的工作階段數 (1 表示不使用非同步執行)
+DEFAULT_ASYNC_SESSIONS = 1
+
+# 瀏覽器執行設定檔: 每個設定檔是一組 Chrome 參數與偏好設定，可用 "+" 組合 (例如 "headless+no-images")
+DEFAULT_BROWSER_PROFILE = "default"
+BROWSER_PROFILES = {
+    "default": {"arguments": [], "prefs": {}},
+    "headless": {
+        "arguments": ["--headless=new", "--disable-gpu", "--window-size=1920,1080"],
+        "prefs": {},
+    },
+    "no-images": {
+        "arguments": ["--blink-settings=imagesEnabled=false"],
+        "prefs": {"profile.managed_default_content_settings.images": 2},
+    },
+    "no-extensions": {
+        "arguments": ["--disable-extensions", "--disable-component-extensions-with-background-pages",
+                      "--disable-background-networking"],
+        "prefs": {},
+    },
+    "small-viewport": {"arguments": ["--window-size=800,600"], "prefs": {}},
+}
+
+# WebDriver 工作階段池
+SESSION_POOL_SIZE = 1        # 執行結束後保留的閒置工作階段數
+SESSION_IDLE_TTL = 300       # 閒置超過此秒數的工作階段會被關閉
+
+# 條件等待 (取代固定秒數的等待)
+SETTLE_POLL_INTERVAL = 0.05  # 條件輪詢間隔 (秒)
+DOM_QUIET_MS = 100           # DOM 無變動超過此毫秒數視為穩定
+WATCH_SLICE_SECONDS = 0.5    # 推送式等待每段非同步腳本的最長時間 (停止時最多延遲此秒數)
+POLL_INITIAL_INTERVAL = 0.5  # POLL_UNTIL 預設的初始輪詢間隔 (秒)
+POLL_MAX_INTERVAL = 5.0      # POLL_UNTIL 預設的輪詢間隔上限 (秒)
+POLL_BACKOFF_FACTOR = 2.0    # 每次條件未成立後輪詢間隔的倍數
+NETWORK_QUIET_MS = 500       # 沒有 fetch/XHR 請求超過此毫秒數視為網路閒置
+
+# 資料驅動執行
+DEFAULT_DATA_SESSIONS = 1                      # 預設同時使用的瀏覽器工作階段數
+DATA_SOURCE_MMAP_THRESHOLD = 8 * 1024 * 1024   # 超過此大小的資料檔使用記憶體映射讀取
+
 # 相似度閾值常量
 DEFAULT_SIMILARITY_THRESHOLD = 0.8  # 80% 相似度
+SIMILARITY_MAX_CANDIDATES = 50      # 相似度比對最多計算的頁面區段數
+REGEX_CACHE_SIZE = 512              # 保留的已編譯正則表達式數量 (所有工作階段共用)
 
 # 指令定義
 COMMANDS = {
@@ -60,19 +115,25 @@ COMMANDS = {
     "WAIT_FOR_ELEMENT": CMD_WAIT,
     "WAIT_FOR_PAGE_LOAD": CMD_WAIT,
     "WAIT_UNTIL_CHANGES": CMD_WAIT,
+    "WAIT_FOR_NETWORK_IDLE": CMD_WAIT,      # 等待 fetch/XHR 請求全部完成
     "POLL_UNTIL": CMD_WAIT,
     
     # 導航與互動指令
     "NAV_SEQUENCE_START": CMD_NAV,
     "NAV_SEQUENCE_END": CMD_NAV,
+    "NAV_SEQUENCE_DEFINE": CMD_NAV,         # 定義具名導航序列 (不立即執行)
+    "NAV_SEQUENCE_CALL": CMD_NAV,           # 執行已定義的具名導航序列
     "SCROLL_TO_ELEMENT": CMD_NAV,
     "SCROLL_TO_BOTTOM": CMD_NAV,
     "EXPAND": CMD_NAV,
     
     # 測試案例相關
     "TEST_CASE": CMD_TEST,
+    "INCLUDE": CMD_TEST,                    # 引入共用的命令片段檔案
     "DESCRIPTION": CMD_TEST,
     "SEVERITY": CMD_TEST,
+    "DATA_SOURCE": CMD_TEST,                # 資料驅動: 對資料檔每一列執行後續步驟
+    "DATA_SOURCE_END": CMD_TEST,
     
     # 模糊匹配指令 (新增)
     "VERIFY_TEXT_CONTAINS": CMD_FUZZY,      # 文本包含部分匹配
@@ -85,10 +146,18 @@ COMMANDS = {
 # 設置文件路徑
 SETTINGS_FILE = "settings.json"
 
+# 編譯後指令快取目錄
+COMMAND_CACHE_DIR = "command_cache"
+COMMAND_CACHE_MAX_FILES = 20
+COMMAND_CACHE_MAX_INSTRUCTIONS = 100000  # 超過此數量的串流腳本不寫入快取，以限制記憶體用量
+
+# 日誌與執行報告目錄
+LOG_DIR = "automation_logs"
+
 def setup_logging() -> None:
     """設置日誌系統"""
     # 確保日誌目錄存在
-    log_dir = "automation_logs"
+    log_dir = LOG_DIR
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
     
@@ -117,116 +186,211 @@ def setup_logging() -> None:
     handler.setFormatter(formatter)
     logging.getLogger('').addHandler(handler)
 
-def read_commands() -> List[Tuple[str, List[str]]]:
-    """讀取命令檔案"""
+# 區塊標記 (可不帶參數)
+BLOCK_MARKERS = ("NAV_SEQUENCE_START", "NAV_SEQUENCE_DEFINE", "NAV_SEQUENCE_END", "DATA_SOURCE_END")
+
+# 已解析的命令: (指令, 參數列表, 原始行 (已去除前後空白))
+ParsedCommand = Tuple[str, List[str], str]
+
+def parse_command_line(line: str) -> Optional[ParsedCommand]:
+    """將單行指令拆解為 (指令, 參數列表, 原始行)，空行、註解或格式錯誤時返回 None"""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    
+    if "=" not in line:
+        # 區塊標記可單獨成行，例如 NAV_SEQUENCE_END
+        return (line, [], line) if line in BLOCK_MARKERS else None
+    
+    cmd, params_str = line.split("=", 1)
+    return cmd.strip(), [p.strip() for p in params_str.split("||")], line
+
+def iter_command_lines(lines: Iterable[str]) -> Iterator[ParsedCommand]:
+    """逐行解析命令文字，邊讀邊產生 (指令, 參數列表, 原始行)
+
+    導航序列的開始/結束標記會原樣產生，由 command_program 組成巢狀區塊。
+    """
+    for line in lines:
+        parsed = parse_command_line(line)
+        if parsed:
+            yield parsed
+
+def parse_command_lines(lines: Iterable[str]) -> List[ParsedCommand]:
+    """解析命令文字行，返回 (指令, 參數列表, 原始行) 列表"""
+    return list(iter_command_lines(lines))
+
+# 已解析片段的快取: 絕對路徑 -> (修改時間, 檔案大小, 未展開 INCLUDE 的命令列表)
+_fragment_cache: Dict[str, Tuple[int, int, List[ParsedCommand]]] = {}
+_fragment_cache_lock = threading.Lock()
+
+def _resolve_include_path(include_path: str, parent_path: str) -> str:
+    """解析 INCLUDE 路徑: 相對路徑以引入者所在目錄為基準，找不到時再以目前工作目錄為基準"""
+    if os.path.isabs(include_path):
+        return include_path
+    
+    candidate = os.path.join(os.path.dirname(os.path.abspath(parent_path)), include_path)
+    if os.path.exists(candidate):
+        return candidate
+    return os.path.abspath(include_path)
+
+def load_fragment(path: str) -> List[ParsedCommand]:
+    """讀取並解析命令片段，依路徑與修改時間快取於整個程序中"""
+    abs_path = os.path.abspath(path)
+    stat = os.stat(abs_path)
+    
+    with _fragment_cache_lock:
+        cached = _fragment_cache.get(abs_path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+    
+    with open(abs_path, "r", encoding="utf-8") as f:
+        commands = parse_command_lines(f)
+    
+    with _fragment_cache_lock:
+        _fragment_cache[abs_path] = (stat.st_mtime_ns, stat.st_size, commands)
+    logging.debug(f"已解析命令片段: {abs_path}")
+    return commands
+
+def _expand_includes(commands: Iterable[ParsedCommand], parent_path: str, active: List[str],
+                     dependencies: Optional[Dict[str, Tuple[int, int]]]) -> Iterator[ParsedCommand]:
+    """展開 INCLUDE=路徑，無法引入時原樣產生 INCLUDE 命令，由編譯器回報錯誤"""
+    for command in commands:
+        cmd, params, _ = command
+        if cmd != "INCLUDE" or not params or not params[0]:
+            yield command
+            continue
+        
+        include_path = _resolve_include_path(params[0], parent_path)
+        if include_path in active:
+            logging.error(f"INCLUDE 循環引入: {include_path}")
+            yield command
+            continue
+        
+        try:
+            fragment = load_fragment(include_path)
+        except OSError as e:
+            logging.error(f"無法引入檔案 {params[0]}: {str(e)}")
+            if dependencies is not None:
+                # 記錄不存在的檔案，之後建立時編譯快取即失效
+                dependencies[include_path] = (0, -1)
+            yield command
+            continue
+        
+        if dependencies is not None and include_path not in dependencies:
+            stat = os.stat(include_path)
+            dependencies[include_path] = (stat.st_mtime_ns, stat.st_size)
+        
+        active.append(include_path)
+        yield from _expand_includes(fragment, include_path, active, dependencies)
+        active.pop()
+
+def iter_commands(path: str = None, expand_includes: bool = True,
+                  dependencies: Optional[Dict[str, Tuple[int, int]]] = None) -> Iterator[ParsedCommand]:
+    """串流讀取命令檔案，不需先將整個檔案載入記憶體
+
+    expand_includes 為 True 時展開 INCLUDE=路徑 (片段經 load_fragment 快取)，
+    並將被引入檔案記錄到 dependencies (路徑 -> (修改時間, 大小))。
+    """
+    if path is None:
+        path = COMMAND_FILE
+    
+    if not os.path.exists(path):
+        logging.info(f"找不到 {path} 檔案")
+        return
+    
+    with open(path, "r", encoding="utf-8") as f:
+        commands = iter_command_lines(f)
+        if expand_includes:
+            commands = _expand_includes(commands, path, [os.path.abspath(path)], dependencies)
+        yield from commands
+
+def read_commands(expand_includes: bool = True) -> List[ParsedCommand]:
+    """讀取命令檔案 (命令編輯器需保留 INCLUDE 行時傳入 expand_includes=False)"""
     commands = []
     try:
-        if os.path.exists(COMMAND_FILE):
-            with open(COMMAND_FILE, "r", encoding="utf-8") as f:
-                in_nav_sequence = False
-                nav_sequence_commands = []
-                nav_sequence_name = ""
-                
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith("#"):
-                        continue
-                    
-                    # 處理導航序列
-                    if line.startswith("NAV_SEQUENCE_START"):
-                        in_nav_sequence = True
-                        if "=" in line:
-                            _, nav_sequence_name = line.split("=", 1)
-                            nav_sequence_name = nav_sequence_name.strip()
-                        else:
-                            nav_sequence_name = "Navigation Sequence"
-                        continue
-                    
-                    if line.startswith("NAV_SEQUENCE_END"):
-                        in_nav_sequence = False
-                        commands.append(("NAV_SEQUENCE", [nav_sequence_name] + nav_sequence_commands))
-                        nav_sequence_commands = []
-                        continue
-                    
-                    if in_nav_sequence:
-                        if "=" in line:
-                            cmd, params_str = line.split("=", 1)
-                            cmd = cmd.strip()
-                            params = [p.strip() for p in params_str.split("||")]
-                            nav_sequence_commands.append(f"{cmd}:{','.join(params)}")
-                        continue
-                    
-                    # 處理一般指令
-                    if "=" in line:
-                        cmd, params_str = line.split("=", 1)
-                        cmd = cmd.strip()
-                        params = [p.strip() for p in params_str.split("||")]
-                        commands.append((cmd, params))
-            
+        commands = list(iter_commands(expand_includes=expand_includes))
+        if commands:
             logging.info(f"已載入 {len(commands)} 個命令")
-        else:
-            logging.info(f"找不到 {COMMAND_FILE} 檔案")
     except Exception as e:
         logging.error(f"讀取命令檔案時發生錯誤: {str(e)}")
     
     return commands
 
-def load_keywords_from_command() -> List[str]:
-    """從命令檔案讀取關鍵字 - 增強版"""
-    try:
-        keywords = []
+# 測試中特別重要的關鍵字
+IMPORTANT_KEYWORDS = ["挪威國家廣播公司", "台灣的戰貓", "蕭美琴", "Nokia 360 Camera", "自動化測試頁面"]
+IMPORTANT_KEYWORD_MARKERS = ["挪威", "台灣", "蕭美琴", "Nokia", "Camera"]
+MAX_KEYWORDS = 10
+
+# 命令串流中的每一行只需掃描一次即可判斷是否包含任一重要標記
+_important_markers = text_matcher.TextMatcher(IMPORTANT_KEYWORD_MARKERS, ignore_case=False)
+
+class KeywordCollector:
+    """從已解析的命令中逐一收集關鍵字，可搭配串流讀取使用"""
+    
+    def __init__(self) -> None:
+        self.keywords: List[str] = []
+        self._seen = set()
+    
+    def _add_keyword(self, keyword: str, source: str) -> None:
+        if keyword not in self._seen:
+            self._seen.add(keyword)
+            self.keywords.append(keyword)
+            logging.debug(f"從 {source} 找到關鍵字: {keyword}")
+    
+    def add(self, cmd: str, params: List[str], line: Optional[str] = None) -> None:
+        """檢查單一命令並收集其中的關鍵字 (line 為命令檔中的原始行，未提供時由指令與參數組成)"""
+        if line is None:
+            line = f"{cmd}={' || '.join(params)}"
+        # 含資料驅動佔位符 (${欄位}) 的命令於套用資料列後才有實際文字
+        if "${" in line:
+            return
         
-        # 檢查命令檔案是否存在
-        if not os.path.exists("command.txt"):
-            logging.error("找不到 command.txt 檔案")
-            return []
+        # 尋找 VERIFY_TEXT_EXISTS 命令中的關鍵字
+        if cmd == "VERIFY_TEXT_EXISTS":
+            keyword = line.split("=", 1)[1].strip() if "=" in line else ""
+            # 如果關鍵字不是指令或設定，則加入列表
+            if keyword and not keyword.startswith("#") and len(keyword) > 3 and not any(x in keyword for x in ["=", "||", "<", ">"]):
+                self._add_keyword(keyword, "VERIFY_TEXT_EXISTS")
         
-        with open("command.txt", "r", encoding="utf-8") as file:
-            for line in file:
-                line = line.strip()
-                # 忽略註釋行和空行
-                if not line or line.startswith("#"):
-                    continue
-                
-                # 尋找 VERIFY_TEXT_EXISTS 命令中的關鍵字
-                if line.startswith("VERIFY_TEXT_EXISTS="):
-                    keyword = line.split("=", 1)[1].strip()
-                    # 如果關鍵字不是指令或設定，則加入列表
-                    if keyword and not keyword.startswith("#") and len(keyword) > 3 and not any(x in keyword for x in ["=", "||", "<", ">"]):
-                        keywords.append(keyword)
-                        logging.debug(f"從 VERIFY_TEXT_EXISTS 找到關鍵字: {keyword}")
-                        
-                # 尋找 VERIFY_TEXT_CONTAINS 命令中的關鍵字
-                elif line.startswith("VERIFY_TEXT_CONTAINS="):
-                    parts = line.split("=", 1)[1].strip().split("||")
-                    if len(parts) > 0 and parts[0].strip():
-                        keyword = parts[0].strip()
-                        if len(keyword) > 3:
-                            keywords.append(keyword)
-                            logging.debug(f"從 VERIFY_TEXT_CONTAINS 找到關鍵字: {keyword}")
-                
-                # 尋找特定的關鍵字，這些關鍵字可能在測試中特別重要
-                elif any(important in line for important in ["挪威", "台灣", "蕭美琴", "Nokia", "Camera"]):
-                    # 從行中提取可能的關鍵字
-                    potential_keywords = [word for word in line.split() if len(word) > 3 and not any(x in word for x in ["=", "||", "<", ">", "#"])]
-                    for keyword in potential_keywords:
-                        if keyword not in keywords:
-                            keywords.append(keyword)
-                            logging.debug(f"從特定行中找到關鍵字: {keyword}")
+        # 尋找 VERIFY_TEXT_CONTAINS 命令中的關鍵字
+        elif cmd == "VERIFY_TEXT_CONTAINS":
+            if params and len(params[0]) > 3:
+                self._add_keyword(params[0], "VERIFY_TEXT_CONTAINS")
         
-        # 移除重複的關鍵字
-        unique_keywords = list(set(keywords))
+        # 尋找特定的關鍵字，這些關鍵字可能在測試中特別重要
+        elif _important_markers.any_in(line):
+            # 從行中提取可能的關鍵字
+            for word in line.split():
+                if len(word) > 3 and not any(x in word for x in ["=", "||", "<", ">", "#"]):
+                    self._add_keyword(word, "特定行")
+    
+    def result(self) -> List[str]:
+        """返回收集到的關鍵字 (含重要關鍵字，最多 MAX_KEYWORDS 個)"""
+        result_keywords = list(self.keywords)
         
         # 確保重要的關鍵字被包含
-        important_keywords = ["挪威國家廣播公司", "台灣的戰貓", "蕭美琴", "Nokia 360 Camera", "自動化測試頁面"]
-        for keyword in important_keywords:
-            if keyword not in unique_keywords:
-                unique_keywords.append(keyword)
+        for keyword in IMPORTANT_KEYWORDS:
+            if keyword not in result_keywords:
+                result_keywords.append(keyword)
                 logging.debug(f"添加重要關鍵字: {keyword}")
         
-        # 只保留前10個關鍵字
-        result_keywords = unique_keywords[:10] if len(unique_keywords) > 10 else unique_keywords
+        return result_keywords[:MAX_KEYWORDS]
+
+def load_keywords_from_command(commands: Optional[Iterable[ParsedCommand]] = None) -> List[str]:
+    """從命令讀取關鍵字 - 增強版 (未傳入命令時串流讀取命令檔案)"""
+    try:
+        if commands is None:
+            # 檢查命令檔案是否存在
+            if not os.path.exists(COMMAND_FILE):
+                logging.error(f"找不到 {COMMAND_FILE} 檔案")
+                return []
+            commands = iter_commands()
         
+        collector = KeywordCollector()
+        for cmd, params, line in commands:
+            collector.add(cmd, params, line)
+        
+        result_keywords = collector.result()
         logging.info(f"已載入 {len(result_keywords)} 個關鍵字")
         return result_keywords
     except Exception as e:
@@ -234,7 +398,7 @@ def load_keywords_from_command() -> List[str]:
         logging.debug(f"錯誤詳情: {traceback.format_exc()}")
         
         # 返回一些默認關鍵字，確保測試可以繼續
-        default_keywords = ["挪威國家廣播公司", "台灣的戰貓", "蕭美琴", "Nokia 360 Camera", "自動化測試頁面"]
+        default_keywords = list(IMPORTANT_KEYWORDS)
         logging.info(f"使用 {len(default_keywords)} 個默認關鍵字")
         return default_keywords
 
@@ -278,28 +442,107 @@ def calculate_text_similarity(text1: str, text2: str) -> float:
 
 def text_contains(page_text: str, expected_text: str) -> bool:
     """檢查頁面文本是否包含預期文本 (部分匹配)"""
-    return expected_text.lower() in page_text.lower()
+    return expected_text.lower() in text_matcher.lowered(page_text)
+
+@lru_cache(maxsize=REGEX_CACHE_SIZE)
+def compile_pattern(pattern: str) -> "re.Pattern":
+    """編譯 VERIFY_TEXT_PATTERN 的正則表達式 (不區分大小寫)，相同模式只編譯一次；無效的模式拋出 re.error"""
+    return re.compile(pattern, re.IGNORECASE)
 
-def text_matches_pattern(page_text: str, pattern: str) -> bool:
-    """檢查頁面文本是否符合正則表達式模式"""
+def text_matches_pattern(page_text: str, pattern) -> bool:
+    """檢查頁面文本是否符合正則表達式模式 (可傳入已編譯的模式)"""
     try:
-        regex = re.compile(pattern, re.IGNORECASE)
+        regex = pattern if isinstance(pattern, re.Pattern) else compile_pattern(pattern)
         return bool(regex.search(page_text))
     except re.error as e:
         logging.error(f"正則表達式錯誤: {str(e)}")
         return False
 
+def page_text_similarity(page_text: str, expected_text: str, threshold: Optional[float] = None) -> float:
+    """頁面中與預期文本最相似的區段的相似度 (0.0 到 1.0)，指定閾值時找到達到閾值的區段即返回"""
+    return text_matcher.best_window_similarity(page_text, expected_text, threshold, SIMILARITY_MAX_CANDIDATES)
+
 def text_is_similar(page_text: str, expected_text: str, threshold: float = DEFAULT_SIMILARITY_THRESHOLD) -> bool:
     """檢查頁面文本與預期文本的相似度是否超過閾值"""
-    return calculate_text_similarity(page_text.lower(), expected_text.lower()) >= threshold
+    return page_text_similarity(text_matcher.lowered(page_text), expected_text.lower(), threshold) >= threshold
 
 def any_text_matches(page_text: str, expected_texts: List[str]) -> bool:
-    """檢查頁面文本是否匹配任一預期文本 (OR 邏輯)"""
-    return any(expected_text.lower() in page_text.lower() for expected_text in expected_texts)
+    """檢查頁面文本是否匹配任一預期文本 (OR 邏輯，掃描一次頁面文本)"""
+    return text_matcher.get_matcher(expected_texts).any_in(page_text)
 
 def all_texts_match(page_text: str, expected_texts: List[str]) -> bool:
-    """檢查頁面文本是否匹配所有預期文本 (AND 邏輯)"""
-    return all(expected_text.lower() in page_text.lower() for expected_text in expected_texts)
+    """檢查頁面文本是否匹配所有預期文本 (AND 邏輯，掃描一次頁面文本)"""
+    return not missing_texts(page_text, expected_texts)
+
+def missing_texts(page_text: str, expected_texts: List[str]) -> List[str]:
+    """返回頁面文本中缺少的預期文本 (不區分大小寫)"""
+    return text_matcher.get_matcher(expected_texts).missing(page_text)
+
+def get_browser_profile(name: str) -> Tuple[List[str], Dict[str, Any]]:
+    """解析瀏覽器執行設定檔，返回 (Chrome 參數, 偏好設定)；未知的設定檔拋出 ValueError"""
+    arguments: Dict[str, str] = {}
+    prefs: Dict[str, Any] = {}
+    for part in (name or DEFAULT_BROWSER_PROFILE).split("+"):
+        part = part.strip()
+        if part not in BROWSER_PROFILES:
+            raise ValueError(f"未知的瀏覽器設定檔: {part} (可用: {', '.join(BROWSER_PROFILES)})")
+        # 相同參數以後面的設定檔為準
+        for argument in BROWSER_PROFILES[part]["arguments"]:
+            arguments[argument.split("=", 1)[0]] = argument
+        prefs.update(BROWSER_PROFILES[part]["prefs"])
+    
+    # 未指定視窗大小時維持原本的最大化視窗
+    if "--window-size" not in arguments:
+        arguments["--start-maximized"] = "--start-maximized"
+    return list(arguments.values()), prefs
+
+def resolve_html_url(url_path: str) -> Optional[str]:
+    """在程式目錄、web 資料夾與工作目錄中尋找本地 HTML 檔案，返回 file:// URL (找不到時返回 None)"""
+    # 獲取基礎目錄
+    if getattr(sys, 'frozen', False):
+        # 如果是打包後的執行檔
+        base_dir = sys._MEIPASS
+    else:
+        # 如果是直接執行 Python 腳本
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    
+    logging.info(f"基礎目錄: {base_dir}")
+    
+    html_paths = [
+        # 方法1: 在 web 資料夾下尋找
+        os.path.join(base_dir, "web", os.path.basename(url_path)),
+        # 方法2: 直接在基礎目錄下尋找
+        os.path.join(base_dir, os.path.basename(url_path)),
+        # 方法3: 使用相對路徑
+        os.path.join(base_dir, url_path),
+        # 方法4: 使用當前工作目錄
+        os.path.join(os.getcwd(), "web", os.path.basename(url_path)),
+    ]
+    
+    # 嘗試所有可能的路徑
+    for path in html_paths:
+        logging.info(f"嘗試路徑: {path}")
+        if os.path.exists(path):
+            logging.info(f"找到 HTML 檔案: {path}")
+            # 轉換為 file:// URL 格式
+            return f"file:///{path.replace(os.sep, '/').lstrip('/')}"
+    
+    # 如果找不到檔案，列出可用的檔案
+    web_dir = os.path.join(base_dir, "web")
+    if os.path.exists(web_dir):
+        logging.warning(f"找不到 HTML 檔案，但 web 資料夾中有以下檔案: {os.listdir(web_dir)}")
+    else:
+        logging.warning("找不到 HTML 檔案，且 web 資料夾不存在")
+    return None
+
+def xpath_literal(text: str) -> str:
+    """將文字轉為 XPath 字串常量 (處理引號)"""
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    parts = text.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
 
 def get_resource_path(relative_path: str) -> str:
     """獲取資源文件的絕對路徑（打包後可用）"""
@@ -343,18 +586,40 @@ def load_settings() -> Dict[str, Any]:
         logging.error(f"載入設置時發生錯誤: {str(e)}")
         return default_settings
 
+def write_run_report(report: Dict[str, Any]) -> Optional[str]:
+    """將執行報告寫入日誌目錄的 JSON 檔，返回檔案路徑"""
+    try:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        report = dict(report, generated_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+        report_file = os.path.join(LOG_DIR, f"report_{current_time}.json")
+        with open(report_file, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=4)
+        logging.info(f"執行報告已寫入: {report_file}")
+        return report_file
+    except Exception as e:
+        logging.error(f"寫入執行報告時發生錯誤: {str(e)}")
+        return None
+
 def update_test_results(test_name: str, passed: bool) -> None:
     """更新測試結果"""
+    update_test_results_batch({test_name: passed})
+
+def update_test_results_batch(results: Dict[str, bool]) -> None:
+    """一次更新多筆測試結果 (只寫入設置文件一次)"""
+    if not results:
+        return
+    
     settings = load_settings()
     
     if "test_results" not in settings:
         settings["test_results"] = {}
     
     # 更新測試結果
-    settings["test_results"][test_name] = passed
+    settings["test_results"].update(results)
     
     # 更新最後執行日期
     settings["last_run_date"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     # 保存設置
-    save_settings(settings) 
\ No newline at end of file
+    save_settings(settings)
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import command_program
+import command_registry
+import page_snapshot
+import verify_scripts
+
+# 可合併為一次腳本呼叫的內建驗證指令 (指令名稱 -> SeleniumHandler 方法名稱)
+# 擴充模組以 register_command 覆寫同名指令時，處理函式名稱不同，不會被合併
+BATCHABLE_COMMANDS = {
+    "VERIFY_TEXT_EXISTS": "verify_text_exists",
+    "VERIFY_TEXT_NOT_EXISTS": "verify_text_not_exists",
+    "VERIFY_ELEMENT_EXISTS": "verify_element_exists",
+    "VERIFY_ELEMENT_VALUE": "verify_element_value",
+    "VERIFY_COUNT": "verify_count",
+    "VERIFY_TEXT_CONTAINS": "verify_text_contains",
+    "VERIFY_TEXT_PATTERN": "verify_text_pattern",
+    "VERIFY_TEXT_SIMILAR": "verify_text_similar",
+    "VERIFY_ANY_TEXT": "verify_any_text",
+    "VERIFY_ALL_TEXT": "verify_all_text",
+}
+
+# 比對可見文字的驗證: 由批次腳本傳回的頁面文字 (固定為快照) 在 Python 端判斷
+_TEXT_COMMANDS = {"VERIFY_TEXT_CONTAINS", "VERIFY_TEXT_PATTERN", "VERIFY_TEXT_SIMILAR", "VERIFY_ANY_TEXT", "VERIFY_ALL_TEXT"}
+
+# 批次驗證: 一次返回 {version: DOM 版本, text: 可見文字 (需要時), results: 各檢查結果}
+# 檢查種類: ladder (VERIFY_TEXT_EXISTS 的比對順序)、absent (原始碼不含文字)、
+# scope (範圍元素的可見文字)、element (符合選擇器的元素數量與第一個元素的值)
+# 有 scope 的檢查只在範圍元素內進行，找不到範圍元素時返回 {scopeMissing: true}
+BATCH_FUNCTION = verify_scripts.TEXT_LADDER_FUNCTION + page_snapshot.DOM_VERSION_FUNCTION + """
+function runChecks(checks, needText) {
+    const results = checks.map(check => {
+        try {
+            if (check.kind === 'ladder') return textLadder(check.text, check.xpath, check.scope);
+            if (check.kind === 'absent' || check.kind === 'scope') {
+                const root = check.scope ? findAll(check.scope[0], check.scope[1])[0] : document.documentElement;
+                if (!root) return {scopeMissing: true};
+                return check.kind === 'scope' ? root.innerText : !root.outerHTML.includes(check.text);
+            }
+            const elements = findAll(check.by, check.value);
+            let value = null;
+            if (elements.length) {
+                const element = elements[0];
+                const raw = 'value' in element ? element.value : element.getAttribute('value');
+                value = raw === null || raw === undefined || raw === '' ? element.innerText : String(raw);
+            }
+            return {count: elements.length, value: value};
+        } catch (e) {
+            return {error: String(e)};
+        }
+    });
+    return {version: domVersion(), text: needText && document.body ? document.body.innerText : null, results: results};
+}
+"""
+
+# 分段非同步腳本: 等待頁面載入完成後執行 (未完成時於 sliceMs 後返回 false)
+BATCH_WHEN_LOADED_SCRIPT = BATCH_FUNCTION + """
+const [checks, needText, sliceMs] = arguments;
+const done = arguments[arguments.length - 1];
+if (document.readyState === 'complete') { done(runChecks(checks, needText)); return; }
+const onLoad = () => { clearTimeout(timer); done(runChecks(checks, needText)); };
+const timer = setTimeout(() => { window.removeEventListener('load', onLoad); done(false); }, sliceMs);
+window.addEventListener('load', onLoad);
+"""
+
+# 不等待頁面載入，立即執行
+BATCH_SCRIPT = BATCH_FUNCTION + "return runChecks(arguments[0], arguments[1]);"
+
+def is_batchable(instruction: command_program.Instruction) -> bool:
+    """指令是否為可合併的內建唯讀驗證"""
+    spec = instruction.spec
+    method_name = BATCHABLE_COMMANDS.get(instruction.cmd)
+    return (method_name is not None and spec is not None and not instruction.error
+            and not spec.mutating and getattr(spec.handler, "__name__", None) == method_name)
+
+def group_instructions(instructions: Iterable[command_program.Instruction]) -> Iterator[List[command_program.Instruction]]:
+    """將連續的可合併驗證分為一組，其他指令各自一組 (逐一產生，不需要預先載入整個腳本)"""
+    batch: List[command_program.Instruction] = []
+    for instruction in instructions:
+        if is_batchable(instruction):
+            batch.append(instruction)
+            continue
+        if batch:
+            yield batch
+            batch = []
+        yield [instruction]
+    if batch:
+        yield batch
+
+def instruction_scope(instruction: command_program.Instruction):
+    """文字驗證的 SCOPE 參數 (最後一個呼叫參數)，未指定時返回 None"""
+    if instruction.cmd in command_registry.SCOPED_COMMANDS and instruction.args:
+        return instruction.args[-1]
+    return None
+
+def build_check(instruction: command_program.Instruction, parse_selector) -> Optional[Dict[str, Any]]:
+    """指令在批次腳本中的檢查 (比對整頁可見文字的驗證不需要檢查，返回 None)"""
+    cmd = instruction.cmd
+    scope = instruction_scope(instruction)
+    scope_locator = list(parse_selector(scope)) if scope is not None else None
+    if cmd == "VERIFY_TEXT_EXISTS":
+        text, xpath, _ = verify_scripts.text_ladder_args(instruction.args[0])
+        return {"kind": "ladder", "text": text, "xpath": xpath, "scope": scope_locator}
+    if cmd == "VERIFY_TEXT_NOT_EXISTS":
+        return {"kind": "absent", "text": instruction.args[0], "scope": scope_locator}
+    if scope_locator is not None:
+        return {"kind": "scope", "scope": scope_locator}
+    if cmd in ("VERIFY_ELEMENT_EXISTS", "VERIFY_ELEMENT_VALUE", "VERIFY_COUNT"):
+        by, value = parse_selector(instruction.args[0])
+        return {"kind": "element", "by": by, "value": value}
+    return None
+
+def needs_text(instructions: List[command_program.Instruction]) -> bool:
+    """是否有比對整頁可見文字的驗證"""
+    return any(instruction.cmd in _TEXT_COMMANDS and instruction_scope(instruction) is None
+               for instruction in instructions)
+
+# 文字比對類驗證的判斷 (呼叫參數去掉最後的 SCOPE 後傳入)
+_TEXT_REPORTS = {
+    "VERIFY_TEXT_CONTAINS": verify_scripts.report_text_contains,
+    "VERIFY_TEXT_PATTERN": verify_scripts.report_text_pattern,
+    "VERIFY_TEXT_SIMILAR": verify_scripts.report_text_similar,
+    "VERIFY_ANY_TEXT": verify_scripts.report_any_text,
+    "VERIFY_ALL_TEXT": verify_scripts.report_all_text,
+}
+
+def judge(instruction: command_program.Instruction, outcome, page_text: Optional[str]) -> Optional[bool]:
+    """依批次腳本的檢查結果判斷單一驗證並記錄日誌 (同步與非同步執行共用)
+
+    outcome 為指令檢查的結果 (不需檢查時為 None)，page_text 為腳本傳回的整頁可見文字。
+    無法由本次結果判斷時返回 None: 元素尚未出現 (awaits_element) 或檢查時發生錯誤。
+    """
+    cmd = instruction.cmd
+    scope = instruction_scope(instruction)
+    if isinstance(outcome, dict) and outcome.get("scopeMissing"):
+        return verify_scripts.report_scope_missing(scope)
+    if cmd in _TEXT_REPORTS:
+        # 有 scope 時為範圍元素的可見文字
+        content = outcome if scope is not None else page_text
+        if not isinstance(content, str):
+            return None
+        return _TEXT_REPORTS[cmd](content, *instruction.args[:-1])
+    if not isinstance(outcome, (dict, bool)) or (isinstance(outcome, dict) and "error" in outcome):
+        return None
+
+    if cmd == "VERIFY_TEXT_EXISTS":
+        return verify_scripts.report_text_ladder(instruction.args[0], outcome, scope)
+    if cmd == "VERIFY_TEXT_NOT_EXISTS":
+        return verify_scripts.report_text_absent(instruction.args[0], outcome)
+
+    selector = instruction.args[0]
+    if cmd == "VERIFY_COUNT":
+        return verify_scripts.report_element_count(selector, outcome["count"], instruction.args[1])
+    if outcome["count"] == 0:
+        # 元素可能稍後才出現
+        return None
+    if cmd == "VERIFY_ELEMENT_EXISTS":
+        return verify_scripts.report_element_found(selector, True)
+    return verify_scripts.report_element_value(selector, outcome["value"], instruction.args[1])
+
+def awaits_element(instruction: command_program.Instruction, outcome) -> bool:
+    """元素驗證的元素尚未出現 (應等待後重新檢查)"""
+    return (instruction.cmd in ("VERIFY_ELEMENT_EXISTS", "VERIFY_ELEMENT_VALUE")
+            and isinstance(outcome, dict) and outcome.get("count") == 0)
+
+def report_unresolved(instruction: command_program.Instruction, outcome) -> bool:
+    """judge 無法判斷且不再重新檢查的驗證: 記錄找不到元素或檢查錯誤，返回 False"""
+    if awaits_element(instruction, outcome):
+        return verify_scripts.report_element_found(instruction.args[0], False)
+    error = outcome.get("error") if isinstance(outcome, dict) else "未取得檢查結果"
+    logging.error(f"執行命令 {instruction.cmd} 時發生錯誤: {error}")
+    return False
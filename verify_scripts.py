@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+import logging
+from typing import Any, List, Optional, Tuple
+
+import utils
+
+# 以 WebDriver 定位策略 (by, value) 在頁面內尋找元素
+FIND_ALL_FUNCTION = """
+function findAll(by, value) {
+    if (by === 'id') return Array.from(document.querySelectorAll('[id="' + CSS.escape(value) + '"]'));
+    if (by === 'class name') return Array.from(document.getElementsByClassName(value));
+    if (by === 'xpath') {
+        const found = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const elements = [];
+        for (let i = 0; i < found.snapshotLength; i++) elements.push(found.snapshotItem(i));
+        return elements;
+    }
+    return Array.from(document.querySelectorAll(value));
+}
+"""
+
+# VERIFY_TEXT_EXISTS 的比對順序 (與原本逐步呼叫 WebDriver 的順序相同)，在瀏覽器內一次完成
+# scope 為 [by, value] 時只在第一個符合的元素內比對
+# 返回 {strategy: 成功的比對方式 或 null, part: 部分匹配的片段, scopeMissing: 找不到範圍元素}
+TEXT_LADDER_FUNCTION = FIND_ALL_FUNCTION + """
+function textLadder(text, xpathLiteral, scope) {
+    let root = document.documentElement, bodyText;
+    if (scope) {
+        root = findAll(scope[0], scope[1])[0];
+        if (!root) return {strategy: null, scopeMissing: true};
+        bodyText = root.innerText || '';
+    } else {
+        bodyText = document.body ? document.body.innerText : '';
+    }
+    const source = root ? root.outerHTML : '';
+    if (source.includes(text)) return {strategy: 'source'};
+
+    if (bodyText.includes(text)) return {strategy: 'text'};
+    if (bodyText.toLowerCase().includes(text.toLowerCase())) return {strategy: 'text-ci'};
+
+    const prefix = scope ? './/' : '//';
+    const xpaths = [
+        ['xpath-text', prefix + '*[contains(text(), ' + xpathLiteral + ')]'],
+        ['xpath-descendant', prefix + '*[contains(., ' + xpathLiteral + ')]'],
+        ['xpath-input-value', prefix + 'input[@value=' + xpathLiteral + ']'],
+    ];
+    for (const [strategy, xpath] of xpaths) {
+        try {
+            const result = document.evaluate(xpath, scope ? root : document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+            if (result.singleNodeValue) return {strategy: strategy};
+        } catch (e) {}
+    }
+
+    if (text.length > 5) {
+        const half = Math.floor(text.length / 2);
+        for (const part of [text.slice(0, half), text.slice(half)]) {
+            if (part.length > 4 && (source.includes(part) || bodyText.includes(part))) {
+                return {strategy: 'partial', part: part};
+            }
+        }
+    }
+    return {strategy: null};
+}
+"""
+
+# 分段非同步腳本: 等待頁面載入完成後執行比對 (未完成時於 sliceMs 後返回 false)
+TEXT_LADDER_WHEN_LOADED_SCRIPT = TEXT_LADDER_FUNCTION + """
+const [text, xpathLiteral, scope, sliceMs] = arguments;
+const done = arguments[arguments.length - 1];
+if (document.readyState === 'complete') { done(textLadder(text, xpathLiteral, scope)); return; }
+const onLoad = () => { clearTimeout(timer); done(textLadder(text, xpathLiteral, scope)); };
+const timer = setTimeout(() => { window.removeEventListener('load', onLoad); done(false); }, sliceMs);
+window.addEventListener('load', onLoad);
+"""
+
+# 不等待頁面載入，立即比對
+TEXT_LADDER_SCRIPT = TEXT_LADDER_FUNCTION + "return textLadder(arguments[0], arguments[1], arguments[2]);"
+
+# 驗證範圍元素的可見文字 (html 為真時改為 HTML)，找不到元素時返回 null
+SCOPE_CONTENT_FUNCTION = FIND_ALL_FUNCTION + """
+function scopeContent(by, value, html) {
+    const element = findAll(by, value)[0];
+    if (!element) return null;
+    return html ? element.outerHTML : element.innerText;
+}
+"""
+SCOPE_CONTENT_SCRIPT = SCOPE_CONTENT_FUNCTION + "return scopeContent(arguments[0], arguments[1], arguments[2]);"
+
+_STRATEGY_MESSAGES = {
+    "source": "在頁面源碼中找到文字",
+    "text": "在頁面文字中找到",
+    "text-ci": "在頁面文字中找到(不區分大小寫)",
+    "xpath-text": "使用 XPath 找到文字",
+    "xpath-descendant": "使用 XPath 找到文字",
+    "xpath-input-value": "使用 XPath 找到文字",
+}
+
+def text_ladder_args(text: str, scope: Optional[Tuple[str, str]] = None) -> tuple:
+    """TEXT_LADDER 腳本的參數 (XPath 字串常量在 Python 端產生以正確處理引號)，scope 為範圍元素的 (by, value)"""
+    return text, utils.xpath_literal(text), list(scope) if scope else None
+
+def report_scope_missing(scope) -> bool:
+    """記錄找不到驗證範圍元素，返回 False"""
+    logging.warning(f"驗證失敗: 找不到驗證範圍 '{scope}'")
+    return False
+
+def report_text_ladder(text: str, result: Optional[Any], scope=None) -> bool:
+    """依腳本返回的比對方式記錄日誌並返回是否找到"""
+    if isinstance(result, dict) and result.get("scopeMissing"):
+        return report_scope_missing(scope)
+    strategy = result.get("strategy") if isinstance(result, dict) else None
+    if strategy == "partial":
+        logging.info(f"驗證成功: 找到部分文字 '{result.get('part')}' (來自 '{text}') [strategy=partial]")
+        return True
+    if strategy:
+        logging.info(f"驗證成功: {_STRATEGY_MESSAGES.get(strategy, '找到文字')} '{text}' [strategy={strategy}]")
+        return True
+    logging.warning(f"驗證失敗: 未找到文字 '{text}'")
+    return False
+
+# 以下判斷由同步與非同步執行共用: 傳入已取得的頁面內容或檢查結果，記錄日誌並返回是否通過
+def report_text_absent(text: str, absent: bool) -> bool:
+    """VERIFY_TEXT_NOT_EXISTS"""
+    if absent:
+        logging.info(f"驗證成功: 未找到文字 '{text}'")
+        return True
+    logging.warning(f"驗證失敗: 找到文字 '{text}'")
+    return False
+
+def report_element_found(selector, found: bool) -> bool:
+    """VERIFY_ELEMENT_EXISTS"""
+    if found:
+        logging.info(f"驗證成功: 找到元素 '{selector}'")
+        return True
+    logging.warning(f"驗證失敗: 未找到元素 '{selector}'")
+    return False
+
+def report_element_value(selector, actual_value: Optional[str], expected_value: str) -> bool:
+    """VERIFY_ELEMENT_VALUE (元素已找到)"""
+    if actual_value == expected_value:
+        logging.info(f"驗證成功: 元素 '{selector}' 的值為 '{expected_value}'")
+        return True
+    logging.warning(f"驗證失敗: 元素 '{selector}' 的值為 '{actual_value}'，預期為 '{expected_value}'")
+    return False
+
+def report_element_count(selector, actual_count: int, expected_count: int) -> bool:
+    """VERIFY_COUNT"""
+    if actual_count == expected_count:
+        logging.info(f"驗證成功: 找到 {actual_count} 個符合 '{selector}' 的元素")
+        return True
+    logging.warning(f"驗證失敗: 找到 {actual_count} 個符合 '{selector}' 的元素，預期為 {expected_count}")
+    return False
+
+def report_text_contains(page_text: str, expected_text: str) -> bool:
+    """VERIFY_TEXT_CONTAINS"""
+    if utils.text_contains(page_text, expected_text):
+        logging.info(f"成功: 找到包含 '{expected_text}' 的文本")
+        return True
+    logging.warning(f"警告: 未找到包含 '{expected_text}' 的文本")
+    return False
+
+def report_text_pattern(page_text: str, pattern) -> bool:
+    """VERIFY_TEXT_PATTERN"""
+    pattern_text = getattr(pattern, "pattern", pattern)
+    if utils.text_matches_pattern(page_text, pattern):
+        logging.info(f"成功: 文本符合模式 '{pattern_text}'")
+        return True
+    logging.warning(f"警告: 文本不符合模式 '{pattern_text}'")
+    return False
+
+def report_text_similar(page_text: str, expected_text: str, threshold: Optional[float] = None) -> bool:
+    """VERIFY_TEXT_SIMILAR (未指定閾值時使用預設值)"""
+    threshold = utils.DEFAULT_SIMILARITY_THRESHOLD if threshold is None else float(threshold)
+    similarity = utils.page_text_similarity(page_text, expected_text, threshold)
+    if similarity >= threshold:
+        logging.info(f"成功: 文本相似度 {similarity:.2f} 超過閾值 {threshold:.2f}")
+        return True
+    logging.warning(f"警告: 文本相似度 {similarity:.2f} 低於閾值 {threshold:.2f}")
+    return False
+
+def report_any_text(page_text: str, expected_texts: List[str]) -> bool:
+    """VERIFY_ANY_TEXT"""
+    if utils.any_text_matches(page_text, expected_texts):
+        logging.info("成功: 找到符合條件的文本 (任一條件滿足)")
+        return True
+    expected_str = " 或 ".join([f"'{text}'" for text in expected_texts])
+    logging.warning(f"警告: 未找到任何符合條件的文本: {expected_str}")
+    return False
+
+def report_all_text(page_text: str, expected_texts: List[str]) -> bool:
+    """VERIFY_ALL_TEXT (記錄缺少的文本)"""
+    if utils.all_texts_match(page_text, expected_texts):
+        logging.info("成功: 找到所有符合條件的文本 (所有條件滿足)")
+        return True
+    missing_str = ", ".join([f"'{text}'" for text in utils.missing_texts(page_text, expected_texts)])
+    logging.warning(f"警告: 缺少以下文本: {missing_str}")
+    return False
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+import os
+import itertools
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+import utils
+
+# 條件為接受 driver、返回真假值的函式，可直接交給 CancellableWait.until
+Condition = Callable[[Any], Any]
+Locator = Tuple[str, str]
+
+# 頁面穩定: readyState 為 complete、沒有執行中的有限動畫/轉場，且 DOM 在 quiet_ms 內沒有變動
+# 第一次呼叫時安裝 MutationObserver，之後的呼叫只讀取最後變動時間
+PAGE_SETTLED_SCRIPT = """
+const quietMs = arguments[0];
+let state = window.__automationSettle;
+if (!state) {
+    state = window.__automationSettle = {last: performance.now()};
+    new MutationObserver(() => { state.last = performance.now(); })
+        .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    return false;
+}
+if (document.readyState !== 'complete') return false;
+if (document.getAnimations && document.getAnimations().some(a =>
+        a.playState === 'running' && a.effect && isFinite(a.effect.getComputedTiming().endTime))) return false;
+return performance.now() - state.last >= quietMs;
+"""
+
+# 沒有執行中的有限動畫或 CSS 轉場 (無限循環的讀取動畫不列入)
+ANIMATIONS_FINISHED_SCRIPT = """
+return !document.getAnimations || !document.getAnimations().some(a =>
+    a.playState === 'running' && a.effect && isFinite(a.effect.getComputedTiming().endTime));
+"""
+
+# 捲動位置與上一次輪詢相同 (平滑捲動結束)
+SCROLL_POSITION_SCRIPT = "return [window.scrollX, window.scrollY];"
+
+class WaitStats:
+    """統計條件等待取代固定等待所節省的時間 (由同一次執行的所有處理器共用)"""
+    __slots__ = ("_lock", "replaced", "timed_out", "budget", "waited")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.replaced = 0
+        self.timed_out = 0
+        self.budget = 0.0
+        self.waited = 0.0
+
+    def record(self, budget: float, waited: float, settled: bool) -> None:
+        """記錄一次條件等待: budget 為原本的固定等待秒數，waited 為實際等待秒數"""
+        with self._lock:
+            self.replaced += 1
+            self.budget += budget
+            self.waited += waited
+            if not settled:
+                self.timed_out += 1
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """合併其他程序回傳的統計"""
+        with self._lock:
+            self.replaced += snapshot.get("replaced", 0)
+            self.timed_out += snapshot.get("timed_out", 0)
+            self.budget += snapshot.get("fixed_seconds", 0.0)
+            self.waited += snapshot.get("waited_seconds", 0.0)
+
+    @property
+    def saved(self) -> float:
+        return max(0.0, self.budget - self.waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "replaced": self.replaced,
+                "timed_out": self.timed_out,
+                "fixed_seconds": round(self.budget, 3),
+                "waited_seconds": round(self.waited, 3),
+                "saved_seconds": round(self.saved, 3),
+            }
+
+# 條件
+def page_settled(quiet_ms: int = utils.DOM_QUIET_MS) -> Condition:
+    return lambda driver: driver.execute_script(PAGE_SETTLED_SCRIPT, quiet_ms)
+
+def animations_finished() -> Condition:
+    return lambda driver: driver.execute_script(ANIMATIONS_FINISHED_SCRIPT)
+
+def visible(locator: Locator) -> Condition:
+    return lambda driver: driver.find_element(*locator).is_displayed()
+
+def clickable(locator: Locator) -> Condition:
+    def condition(driver) -> bool:
+        element = driver.find_element(*locator)
+        return element.is_displayed() and element.is_enabled()
+    return condition
+
+def has_class(target, class_name: str) -> Condition:
+    """target 可為元素或定位 (by, value)"""
+    def condition(driver) -> bool:
+        element = driver.find_element(*target) if isinstance(target, tuple) else target
+        return class_name in (element.get_attribute("class") or "").split()
+    return condition
+
+def section_active(section_id: str) -> Condition:
+    """單頁應用的頁面區塊已切換為 active 並顯示"""
+    def condition(driver) -> bool:
+        element = driver.find_element("id", section_id)
+        return "active" in (element.get_attribute("class") or "").split() and element.is_displayed()
+    return condition
+
+def value_equals(element, expected: str) -> Condition:
+    """輸入框的值已更新為預期文字 (按鍵事件已處理完成)"""
+    return lambda driver: element.get_attribute("value") == expected
+
+def attribute_equals(element, name: str, expected: str) -> Condition:
+    return lambda driver: element.get_attribute(name) == expected
+
+def present(locator: Locator) -> Condition:
+    return lambda driver: len(driver.find_elements(*locator)) > 0
+
+def scroll_settled() -> Condition:
+    """捲動位置連續兩次輪詢相同"""
+    last = []
+    def condition(driver) -> bool:
+        position = driver.execute_script(SCROLL_POSITION_SCRIPT)
+        settled = last == [position]
+        last[:] = [position]
+        return settled
+    return condition
+
+def all_of(*conditions: Condition) -> Condition:
+    def condition(driver) -> bool:
+        return all(check(driver) for check in conditions)
+    return condition
+
+def any_of(*conditions: Condition) -> Condition:
+    """任一條件成立 (單一條件拋出的錯誤視為未成立)"""
+    def condition(driver) -> bool:
+        for check in conditions:
+            try:
+                if check(driver):
+                    return True
+            except Exception:
+                continue
+        return False
+    return condition
+
+# POLL_UNTIL 條件: 頁面可見文字包含指定文字
+BODY_TEXT_CONTAINS_SCRIPT = "return !!document.body && document.body.innerText.includes(arguments[0]);"
+
+def expression_script(expression: str) -> str:
+    """POLL_UNTIL 的 js: 條件，運算式結果轉為布林值"""
+    return f"return !!({expression});"
+
+# 分段非同步腳本: 最後一個參數 (回呼之前) 為 sliceMs，每次呼叫最多等待 sliceMs 毫秒 (返回 false)，
+# 由呼叫端分段重複呼叫以便檢查停止事件
+
+# 推送式等待: 以 MutationObserver 監看 DOM，條件成立時立即結束
+# mode 為 "text" 時 target 為文字 (比對文字內容與序列化的 HTML，與 page_source 相同)；
+# mode 為 "change" 時 target 為元素，第一次呼叫記錄 innerHTML，之後內容不同即成立；元素已移除時返回 "detached"
+WATCH_SCRIPT = """
+const [mode, target, token, sliceMs] = arguments;
+const done = arguments[arguments.length - 1];
+const registry = window.__automationWatch || (window.__automationWatch = {});
+let root, check;
+if (mode === 'text') {
+    root = document.documentElement;
+    check = () => (root.textContent || '').includes(target) || root.outerHTML.includes(target);
+} else {
+    root = target;
+    if (!(token in registry)) registry[token] = root.innerHTML;
+    check = () => root.isConnected ? root.innerHTML !== registry[token] : 'detached';
+}
+const finish = (result) => { delete registry[token]; done(result); };
+const initial = check();
+if (initial) { finish(initial); return; }
+let timer;
+const observer = new MutationObserver(() => {
+    const result = check();
+    if (result) { observer.disconnect(); clearTimeout(timer); finish(result); }
+});
+observer.observe(root, {subtree: true, childList: true, attributes: true, characterData: true});
+timer = setTimeout(() => { observer.disconnect(); done(false); }, sliceMs);
+"""
+
+# 放棄等待時清除 WATCH_SCRIPT 保存的基準內容
+WATCH_CLEAR_SCRIPT = "if (window.__automationWatch) delete window.__automationWatch[arguments[0]];"
+
+_watch_tokens = itertools.count()
+
+def new_watch_token() -> str:
+    """每次等待使用的識別碼 (同一頁面上同時進行的等待互不干擾)"""
+    return f"w{os.getpid()}-{next(_watch_tokens)}"
+
+# 網路請求追蹤: 包裝 fetch 與 XMLHttpRequest，記錄進行中的請求數與最後一次開始/結束的時間
+# 可透過 CDP 在每個新文件載入前注入，或在等待時才注入 (注入前已開始的請求無法追蹤)
+NETWORK_TRACKER_SCRIPT = """
+if (!window.__automationNetwork) {
+    const net = window.__automationNetwork = {inflight: 0, last: performance.now()};
+    const begin = () => { net.inflight++; net.last = performance.now(); };
+    const end = () => { net.inflight = Math.max(0, net.inflight - 1); net.last = performance.now(); };
+    if (window.fetch) {
+        const originalFetch = window.fetch;
+        window.fetch = function () {
+            begin();
+            let promise;
+            try { promise = originalFetch.apply(this, arguments); } catch (e) { end(); throw e; }
+            return promise.then(response => { end(); return response; }, error => { end(); throw error; });
+        };
+    }
+    if (window.XMLHttpRequest) {
+        const originalSend = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.send = function () {
+            begin();
+            this.addEventListener('loadend', end, {once: true});
+            try { return originalSend.apply(this, arguments); } catch (e) { end(); throw e; }
+        };
+    }
+}
+"""
+
+# 網路閒置: 沒有進行中的請求且超過 quietMs 毫秒沒有新的請求 (分段非同步腳本)
+NETWORK_IDLE_SCRIPT = NETWORK_TRACKER_SCRIPT + """
+const [quietMs, sliceMs] = arguments;
+const done = arguments[arguments.length - 1];
+const net = window.__automationNetwork;
+const start = performance.now();
+const tick = () => {
+    const now = performance.now();
+    if (net.inflight === 0 && now - net.last >= quietMs) { done(true); return; }
+    if (now - start >= sliceMs) { done(false); return; }
+    setTimeout(tick, 50);
+};
+tick();
+"""